@@ -0,0 +1,189 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import tempfile
+
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.server import add_server_arguments, server_from_args
+
+DEFAULT_SIZES = (100, 1000, 10000)
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Metrics compared against a baseline, and whether a higher value is better
+COMPARED_METRICS = {
+    "throughput_rps": True,
+    "p99_ms": False,
+    "cpu_per_request_ms": False,
+    "peak_rss_kb": False,
+}
+
+
+def write_records(filename, endpoint, size):
+    """Write a records file of `size` GET requests spread over a hundred resources"""
+    with open(filename, "w", newline="") as file:
+        file.write("Method,Endpoint,Resource,Querystring,Encoding\r\n")
+        for i in range(size):
+            file.write(f"GET,{endpoint},/items/{i % 100},id={i},utf-8\r\n")
+
+
+def run_dex(records_file, dex_args) -> dict:
+    """
+    Run the whole dex pipeline over a records file, measuring the process it runs in.
+
+    Called in a freshly spawned process so that peak RSS belongs to this run alone. CPU time is taken
+    around the run itself, leaving out interpreter startup and imports.
+    """
+    from dex.cli import build_parser, replay_records, run_batch
+    from tools import StatusCodeCollectionWriter
+
+    args = build_parser().parse_args([records_file, "--quiet", *dex_args])
+    collections = StatusCodeCollectionWriter(indent=args.postman_indent)
+
+    before = resource.getrusage(resource.RUSAGE_SELF)
+    started = time.monotonic()
+    stats = run_batch(replay_records(records_file), args, collections)
+    wall_time = time.monotonic() - started
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+
+    peak_rss = usage.ru_maxrss // 1024 if sys.platform == "darwin" else usage.ru_maxrss  # Bytes on macOS
+    total = stats.total_requests()
+    cpu_user = usage.ru_utime - before.ru_utime
+    cpu_system = usage.ru_stime - before.ru_stime
+    cpu_time = cpu_user + cpu_system
+    percentiles = stats.percentiles()
+
+    return {
+        "requests": total,
+        "successful": stats.successful_requests,
+        "failed": stats.failed_requests,
+        "errored": stats.errored_requests,
+        "wall_time_s": round(wall_time, 6),
+        "throughput_rps": round(total / wall_time, 3) if wall_time else 0.0,
+        "p50_ms": percentiles[50],
+        "p99_ms": percentiles[99],
+        "cpu_user_s": round(cpu_user, 6),
+        "cpu_system_s": round(cpu_system, 6),
+        "cpu_per_request_ms": round(cpu_time * 1000 / total, 6) if total else 0.0,
+        "peak_rss_kb": peak_rss,
+    }
+
+
+def run_size(directory, endpoint, size, dex_args) -> dict:
+    workdir = os.path.join(directory, str(size))
+    os.makedirs(workdir)
+    records_file = os.path.join(workdir, "records.csv")
+    write_records(records_file, endpoint, size)
+
+    # Spawn rather than fork so the run does not inherit the server's memory or threads
+    cwd = os.getcwd()
+    os.chdir(workdir)  # Logs and Postman collections are written to the working directory
+    try:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+            result = executor.submit(run_dex, records_file, dex_args).result()
+    finally:
+        os.chdir(cwd)
+
+    return {"size": size, **result}
+
+
+def compare(baseline, results, tolerance) -> list:
+    """Return a description of every metric that regressed by more than `tolerance` against the baseline"""
+    previous = {result["size"]: result for result in baseline["results"]}
+    regressions = []
+
+    for result in results:
+        before = previous.get(result["size"])
+        if before is None:
+            continue
+
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = before.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append(f"size {result['size']}: {metric} {old} -> {new} ({change:+.1%})")
+
+    return regressions
+
+
+def print_results(results):
+    print(f"{'Size':>8} {'Throughput':>14} {'p50':>10} {'p99':>10} {'CPU/req':>10} {'Peak RSS':>10}")
+    for result in results:
+        print(f"{result['size']:>8} {result['throughput_rps']:>10.1f} r/s {result['p50_ms']:>7.3f} ms "
+              f"{result['p99_ms']:>7.3f} ms {result['cpu_per_request_ms']:>7.3f} ms "
+              f"{result['peak_rss_kb'] / 1024:>7.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark dex against a local stand-in server. Any other arguments are passed on to dex, "
+                    "e.g. -c 8 --body discard.",
+        allow_abbrev=False,
+    )
+    parser.add_argument("--sizes", type=lambda value: [int(size) for size in value.split(",")],
+                        default=list(DEFAULT_SIZES),
+                        help=f"Comma separated batch sizes (default: {','.join(map(str, DEFAULT_SIZES))}).")
+    parser.add_argument("-o", "--output", type=str, default=DEFAULT_OUTPUT,
+                        help="File the results are written to as JSON (default: benchmarks/baseline.json).")
+    parser.add_argument("--compare", type=str,
+                        help="Compare against an earlier results file and exit with status 1 on regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="Fraction a metric may worsen by before --compare reports it (default: 0.1).")
+    add_server_arguments(parser)
+    args, dex_args = parser.parse_known_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r") as file:
+            baseline = json.load(file)
+
+    results = []
+    with server_from_args(args) as server, tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            print(f"Sending {size} requests ...")
+            results.append(run_size(directory, server.endpoint, size, dex_args))
+        server_config = server.config
+
+    with open(os.path.join(os.path.dirname(__file__), "..", "VERSION")) as file:
+        version = file.read().strip()
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "dex_version": version,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "server": server_config,
+        "dex_args": dex_args,
+        "results": results,
+    }
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+        file.write("\n")
+
+    print()
+    print_results(results)
+    print(f"\nResults saved to {args.output}.")
+
+    if baseline is not None:
+        regressions = compare(baseline, results, args.tolerance)
+        if regressions:
+            print(f"\nRegressions against {args.compare}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+
+        print(f"\nNo regressions against {args.compare}.")
+
+
+if __name__ == "__main__":
+    main()
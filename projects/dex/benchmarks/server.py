@@ -0,0 +1,145 @@
+import time
+import random
+import argparse
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def parse_status_mix(value) -> dict:
+    """Parse "200=90,404=5,500=5" into a dict of status codes to relative weights"""
+    mix = {}
+    for part in value.split(","):
+        status, _, weight = part.partition("=")
+        mix[int(status)] = float(weight or 1)
+
+    if not mix or any(weight < 0 for weight in mix.values()) or not sum(mix.values()):
+        raise ValueError(f"Invalid status mix {value!r}, expected e.g. 200=90,404=5,500=5.")
+
+    return mix
+
+
+class BenchmarkHandler(BaseHTTPRequestHandler):
+    """
+    Answers every request after `latency` seconds (plus up to `jitter` more) with a `body_size` byte body
+    and a status drawn from `status_mix`. Configured per server through BenchmarkServer.
+    """
+
+    disable_nagle_algorithm = True  # Headers and body are separate writes, don't let them wait on delayed ACKs
+
+    latency = 0.0
+    jitter = 0.0
+    body_size = 1024
+    status_mix = {200: 1.0}
+    keep_alive = True
+
+    def setup(self):
+        super().setup()
+        self.protocol_version = "HTTP/1.1" if self.keep_alive else "HTTP/1.0"
+        self.body = b"x" * self.body_size
+        self.statuses = list(self.status_mix)
+        self.weights = list(self.status_mix.values())
+
+    def do_GET(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+
+        delay = self.latency + random.random() * self.jitter
+        if delay:
+            time.sleep(delay)
+
+        self.send_response(random.choices(self.statuses, self.weights)[0])
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(self.body)))
+        if not self.keep_alive:
+            self.send_header("Connection", "close")
+        self.end_headers()
+
+        if self.command != "HEAD":
+            self.wfile.write(self.body)
+
+    do_HEAD = do_GET
+    do_POST = do_GET
+    do_PUT = do_GET
+    do_PATCH = do_GET
+    do_DELETE = do_GET
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _QueueingHTTPServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+    request_queue_size = 1024  # Room for every connection a high concurrency run opens at once
+
+
+class BenchmarkServer:
+    """Runs a BenchmarkHandler server on a localhost port for the duration of a with block"""
+
+    def __init__(self, port=0, latency=0.0, jitter=0.0, body_size=1024, status_mix=None, keep_alive=True):
+        handler = type("ConfiguredBenchmarkHandler", (BenchmarkHandler,), {
+            "latency": latency,
+            "jitter": jitter,
+            "body_size": body_size,
+            "status_mix": status_mix or {200: 1.0},
+            "keep_alive": keep_alive,
+        })
+        self.config = {
+            "latency": latency,
+            "jitter": jitter,
+            "body_size": body_size,
+            "status_mix": {str(status): weight for status, weight in handler.status_mix.items()},
+            "keep_alive": keep_alive,
+        }
+
+        self.server = _QueueingHTTPServer(("127.0.0.1", port), handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def endpoint(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def add_server_arguments(parser):
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Seconds the server waits before answering each request (default: 0).")
+    parser.add_argument("--jitter", type=float, default=0.0,
+                        help="Up to this many extra seconds of random latency per request (default: 0).")
+    parser.add_argument("--body-size", type=int, default=1024,
+                        help="Size of every response body in bytes (default: 1024).")
+    parser.add_argument("--status-mix", type=parse_status_mix, default={200: 1.0},
+                        help="Weighted mix of response status codes, e.g. 200=90,404=5,500=5 (default: 200).")
+    parser.add_argument("--no-keep-alive", dest="keep_alive", action="store_false",
+                        help="Close the connection after every response.")
+
+
+def server_from_args(args, port=0) -> BenchmarkServer:
+    return BenchmarkServer(port, args.latency, args.jitter, args.body_size, args.status_mix, args.keep_alive)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the stand-in HTTP server used by the dex benchmarks.")
+    parser.add_argument("-p", "--port", type=int, default=8000, help="Port to listen on (default: 8000).")
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    with server_from_args(args, args.port) as server:
+        print(f"Serving on {server.endpoint}, press Ctrl+C to stop.")
+        try:
+            server.thread.join()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
 # See this as a reference: https://mockend.com/
 
 import os
+import sys
+import time
 import glob
 import argparse
-import statistics
+import functools
 
 from tools import *
 
@@ -13,115 +15,538 @@ DEFAULT_HEADERS = {
 }
 
 
-def batch_print_requests(requests):
-    """Print all requests in the batch"""
-    with open('requests.log', 'a') as log_file:
-        for req in requests:
-            print(req)
-            log_file.write(str(req) + '\n')
+LOG_FILES = {
+    "text": "requests.log",
+    "jsonl": "requests.jsonl",
+    "csv": "requests.csv",
+}
+
+
+def log_filename(args) -> str:
+    return args.log_file or LOG_FILES[args.log_format]
+
+
+def batch_print_requests(results, log_writer):
+    """Log (and optionally echo) each result in the batch as it arrives, passing it through unchanged"""
+    with log_writer:
+        yield from log_writer.track(results)
+
 
+def replay_records(filename, duration=None, start=0, end=None):
+    """Yield the records in the file, starting over from the top until stopped when a duration is set"""
+    read_records = read_compiled_records if is_compiled_records(filename) else read_records_from_csv
 
-def collect_reqeusts_from_records(headers, records) -> list:
-    requests = []
-    # Collect all request objects
+    while True:
+        replayed = False
+        for record in read_records(filename, start, end):
+            replayed = True
+            yield record
+
+        if duration is None or not replayed:
+            return
+
+
+def collect_reqeusts_from_records(headers, records, pool=None, body_policy=None, cache=None, timeout=None, retry=None,
+                                  breaker=None, payloads=None):
+    """
+    Build request objects lazily, one per record.
+
+    Records may carry two optional columns after Encoding: a body file and a JSON header set laid over
+    `headers`. Both are loaded once through `payloads` and shared by every record that names them.
+    Compiled records also carry their prebuilt URL and request target.
+    """
     for record in records:
         method = record[0]
         endpoint = record[1]
         resource = record[2]
         querystring = record[3]
         encoding = record[4]
+        body_file = record[5] if len(record) > 5 else None
+        header_set = record[6] if len(record) > 6 else None
+        url = record[7] if len(record) > 7 else None
+        target = record[8] if len(record) > 8 else None
 
-        req = CustomRequest(method, endpoint, resource, encoding, headers, querystring)
-        requests.append(req)
+        body = payloads.payload(body_file) if body_file else None
+        record_headers = payloads.headers(header_set, headers) if header_set else headers
 
-    return requests
+        yield CustomRequest(method, endpoint, resource, encoding, record_headers, querystring, pool, body_policy, cache,
+                            timeout, retry, breaker, body, url, target)
 
 
-def batch_send_requests(requests):
-    # Send all requests
-    for req in requests:
-        try:
-            res = req.send()
-        except ValueError as e:
-            print(f"Error: {e}")
-            continue
+def send_request(req, coalescer=None):
+    """Send a single request, reporting value and connection errors instead of raising them"""
+    try:
+        if coalescer is None:
+            req.send()
+        else:
+            coalescer.send(req)
+    except (ValueError, *RETRYABLE_ERRORS) as e:
+        print(f"Error: {req.method} {req.full_url()}: {e or type(e).__name__}")
 
-        print(req)
+    return req
 
 
-def cleanup_collections():
-    """Remove all collection status files"""
-    for filename in glob.glob("collection_status_*.json"):
-        print(f"Removing {filename} ...")
-        os.remove(filename)
+def send_scheduled_request(req, intended_time, coalescer=None):
+    """Send a request and charge it for the time it waited past its scheduled start"""
+    queue_delay_ns = max(int((time.monotonic() - intended_time) * 1_000_000_000), 0)
+    send_request(req, coalescer)
 
+    req.queue_delay_ns = queue_delay_ns
+    req.elapsed_time_ns += queue_delay_ns
+    return req
 
-def ns_to_ms(nanoseconds) -> int:
-    return int(round(nanoseconds / 1_000_000))
 
+def batch_send_requests(requests, concurrency=1, coalescer=None):
+    """Send all requests using `concurrency` worker threads, yielding them in input order"""
+    return execute_in_order(functools.partial(send_request, coalescer=coalescer), requests, concurrency)
 
-def display_request_statistics(requests):
-    # Extract durations from the requests
-    durations = [ns_to_ms(req.elapsed_time_ns) for req in requests]
 
-    successful_requests = 0
-    failed_requests = 0
+def batch_send_requests_at_rate(requests, limiter, concurrency=1, duration=None, coalescer=None):
+    """Send requests on an open-loop schedule, measuring latency from each request's intended start"""
+    return execute_at_rate(functools.partial(send_scheduled_request, coalescer=coalescer), requests, limiter,
+                           concurrency, duration)
+
+
+def batch_send_requests_fair(requests, concurrency=1, host_limit=None, weights=None, coalescer=None):
+    """Send requests sharing `concurrency` worker threads fairly between hosts, yielding them as they complete"""
+    return execute_fair(functools.partial(send_request, coalescer=coalescer), requests, request_host, concurrency,
+                        host_limit, weights)
+
+
+def report_pipeline_error(host, error, unanswered):
+    print(f"Pipeline to {host} failed: {error!r}, sending {unanswered} unanswered requests on their own",
+          file=sys.stderr)
+
+
+def send_pipelined_batch(batch, pool=None):
+    """Pipeline a batch of requests, sending the ones that cannot be pipelined on their own"""
+    return pipeline_requests(batch, pool, send_request, report_pipeline_error)
 
-    for req in requests:
-        # Assuming `req` has a `status_code` attribute and considering 2xx codes as successful
-        status = req.status_code()
-        if 200 <= status < 300:
-            successful_requests += 1
-        else:
-            failed_requests += 1
 
-    # Calculate statistics
-    min_duration = min(durations)
-    max_duration = max(durations)
-    mean_duration = statistics.mean(durations)
-    median_duration = statistics.median(durations)
-    mode_duration = statistics.mode(durations)
-    std_deviation = statistics.stdev(durations)
-    variance = statistics.variance(durations)
+def batch_send_requests_pipelined(requests, depth, pool=None, concurrency=1):
+    """Pipeline requests in batches of `depth` using `concurrency` worker threads, yielding them in input order"""
+    send = functools.partial(send_pipelined_batch, pool=pool)
+    for batch in execute_in_order(send, batched(requests, depth), concurrency):
+        yield from batch
 
-    # Summarize total requests and elapsed time
-    total_requests = len(requests)
-    total_elapsed_time = sum(durations)
+
+def cleanup_collections():
+    """Remove all collection status files"""
+    for filename in glob.glob("collection_status_*.json"):
+        print(f"Removing {filename} ...")
+        os.remove(filename)
+
+
+def display_request_statistics(stats, wall_time=None):
+    latency = stats.latency
 
     # Display statistics
     print()
     print("Request Statistics")
     print("=" * 50)
-    print(f"Total Requests: {total_requests}")
-    print(f"Successful Requests: {successful_requests}")
-    print(f"Failed Requests: {failed_requests}")
-    print(f"Total Elapsed Time: {total_elapsed_time} ms")
-    print(f"Minimum Duration: {min_duration} ms")
-    print(f"Maximum Duration: {max_duration} ms")
-    print(f"Mean Duration: {mean_duration} ms")
-    print(f"Median Duration: {median_duration:.2f} ms")
-    print(f"Mode Duration: {mode_duration} ms")
-    print(f"Standard Deviation: {std_deviation:.2f}")
-    print(f"Variance: {variance:.2f}")
+    print(f"Total Requests: {stats.total_requests()}")
+    print(f"Successful Requests: {stats.successful_requests}")
+    print(f"Failed Requests: {stats.failed_requests}")
+    print(f"Errored Requests: {stats.errored_requests}")
+    if stats.status_classes:
+        print("Status Classes: " + ", ".join(f"{status_class}={count}"
+                                             for status_class, count in sorted(stats.status_classes.items())))
+    if stats.coalesced_requests:
+        print(f"Coalesced Requests: {stats.coalesced_requests}")
+    if stats.retries:
+        print(f"Retried Requests: {stats.retried_requests} ({stats.retries} retries)")
+    if stats.checks:
+        print(f"Checks: {stats.checks_passed()} passed, {stats.checks_failed()} failed")
+        for failure, count in sorted(stats.check_failures.items(), key=lambda item: item[1], reverse=True)[:5]:
+            print(f"  {count} x {failure}")
+
+    if wall_time:
+        print(f"Wall Time: {wall_time:.3f} s")
+        print(f"Throughput: {stats.total_requests() / wall_time:.2f} requests/s")
+
+    if stats.body_bytes or stats.wire_bytes:
+        print(f"Response Bytes: {format_size(stats.body_bytes, stats.wire_bytes)}")
+        if stats.wire_bytes < stats.body_bytes:
+            print(f"Compression Saved: {1 - stats.wire_bytes / stats.body_bytes:.1%}")
+
+    if latency.count:
+        print(f"Total Elapsed Time: {us_to_ms(latency.total):.3f} ms")
+        print(f"Minimum Duration: {us_to_ms(latency.min):.3f} ms")
+        print(f"Maximum Duration: {us_to_ms(latency.max):.3f} ms")
+        print(f"Mean Duration: {us_to_ms(latency.mean()):.3f} ms")
+        for percent, duration in stats.percentiles().items():
+            print(f"p{percent} Duration: {duration:.3f} ms")
+        print(f"Standard Deviation: {us_to_ms(latency.stdev()):.3f} ms")
+        print(f"Variance: {latency.variance() / 1_000_000:.3f} ms^2")
+        print()
+        print(f"{'Phase':<10} {'Mean':>12} {'p50':>12} {'p99':>12} {'Max':>12}")
+        phases = dict(stats.phases)
+        if stats.queue_delay.max:
+            phases["queue"] = stats.queue_delay
+        if stats.backoff.max:
+            phases["backoff"] = stats.backoff
+        for phase, histogram in phases.items():
+            print(f"{phase:<10} {us_to_ms(histogram.mean()):>9.3f} ms {us_to_ms(histogram.percentile(50)):>9.3f} ms "
+                  f"{us_to_ms(histogram.percentile(99)):>9.3f} ms {us_to_ms(histogram.max):>9.3f} ms")
+
+        if stats.cache:
+            print()
+            print(f"{'Cache':<12} {'Count':>8} {'Mean':>12} {'p50':>12} {'p99':>12}")
+            for cache_status in ("hit", "revalidated", "miss"):
+                histogram = stats.cache.get(cache_status, LatencyHistogram())
+                print(f"{cache_status:<12} {histogram.count:>8} {us_to_ms(histogram.mean()):>9.3f} ms "
+                      f"{us_to_ms(histogram.percentile(50)):>9.3f} ms {us_to_ms(histogram.percentile(99)):>9.3f} ms")
+
+        display_host_statistics(stats, wall_time)
+
+        if stats.handshakes:
+            print()
+            print(f"{'Handshake':<12} {'Count':>8} {'Mean':>12} {'p50':>12} {'p99':>12}")
+            for handshake in ("full", "resumed"):
+                histogram = stats.handshakes.get(handshake, LatencyHistogram())
+                print(f"{handshake:<12} {histogram.count:>8} {us_to_ms(histogram.mean()):>9.3f} ms "
+                      f"{us_to_ms(histogram.percentile(50)):>9.3f} ms {us_to_ms(histogram.percentile(99)):>9.3f} ms")
+    else:
+        print("No responses were received.")
+
     print("=" * 50)
     print()
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Send a batch of requests to a target servers.")
+def display_host_statistics(stats, wall_time=None, limit=20):
+    """Show the throughput and latency of the busiest hosts when requests went to more than one"""
+    hosts = {host: histogram.count for host, histogram in stats.hosts.items()}
+    for host, errors in stats.host_errors.items():
+        hosts[host] = hosts.get(host, 0) + errors
+    if len(hosts) < 2:
+        return
+
+    print()
+    print(f"{'Host':<32} {'Requests':>9} {'Errors':>7} {'Req/s':>9} {'Mean':>12} {'p50':>12} {'p99':>12}")
+    busiest = sorted(hosts.items(), key=lambda item: item[1], reverse=True)
+    for host, count in busiest[:limit]:
+        histogram = stats.hosts.get(host, LatencyHistogram())
+        rate = f"{count / wall_time:.2f}" if wall_time else "-"
+        print(f"{host:<32} {count:>9} {stats.host_errors.get(host, 0):>7} {rate:>9} "
+              f"{us_to_ms(histogram.mean()):>9.3f} ms {us_to_ms(histogram.percentile(50)):>9.3f} ms "
+              f"{us_to_ms(histogram.percentile(99)):>9.3f} ms")
+    if len(busiest) > limit:
+        print(f"... and {len(busiest) - limit} more hosts")
+
+
+def report_unresolved_host(host, port, error):
+    print(f"Could not resolve {host}:{port}: {error}", file=sys.stderr)
+
+
+def run_batch(records, args, collections, body_prefix="response", progress_label=None):
+    """Send the records through the whole pipeline into the Postman collections, returning the statistics"""
+    resolver = DNSCache(args.dns_ttl) if args.dns_ttl else None
+
+    # Keep enough idle connections around for every worker to reuse one per host
+    pool = ConnectionPool(max_idle_per_host=args.concurrency, resolver=resolver)
+
+    if args.body == "file":
+        body_policy = FileBody(args.body_dir, body_prefix)
+    else:
+        body_policy = BODY_POLICIES[args.body]()
+
+    cache = None
+    if args.cache:
+        cache = ResponseCache(args.cache_size, args.cache_ttl, path=args.cache_file)
+
+    retry = RetryPolicy(args.retries, args.backoff, args.max_backoff) if args.retries else None
+    breaker = CircuitBreaker(args.breaker_threshold, args.breaker_reset) if args.breaker_threshold else None
+
+    # Identical requests in flight at the same time share one network call
+    coalescer = RequestCoalescer() if args.coalesce else None
+
+    # Body files and header sets named by records, resolved relative to the records file
+    payloads = PayloadStore(os.path.dirname(os.path.abspath(args.input_file)))
+
+    stats = RequestStatistics()
+
+    # Live progress lines and the metrics endpoint read the same statistics the final summary is built from
+    progress = ProgressReporter(stats, args.progress, label=progress_label)
+    metrics = MetricsServer(stats, progress.in_flight, args.metrics_port) if args.metrics_port else None
+
+    # Each stage pulls from the previous one, so requests are sent while the file is still being read
+    # and swapped for compact results as soon as they complete.
+    headers = {**DEFAULT_HEADERS, "Accept-Encoding": ACCEPT_ENCODING} if args.compress else DEFAULT_HEADERS
+
+    requests = collect_reqeusts_from_records(headers, records, pool, body_policy, cache,
+                                             (args.connect_timeout, args.read_timeout), retry, breaker, payloads)
+    if resolver is not None:
+        requests = resolver.prefetch_ahead(requests, report_unresolved_host)
+    requests = progress.track_started(requests)
+
+    if args.pipeline:
+        requests = batch_send_requests_pipelined(requests, args.pipeline, pool, args.concurrency)
+    elif args.per_host or args.host_weight:
+        requests = batch_send_requests_fair(requests, args.concurrency, args.per_host, dict(args.host_weight or ()),
+                                            coalescer)
+    elif args.rate is None:
+        requests = batch_send_requests(requests, args.concurrency, coalescer)
+    else:
+        limiter = TokenBucket(args.rate, args.burst, args.ramp_up)
+        requests = batch_send_requests_at_rate(requests, limiter, args.concurrency, args.duration, coalescer)
+
+    # Bodies are parsed and checked in a separate pool so the send stage never waits on them
+    if args.checks:
+        requests = run_checks(requests, CheckSet.load(args.checks), args.check_workers, args.check_processes)
+
+    log_writer = RequestLogWriter(log_filename(args), args.log_format, echo=not args.quiet,
+                                  background=args.log_background)
+
+    results = collect_results(requests)
+    results = batch_print_requests(results, log_writer)
+    results = stats.track(results)
+    results = collections.track(results)
+
+    progress.start()
+    if metrics is not None:
+        metrics.start()
+
+    try:
+        for _ in results:
+            pass
+    finally:
+        progress.stop()
+        if metrics is not None:
+            metrics.stop()
+        pool.close()
+        collections.close()
+        payloads.close()
+        if cache is not None:
+            cache.close()
+
+    return stats
+
+
+def run_shard(filename, index, start, end, args):
+    """
+    Run the pipeline over the records in one byte range of the file, in a worker process.
+
+    :return: The shard's statistics and the Postman item files it wrote for each status code
+    """
+    records = replay_records(filename, args.duration, start, end)
+    collections = StatusCodeCollectionWriter(f"collection_status_{{}}.shard{index}.jsonl",
+                                             writer_class=PostmanItemWriter)
+
+    stats = run_batch(records, args, collections, f"response_shard{index}", f"[shard {index}]")
+    return stats, collections.filenames()
+
+
+def compile_main(argv):
+    parser = argparse.ArgumentParser(prog="dex compile",
+                                     description="Compile a records CSV file into a binary records file that dex "
+                                                 "memory-maps and replays without parsing.")
     parser.add_argument("input_file", type=str, help="Path to the input CSV file containing request records.")
+    parser.add_argument("-o", "--output", type=str,
+                        help="Path of the compiled records file (default: the input file with a .dexc extension).")
+
+    args = parser.parse_args(argv)
+    output = args.output or f"{os.path.splitext(args.input_file)[0]}.dexc"
+
+    started = time.monotonic()
+    count = compile_records(args.input_file, output)
+    print(f"Compiled {count} records into {output} in {time.monotonic() - started:.3f} s.")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Send a batch of requests to a target servers.",
+                                     epilog="Run 'dex compile' to compile a records file for faster startup.")
+    parser.add_argument("input_file", type=str,
+                        help="Path to the input CSV file containing request records, or a records file compiled "
+                             "with 'dex compile'. Each record may name a body file and a JSON header set in "
+                             "optional Body and Headers columns.")
+    parser.add_argument("-c", "--concurrency", type=int, default=1,
+                        help="Number of requests to send in parallel (default: 1).")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="Number of processes to split the records file between (default: 1). "
+                             "--concurrency and --rate are shared out between the processes.")
+    parser.add_argument("--body", choices=sorted(BODY_POLICIES), default="buffer",
+                        help="What to do with response bodies: keep them in memory (buffer), only count their bytes "
+                             "(discard), keep a sha256 digest (hash) or stream them to --body-dir (file).")
+    parser.add_argument("--body-dir", type=str, default="output",
+                        help="Directory response bodies are written to with --body file (default: output).")
+    parser.add_argument("--log-format", choices=LOG_FORMATS, default="jsonl",
+                        help="Format of the request log: one JSON object per line (jsonl), csv, or the console "
+                             "text format (default: jsonl).")
+    parser.add_argument("--log-file", type=str,
+                        help="File the request log is appended to (default: requests.jsonl, requests.csv or "
+                             "requests.log depending on --log-format).")
+    parser.add_argument("--log-background", action="store_true",
+                        help="Format and write the request log on a background thread.")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="Do not echo every request to the console.")
+    parser.add_argument("--postman-indent", type=int,
+                        help="Indent the Postman collections by this many spaces instead of writing compact JSON.")
+    parser.add_argument("--cache", action="store_true",
+                        help="Answer repeated GET and HEAD requests from a response cache that honours Cache-Control "
+                             "and revalidates stale responses with their ETag or Last-Modified.")
+    parser.add_argument("--cache-size", type=int, default=1024,
+                        help="Maximum number of responses kept by --cache (default: 1024).")
+    parser.add_argument("--cache-ttl", type=float, default=60.0,
+                        help="Seconds a response without Cache-Control or Expires stays fresh (default: 60).")
+    parser.add_argument("--cache-file", type=str,
+                        help="Keep the --cache responses in this file so they are reused by later runs.")
+    parser.add_argument("--connect-timeout", type=float, default=10.0,
+                        help="Seconds to wait for a connection (and TLS handshake) to be established (default: 10).")
+    parser.add_argument("--read-timeout", type=float, default=30.0,
+                        help="Seconds to wait for each read from the server (default: 30).")
+    parser.add_argument("--retries", type=int, default=0,
+                        help="Retry idempotent requests that fail to connect, time out or get a 429, 502, 503 or "
+                             "504 response up to this many times (default: 0).")
+    parser.add_argument("--backoff", type=float, default=0.1,
+                        help="Base of the exponential backoff between retries in seconds, with full jitter "
+                             "(default: 0.1).")
+    parser.add_argument("--max-backoff", type=float, default=10.0,
+                        help="Longest wait between retries in seconds (default: 10).")
+    parser.add_argument("--breaker-threshold", type=int, default=0,
+                        help="Stop sending to a host after this many consecutive failures, 0 to disable "
+                             "(default: 0).")
+    parser.add_argument("--breaker-reset", type=float, default=30.0,
+                        help="Seconds before a tripped host is tried again (default: 30).")
+    parser.add_argument("--dns-ttl", type=float, default=60.0,
+                        help="Keep the addresses of every host for this many seconds, resolving each host in the "
+                             "background as soon as it is read from the records and spreading connections over "
+                             "all of its addresses. 0 asks the system resolver for every new connection "
+                             "(default: 60).")
+    parser.add_argument("--compress", action="store_true",
+                        help=f"Ask servers to compress responses ({ACCEPT_ENCODING}). Compressed bodies are "
+                             f"always decoded as they are read, whether or not this is set.")
+    parser.add_argument("--coalesce", action="store_true",
+                        help="Let identical idempotent requests that are in flight at the same time share one "
+                             "network call. Only takes effect with --concurrency or --rate.")
+    parser.add_argument("--per-host", type=int, metavar="N",
+                        help="Send at most N requests to any one host at a time, queueing each host's requests "
+                             "separately and taking turns between hosts so a slow host cannot hold up the rest. "
+                             "Results are logged as they complete rather than in records order.")
+    parser.add_argument("--host-weight", type=parse_host_weight, action="append", metavar="HOST=WEIGHT",
+                        help="Give HOST (host[:port] as written in the records) WEIGHT requests per turn instead "
+                             "of 1 when taking turns between hosts. May be repeated.")
+    parser.add_argument("--pipeline", type=int, metavar="DEPTH",
+                        help="Pipeline up to DEPTH GET and HEAD requests at a time down one connection per host "
+                             "and worker. The server must support HTTP/1.1 pipelining. Pipelined responses are "
+                             "not retried or counted by the circuit breaker, so --retries and "
+                             "--breaker-threshold cannot be used with it.")
+    parser.add_argument("--progress", type=float, nargs="?", const=1.0, metavar="SECONDS",
+                        help="Print a progress line to stderr every SECONDS seconds (default: 1) with the request "
+                             "rate, requests in flight, rolling p50/p99 latency and responses per status class.")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help="Serve live metrics in the Prometheus text format at http://127.0.0.1:PORT/metrics.")
+    parser.add_argument("--checks", type=str, metavar="FILE",
+                        help="Check every response against the rules in a JSON file: expected status codes, "
+                             "values at JSONPaths, body size bounds and a JSON Schema (needs jsonschema), each "
+                             "optionally limited to a method and a URL pattern. Pass and fail counts are shown in "
+                             "the summary and saved as variables of each status code collection.")
+    parser.add_argument("--check-workers", type=int, default=1, metavar="N",
+                        help="Number of threads that parse and check response bodies (default: 1).")
+    parser.add_argument("--check-processes", action="store_true",
+                        help="Parse and check response bodies in --check-workers processes instead of threads, "
+                             "for large JSON bodies.")
+    parser.add_argument("--rate", type=float,
+                        help="Send requests open-loop at this many requests per second instead of back to back.")
+    parser.add_argument("--ramp-up", type=float, default=0.0,
+                        help="Seconds over which --rate ramps up linearly from zero (default: 0).")
+    parser.add_argument("--duration", type=float,
+                        help="With --rate, replay the records file repeatedly for this many seconds.")
+    parser.add_argument("--burst", type=int, default=1,
+                        help="With --rate, the number of requests that may be sent back to back (default: 1).")
+
+    return parser
+
+
+def main():
+    if sys.argv[1:2] == ["compile"]:
+        return compile_main(sys.argv[2:])
 
+    parser = build_parser()
     args = parser.parse_args()
 
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.rate is not None and args.rate <= 0:
+        parser.error("--rate must be positive")
+    if args.rate is None and (args.duration is not None or args.ramp_up):
+        parser.error("--duration and --ramp-up require --rate")
+    if args.burst < 1:
+        parser.error("--burst must be at least 1")
+    if args.cache_size < 1:
+        parser.error("--cache-size must be at least 1")
+    if args.cache_file and not args.cache:
+        parser.error("--cache-file requires --cache")
+    if args.cache_file and args.workers > 1:
+        parser.error("--cache-file cannot be shared between --workers")
+    if args.pipeline is not None and args.pipeline < 1:
+        parser.error("--pipeline must be at least 1")
+    if args.pipeline and (args.rate is not None or args.cache or args.coalesce):
+        parser.error("--pipeline cannot be combined with --rate, --cache or --coalesce")
+    if args.pipeline and (args.retries or args.breaker_threshold):
+        parser.error("--pipeline cannot be combined with --retries or --breaker-threshold")
+    if args.connect_timeout <= 0 or args.read_timeout <= 0:
+        parser.error("--connect-timeout and --read-timeout must be positive")
+    if args.retries < 0 or args.breaker_threshold < 0:
+        parser.error("--retries and --breaker-threshold cannot be negative")
+    if args.backoff < 0 or args.max_backoff < 0:
+        parser.error("--backoff and --max-backoff cannot be negative")
+    if args.per_host is not None and args.per_host < 1:
+        parser.error("--per-host must be at least 1")
+    if (args.per_host or args.host_weight) and (args.rate is not None or args.pipeline):
+        parser.error("--per-host and --host-weight cannot be combined with --rate or --pipeline")
+    if args.dns_ttl < 0:
+        parser.error("--dns-ttl cannot be negative")
+
+    if args.progress is not None and args.progress <= 0:
+        parser.error("--progress must be positive")
+    if args.metrics_port is not None and args.workers > 1:
+        parser.error("--metrics-port cannot be shared between --workers")
+
+    if args.check_workers < 1:
+        parser.error("--check-workers must be at least 1")
+    if args.checks:
+        try:
+            checks = CheckSet.load(args.checks)
+        except (OSError, ValueError) as e:
+            parser.error(f"--checks: {e}")
+        if checks.needs_body and args.body != "buffer":
+            parser.error("--checks with JSON or schema rules requires --body buffer")
+
     cleanup_collections()
 
-    records = read_records_from_csv(args.input_file)
-    requests = collect_reqeusts_from_records(DEFAULT_HEADERS, records)
+    started = time.monotonic()
+
+    if args.workers == 1:
+        collections = StatusCodeCollectionWriter(indent=args.postman_indent)
+        stats = run_batch(replay_records(args.input_file, args.duration), args, collections)
+    else:
+        # Every shard gets an equal share of the concurrency and rate
+        shard_args = argparse.Namespace(**vars(args))
+        shard_args.concurrency = max(args.concurrency // args.workers, 1)
+        if args.rate is not None:
+            shard_args.rate = args.rate / args.workers
+
+        # Create the log up front so that only one CSV header is written
+        RequestLogWriter(log_filename(args), args.log_format).close()
+
+        ranges = None
+        if is_compiled_records(args.input_file):
+            with CompiledRecords(args.input_file) as compiled:
+                ranges = compiled.shard_byte_ranges(args.workers)
+
+        stats, item_files = RequestStatistics(), []
+        for shard_stats, shard_item_files in run_sharded(run_shard, args.input_file, args.workers, shard_args,
+                                                         ranges=ranges):
+            stats.merge(shard_stats)
+            item_files.append(shard_item_files)
+
+        merge_item_files(item_files, indent=args.postman_indent, checks=stats.checks)
+
+    print("Postman collections saved.")
 
-    batch_send_requests(requests)
-    batch_print_requests(requests)
-    display_request_statistics(requests)
-    generate_collections_by_status_code(requests)
+    display_request_statistics(stats, time.monotonic() - started)
 
     print("Done.")
 
@@ -0,0 +1,67 @@
+import os
+import ssl
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class EchoHandler(BaseHTTPRequestHandler):
+    """Responds to every request with a small JSON body describing the request"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = ('{"path": "%s"}' % self.path).encode("utf-8")
+        status = 404 if "missing" in self.path else 200
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    do_HEAD = do_GET
+    do_POST = do_GET
+    do_PUT = do_GET
+    do_PATCH = do_GET
+    do_DELETE = do_GET
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Self-signed certificate and key for localhost, used by TLS tests
+CERTIFICATE = os.path.join(os.path.dirname(__file__), "localhost.pem")
+
+
+def client_context() -> ssl.SSLContext:
+    """A client SSLContext that trusts the test certificate"""
+    return ssl.create_default_context(cafile=CERTIFICATE)
+
+
+class LocalServer:
+    """Runs an HTTP(S) server on an ephemeral localhost port for the duration of a with block"""
+
+    def __init__(self, handler=EchoHandler, tls=False):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.server.daemon_threads = True
+        self.tls = tls
+        if tls:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(CERTIFICATE)
+            self.server.socket = context.wrap_socket(self.server.socket, server_side=True)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def endpoint(self) -> str:
+        return f"{'https' if self.tls else 'http'}://127.0.0.1:{self.server.server_port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,55 @@
+import os
+import tempfile
+import http.client
+
+from unittest import TestCase
+
+from benchmarks.run import COMPARED_METRICS, compare, run_size
+from benchmarks.server import BenchmarkServer, parse_status_mix
+
+
+class TestBenchmarkServer(TestCase):
+
+    def test_parse_status_mix(self):
+        self.assertEqual(parse_status_mix("200=90,404=5,500"), {200: 90.0, 404: 5.0, 500: 1.0})
+        self.assertRaises(ValueError, parse_status_mix, "200=0")
+
+    def test_serves_the_configured_responses(self):
+        with BenchmarkServer(body_size=10, status_mix={503: 1}, keep_alive=False) as server:
+            conn = http.client.HTTPConnection(server.endpoint.replace("http://", ""))
+            conn.request("GET", "/")
+            response = conn.getresponse()
+
+            self.assertEqual(response.status, 503)
+            self.assertEqual(response.read(), b"x" * 10)
+            self.assertTrue(response.will_close)
+            conn.close()
+
+
+class TestRunSize(TestCase):
+
+    def test_small_run(self):
+        cwd = os.getcwd()
+        with BenchmarkServer() as server, tempfile.TemporaryDirectory() as directory:
+            result = run_size(directory, server.endpoint, 20, ["--body", "discard"])
+
+            self.assertTrue(os.path.exists(os.path.join(directory, "20", "collection_status_200.json")))
+
+        self.assertEqual(os.getcwd(), cwd)
+        self.assertEqual((result["size"], result["requests"], result["successful"]), (20, 20, 20))
+        for metric in (*COMPARED_METRICS, "cpu_user_s", "cpu_system_s", "wall_time_s", "p50_ms"):
+            self.assertIn(metric, result)
+        self.assertGreater(result["cpu_per_request_ms"], 0)
+
+
+class TestCompare(TestCase):
+
+    def test_reports_regressions_beyond_the_tolerance(self):
+        baseline = {"results": [{"size": 100, "throughput_rps": 1000, "p99_ms": 2.0, "peak_rss_kb": 100}]}
+        results = [
+            {"size": 100, "throughput_rps": 850, "p99_ms": 2.1, "peak_rss_kb": 100},
+            {"size": 1000, "throughput_rps": 10, "p99_ms": 200},
+        ]
+
+        self.assertEqual(compare(baseline, results, 0.1), ["size 100: throughput_rps 1000 -> 850 (-15.0%)"])
+        self.assertEqual(compare(baseline, results, 0.2), [])
@@ -0,0 +1,56 @@
+import os
+import hashlib
+import tempfile
+
+from unittest import TestCase
+
+from tools.body import DiscardBody, FileBody, HashBody
+from tools.customrequest import CustomRequest
+
+from tests.helpers import LocalServer
+
+
+class TestBodyPolicies(TestCase):
+
+    @staticmethod
+    def expected_body(req) -> bytes:
+        return ('{"path": "%s"}' % req.request_target()).encode("utf-8")
+
+    def send(self, body_policy=None):
+        with LocalServer() as server:
+            req = CustomRequest("GET", server.endpoint, "/comments", "utf-8", body_policy=body_policy)
+            req.send()
+
+        return req
+
+    def test_buffer_is_the_default(self):
+        req = self.send()
+
+        self.assertEqual(req.raw_data, self.expected_body(req))
+        self.assertEqual(req.decoded_data, self.expected_body(req).decode("utf-8"))
+        self.assertEqual(req.body_size, len(req.raw_data))
+        self.assertEqual(req.get_json(), {"path": req.request_target()})
+
+    def test_discard(self):
+        req = self.send(DiscardBody())
+
+        self.assertIsNone(req.raw_data)
+        self.assertEqual(req.body_size, len(self.expected_body(req)))
+        with self.assertRaises(ValueError):
+            req.get_json()
+
+    def test_hash(self):
+        req = self.send(HashBody())
+
+        self.assertIsNone(req.raw_data)
+        self.assertEqual(req.body_digest, "sha256:" + hashlib.sha256(self.expected_body(req)).hexdigest())
+        self.assertIn(req.body_digest, str(req))
+
+    def test_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            req = self.send(FileBody(directory))
+
+            self.assertIsNone(req.raw_data)
+            self.assertEqual(os.path.dirname(req.body_path), directory)
+            with open(req.body_path, "rb") as file:
+                self.assertEqual(file.read(), self.expected_body(req))
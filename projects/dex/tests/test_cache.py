@@ -0,0 +1,132 @@
+import io
+import os
+import tempfile
+
+from unittest import TestCase
+
+from tools.cache import ResponseCache, parse_cache_control
+from tools.customrequest import BodyRecorder, CustomRequest
+
+from tests.helpers import EchoHandler, LocalServer
+
+
+class CachingHandler(EchoHandler):
+    """Serves /fresh with max-age, /etag with an ETag that must be revalidated and /nostore uncacheable"""
+
+    requests = []
+
+    def do_GET(self):
+        CachingHandler.requests.append((self.path, self.headers.get("If-None-Match")))
+
+        if self.path.endswith("/etag") and self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.send_header("ETag", '"v1"')
+            self.end_headers()
+            return
+
+        body = b'{"cached": true}'
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        if self.path.endswith("/fresh"):
+            self.send_header("Cache-Control", "max-age=60")
+        elif self.path.endswith("/etag"):
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("ETag", '"v1"')
+        else:
+            self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_POST = do_GET
+
+
+class TestResponseCache(TestCase):
+
+    def setUp(self):
+        CachingHandler.requests = []
+
+    def send_twice(self, resource, cache, method="GET"):
+        with LocalServer(CachingHandler) as server:
+            return self.send_to(server, resource, cache, method, times=2)
+
+    def send_to(self, server, resource, cache, method="GET", times=1):
+        statuses = []
+        for _ in range(times):
+            req = CustomRequest(method, server.endpoint, resource, "utf-8", cache=cache)
+            req.send()
+            statuses.append(req.cache_status)
+            self.assertEqual(req.status_code(), 200)
+            self.assertEqual(req.get_json(), {"cached": True})
+
+        return statuses
+
+    def test_fresh_responses_are_hits(self):
+        cache = ResponseCache()
+
+        self.assertEqual(self.send_twice("/fresh", cache), ["miss", "hit"])
+        self.assertEqual(len(CachingHandler.requests), 1)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_stale_responses_are_revalidated(self):
+        cache = ResponseCache()
+
+        self.assertEqual(self.send_twice("/etag", cache), ["miss", "revalidated"])
+        self.assertEqual(CachingHandler.requests[1][1], '"v1"')
+        self.assertEqual(cache.revalidations, 1)
+
+    def test_no_store_is_not_cached(self):
+        cache = ResponseCache()
+
+        self.assertEqual(self.send_twice("/nostore", cache), ["miss", "miss"])
+        self.assertEqual(len(cache), 0)
+
+    def test_bodies_over_the_size_limit_are_not_recorded(self):
+        cache = ResponseCache(max_body_size=8)
+
+        self.assertEqual(self.send_twice("/fresh", cache), ["miss", "miss"])
+        self.assertEqual(len(cache), 0)
+
+        recorder = BodyRecorder(io.BytesIO(b"x" * 20), limit=8)
+        self.assertEqual(recorder.read(4), b"xxxx")
+        self.assertEqual(recorder.read(16), b"x" * 16)  # Still passed on to the body policy
+        self.assertIsNone(recorder.chunks)
+        self.assertIsNone(recorder.body())
+
+    def test_only_idempotent_methods_use_the_cache(self):
+        self.assertEqual(self.send_twice("/fresh", ResponseCache(), "POST"), [None, None])
+
+    def test_lru_eviction(self):
+        cache = ResponseCache(max_entries=1)
+        with LocalServer(CachingHandler) as server:
+            for resource in ("/a/fresh", "/b/fresh", "/a/fresh"):
+                req = CustomRequest("GET", server.endpoint, resource, "utf-8", cache=cache)
+                req.send()
+                self.assertEqual(req.cache_status, "miss")
+
+        self.assertEqual(len(cache), 1)
+
+    def test_ttl_expiry(self):
+        now = [1000.0]
+        cache = ResponseCache(clock=lambda: now[0])
+        with LocalServer(CachingHandler) as server:
+            req = CustomRequest("GET", server.endpoint, "/fresh", "utf-8", cache=cache)
+            req.send()
+
+            now[0] += 61
+            req.send()
+            self.assertEqual(req.cache_status, "miss")
+
+    def test_disk_backend_survives_between_runs(self):
+        with tempfile.TemporaryDirectory() as directory, LocalServer(CachingHandler) as server:
+            path = os.path.join(directory, "cache")
+            cache = ResponseCache(path=path)
+            self.assertEqual(self.send_to(server, "/fresh", cache), ["miss"])
+            cache.close()
+
+            cache = ResponseCache(path=path)
+            self.assertEqual(self.send_to(server, "/fresh", cache, times=2), ["hit", "hit"])
+            cache.close()
+
+    def test_parse_cache_control(self):
+        self.assertEqual(parse_cache_control('max-age=30, No-Cache, private="x"'),
+                         {"max-age": "30", "no-cache": True, "private": "x"})
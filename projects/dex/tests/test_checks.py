@@ -0,0 +1,89 @@
+import os
+import json
+import tempfile
+
+from unittest import TestCase
+
+from tools.checks import Check, CheckSet, find_json_path, parse_json_path, run_checks
+from tools.customrequest import CustomRequest
+
+from tests.helpers import LocalServer
+
+DOCUMENT = {"id": 1, "user": {"name": "ada"}, "items": [{"id": 1}, {"id": 1}], "odd key": True}
+
+
+class TestJsonPath(TestCase):
+
+    def find(self, path):
+        return find_json_path(DOCUMENT, parse_json_path(path))
+
+    def test_selects_values(self):
+        self.assertEqual(self.find("$"), [DOCUMENT])
+        self.assertEqual(self.find("$.user.name"), ["ada"])
+        self.assertEqual(self.find("$['odd key']"), [True])
+        self.assertEqual(self.find("$.items[-1].id"), [1])
+        self.assertEqual(self.find("$.items[*].id"), [1, 1])
+        self.assertEqual(self.find("$.user.*"), ["ada"])
+        self.assertEqual(self.find("$.items[5]"), [])
+        self.assertEqual(self.find("$.id.name"), [])
+
+    def test_rejects_unsupported_paths(self):
+        for path in ("user.name", "$..name", "$.items[?(@.id)]"):
+            with self.assertRaises(ValueError):
+                parse_json_path(path)
+
+
+class TestCheckSet(TestCase):
+
+    def test_reports_each_failed_expectation(self):
+        check = Check(status=[200, 201], json={"$.id": 1, "$.user.name": "bob", "$.missing": 0},
+                      min_size=10, max_size=20)
+
+        self.assertEqual(check.evaluate(200, 15, DOCUMENT), ['$.user.name != "bob"', "$.missing not found"])
+        self.assertEqual(check.evaluate(404, 5, DOCUMENT)[:2], ["status not in [200, 201]", "size below 10 bytes"])
+        self.assertEqual(check.evaluate(200, 15, ValueError("nope")), ["body is not JSON"])
+
+    def test_applies_matching_checks_only(self):
+        checks = CheckSet([Check(status=200), Check(method="post", url="/comments", json={"$.id": 1})])
+
+        self.assertEqual(checks.evaluate("GET", "http://h/comments", 200, 2, b"{}"), ())
+        self.assertEqual(checks.evaluate("POST", "http://h/comments", 500, 2, b'{"id": 1}'),
+                         ("status not in [200]",))
+        self.assertIsNone(CheckSet([Check(url="/posts")]).evaluate("GET", "http://h/comments", 200, 2, b"{}"))
+        self.assertTrue(checks.needs_body)
+
+    def test_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "checks.json")
+            with open(filename, "w") as file:
+                json.dump({"status": 200, "max_size": 100}, file)
+            self.assertEqual(len(CheckSet.load(filename).checks), 1)
+
+            with open(filename, "w") as file:
+                json.dump([{"status": 200, "statsu": 404}], file)
+            with self.assertRaises(ValueError):
+                CheckSet.load(filename)
+
+
+class TestRunChecks(TestCase):
+
+    def test_checks_responses_in_order(self):
+        checks = CheckSet([Check(status=200, json={"$.path": "/comments"})])
+        paths = ["/comments", "/missing", "/posts"] * 4
+
+        for processes in (False, True):
+            with LocalServer() as server:
+                requests = [CustomRequest("GET", server.endpoint, path, "utf-8", {}) for path in paths]
+                for req in requests:
+                    req.send()
+                checked = list(run_checks(iter(requests), checks, workers=2, processes=processes, window=3))
+
+            self.assertEqual([req.resource for req in checked], paths)
+            self.assertEqual([req.check_failures for req in checked[:3]],
+                             [(), ("status not in [200]", '$.path != "/comments"'), ('$.path != "/comments"',)])
+
+    def test_leaves_unanswered_requests_unchecked(self):
+        req = CustomRequest("GET", "http://127.0.0.1:9", "/", "utf-8", {})
+        checked = list(run_checks([req], CheckSet([Check(status=200)])))
+
+        self.assertIsNone(checked[0].check_failures)
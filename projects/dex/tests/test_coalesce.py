@@ -0,0 +1,92 @@
+import time
+import threading
+
+from unittest import TestCase
+
+from tools.coalesce import RequestCoalescer
+from tools.customrequest import CustomRequest
+from tools.engine import execute_in_order
+
+from tests.helpers import EchoHandler, LocalServer
+
+
+class SlowHandler(EchoHandler):
+    """Counts the requests it answers and takes a while over each, so identical requests overlap"""
+
+    received = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with SlowHandler.lock:
+            SlowHandler.received += 1
+        time.sleep(0.2)
+        super().do_GET()
+
+    do_HEAD = do_GET
+    do_POST = do_GET
+
+
+class TestRequestCoalescer(TestCase):
+
+    def setUp(self):
+        SlowHandler.received = 0
+
+    def send_all(self, requests, coalescer):
+        def send(req):
+            coalescer.send(req)
+            return req
+
+        return list(execute_in_order(send, requests, concurrency=len(requests)))
+
+    def test_identical_requests_share_one_call(self):
+        coalescer = RequestCoalescer()
+        with LocalServer(SlowHandler) as server:
+            requests = [CustomRequest("GET", server.endpoint, "/same", "utf-8") for _ in range(5)]
+            sent = self.send_all(requests, coalescer)
+
+        self.assertEqual(SlowHandler.received, 1)
+        self.assertEqual((coalescer.sent, coalescer.coalesced), (1, 4))
+        self.assertEqual(sum(req.coalesced for req in sent), 4)
+        for req in sent:
+            self.assertEqual(req.status_code(), 200)
+            self.assertEqual(req.get_json(), {"path": requests[0].request_target()})
+
+        leader = next(req for req in sent if not req.coalesced)
+        self.assertTrue(all(req.raw_data is leader.raw_data for req in sent))
+
+    def test_different_requests_are_sent_separately(self):
+        coalescer = RequestCoalescer()
+        with LocalServer(SlowHandler) as server:
+            requests = [
+                CustomRequest("GET", server.endpoint, "/one", "utf-8"),
+                CustomRequest("GET", server.endpoint, "/two", "utf-8"),
+                CustomRequest("GET", server.endpoint, "/one", "utf-8", {"Accept": "text/plain"}),
+                CustomRequest("HEAD", server.endpoint, "/one", "utf-8"),
+            ]
+            self.send_all(requests, coalescer)
+
+        self.assertEqual(SlowHandler.received, 4)
+        self.assertEqual(coalescer.coalesced, 0)
+
+    def test_non_idempotent_requests_are_never_coalesced(self):
+        coalescer = RequestCoalescer()
+        with LocalServer(SlowHandler) as server:
+            requests = [CustomRequest("POST", server.endpoint, "/same", "utf-8") for _ in range(3)]
+            self.send_all(requests, coalescer)
+
+        self.assertEqual(SlowHandler.received, 3)
+        self.assertEqual((coalescer.sent, coalescer.coalesced), (0, 0))
+
+    def test_followers_see_the_leaders_error(self):
+        coalescer = RequestCoalescer()
+        requests = [CustomRequest("GET", "http://127.0.0.1:1", "/", "utf-8") for _ in range(3)]
+
+        def send(req):
+            try:
+                coalescer.send(req)
+            except OSError as e:
+                return e
+
+        errors = list(execute_in_order(send, requests, concurrency=3))
+        self.assertTrue(all(isinstance(error, OSError) for error in errors))
+        self.assertEqual(coalescer._in_flight, {})
@@ -0,0 +1,65 @@
+import os
+import tempfile
+
+from unittest import TestCase
+
+from tools.compiled import CompiledRecords, compile_records, is_compiled_records, read_compiled_records
+from tools.customrequest import CustomRequest
+from tools.translation import convert_records_to_csv
+
+RECORDS = [
+    ["get", "https://example.com", "/comments", "postId=1", "utf-8"],
+    ["GET", "example.com", "/comments", "?postId=1", "utf-8"],
+    ["POST", "http://example.com", "/upload", "", "utf-8", "payloads/upload.bin", "headers.json"],
+    ["GET", "https://example.com", "/comments", "postId=2", "utf-8"],
+]
+
+
+class TestCompiledRecords(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.csv_filename = os.path.join(self.directory.name, "records.csv")
+        self.filename = os.path.join(self.directory.name, "compiled", "records.dexc")
+
+        os.makedirs(os.path.dirname(self.filename))
+        convert_records_to_csv(RECORDS, self.csv_filename)
+        self.count = compile_records(self.csv_filename, self.filename)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_records_are_normalized_and_prebuilt(self):
+        records = list(read_compiled_records(self.filename))
+
+        self.assertEqual(self.count, 4)
+        self.assertEqual(records[0], ("GET", "https://example.com", "/comments", "?postId=1", "utf-8", "", "",
+                                      "https://example.com/comments?postId=1", "/comments?postId=1"))
+        self.assertEqual(records[1][7], "http://example.com/comments?postId=1")
+
+        # Requests built from a compiled record send its request target without encoding it again
+        req = CustomRequest(*records[0][:3], records[0][4], querystring=records[0][3], url=records[0][7],
+                            target=records[0][8])
+        self.assertIs(req.request_target(), records[0][8])
+
+        # Body and header paths now point at the same files from the compiled file's directory
+        self.assertEqual(records[2][5:7], (os.path.join("..", "payloads", "upload.bin"),
+                                           os.path.join("..", "headers.json")))
+
+    def test_strings_are_shared_between_records(self):
+        records = list(read_compiled_records(self.filename))
+
+        self.assertIs(records[0][2], records[3][2])
+        self.assertIs(records[0][1], records[3][1])
+
+    def test_detects_compiled_files(self):
+        self.assertTrue(is_compiled_records(self.filename))
+        self.assertFalse(is_compiled_records(self.csv_filename))
+        self.assertRaises(ValueError, CompiledRecords, self.csv_filename)
+
+    def test_shards_hold_whole_rows(self):
+        with CompiledRecords(self.filename) as compiled:
+            for shards in range(1, 6):
+                records = [record for start, end in compiled.shard_byte_ranges(shards)
+                           for record in compiled.records(start, end)]
+                self.assertEqual(records, list(compiled.records()))
@@ -0,0 +1,157 @@
+import io
+import gzip
+import zlib
+import json
+import hashlib
+import contextlib
+
+from unittest import TestCase
+
+from dex.cli import send_request
+from tools.body import DiscardBody, HashBody
+from tools.compression import ACCEPT_ENCODING, DecodingReader
+from tools.customrequest import CustomRequest
+from tools.metrics import RequestStatistics
+from tools.results import RequestResult, collect_results, format_size
+
+from tests.helpers import EchoHandler, LocalServer
+
+BODY = json.dumps([{"id": i, "name": f"item {i}", "tags": ["a", "b", "c"]} for i in range(500)]).encode("utf-8")
+
+
+def raw_deflate(data) -> bytes:
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+ENCODED = {
+    "gzip": gzip.compress(BODY),
+    "deflate": zlib.compress(BODY),
+    "raw-deflate": raw_deflate(BODY),
+}
+
+
+class CompressingHandler(EchoHandler):
+    """Serves BODY compressed with the coding named by the path when the client accepts it"""
+
+    def do_GET(self):
+        coding = self.path.strip("/")
+        content_encoding = coding.rpartition("-")[2]  # raw-deflate is sent as deflate
+        self.send_response(200)
+        if coding in ENCODED and content_encoding in self.headers.get("Accept-Encoding", ""):
+            body = ENCODED[coding]
+            self.send_header("Content-Encoding", content_encoding)
+        else:
+            body = BODY
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class CorruptHandler(EchoHandler):
+    """Claims a gzip body but sends bytes that cannot be decoded"""
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", "9")
+        self.end_headers()
+        self.wfile.write(b"not gzip!")
+
+
+class FakeResponse:
+
+    def __init__(self, body, content_encoding=None):
+        self._body = io.BytesIO(body)
+        self.content_encoding = content_encoding
+
+    def read(self, amt=None) -> bytes:
+        return self._body.read(amt)
+
+    def getheader(self, name, default=None):
+        return self.content_encoding if name == "Content-Encoding" and self.content_encoding else default
+
+
+class TestDecodingReader(TestCase):
+
+    def test_streams_every_coding(self):
+        for coding, encoded in (("gzip", ENCODED["gzip"]), ("deflate", ENCODED["deflate"]),
+                                ("deflate", ENCODED["raw-deflate"])):
+            reader = DecodingReader.wrap(FakeResponse(encoded, coding))
+            chunks = iter(lambda: reader.read(256), b"")
+
+            self.assertEqual(b"".join(chunks), BODY, coding)
+            self.assertEqual(reader.wire_size, len(encoded))
+
+    def test_reads_whole_body(self):
+        reader = DecodingReader.wrap(FakeResponse(ENCODED["gzip"], "gzip"))
+        self.assertEqual(reader.read(), BODY)
+        self.assertEqual(reader.read(), b"")
+
+    def test_stacked_codings(self):
+        reader = DecodingReader.wrap(FakeResponse(gzip.compress(zlib.compress(BODY)), "deflate, gzip"))
+        self.assertEqual(reader.read(), BODY)
+
+    def test_leaves_unknown_codings_alone(self):
+        self.assertIsNone(DecodingReader.wrap(FakeResponse(BODY)))
+        self.assertIsNone(DecodingReader.wrap(FakeResponse(BODY, "identity")))
+        self.assertIsNone(DecodingReader.wrap(FakeResponse(BODY, "compress")))
+
+    def test_corrupt_body(self):
+        reader = DecodingReader.wrap(FakeResponse(b"not gzip at all", "gzip"))
+        with self.assertRaises(ValueError):
+            reader.read(1024)
+
+
+class TestCompressedRequests(TestCase):
+
+    def send(self, server, path, body_policy=None, accept=True):
+        headers = {"Accept-Encoding": ACCEPT_ENCODING} if accept else {}
+        req = CustomRequest("GET", server.endpoint, path, "utf-8", headers, body_policy=body_policy)
+        req.send()
+        return req
+
+    def test_decodes_negotiated_bodies(self):
+        with LocalServer(CompressingHandler) as server:
+            for coding in ENCODED:
+                req = self.send(server, f"/{coding}")
+
+                self.assertEqual(req.raw_data, BODY, coding)
+                self.assertEqual(len(req.get_json()), 500)
+                self.assertEqual((req.body_size, req.wire_size), (len(BODY), len(ENCODED[coding])))
+
+    def test_identity_without_accept_encoding(self):
+        with LocalServer(CompressingHandler) as server:
+            req = self.send(server, "/gzip", accept=False)
+
+        self.assertEqual((req.body_size, req.wire_size), (len(BODY), len(BODY)))
+
+    def test_streaming_body_policies_see_decoded_bytes(self):
+        with LocalServer(CompressingHandler) as server:
+            discarded = self.send(server, "/gzip", DiscardBody())
+            hashed = self.send(server, "/gzip", HashBody())
+
+        self.assertEqual((discarded.body_size, discarded.wire_size), (len(BODY), len(ENCODED["gzip"])))
+        self.assertEqual(hashed.body_digest, f"sha256:{hashlib.sha256(BODY).hexdigest()}")
+
+    def test_sizes_in_results(self):
+        with LocalServer(CompressingHandler) as server:
+            result = RequestResult.from_request(self.send(server, "/gzip"))
+
+        self.assertEqual(result.wire_size, len(ENCODED["gzip"]))
+        self.assertIn(f"({format_size(len(ENCODED['gzip']))} on the wire)", str(result))
+        self.assertEqual(format_size(2048, 2048), "2.00 KB")
+        self.assertEqual(format_size(2048, 512), "2.00 KB (512 bytes on the wire)")
+
+    def test_corrupt_body_counts_as_errored(self):
+        stats = RequestStatistics()
+        with LocalServer(CorruptHandler) as server:
+            req = CustomRequest("GET", server.endpoint, "/", "utf-8", {"Accept-Encoding": ACCEPT_ENCODING})
+            with contextlib.redirect_stdout(io.StringIO()) as output:
+                list(stats.track(collect_results([send_request(req)])))
+
+        self.assertIn("Could not decode", output.getvalue())
+        self.assertIsNone(req.response)
+        self.assertEqual((stats.errored_requests, stats.successful_requests), (1, 0))
+        self.assertEqual(stats.latency.count, 0)
@@ -0,0 +1,113 @@
+from unittest import TestCase, mock
+
+from tools.connectionpool import ConnectionPool, TLSSessionCache
+from tools.customrequest import CustomRequest
+
+from tests.helpers import EchoHandler, LocalServer, client_context
+
+
+class DroppingHandler(EchoHandler):
+    """Closes every connection after responding without announcing it, like an idle timeout would"""
+
+    def do_GET(self):
+        super().do_GET()
+        self.close_connection = True
+
+
+class TestConnectionPool(TestCase):
+
+    def test_reuses_connections_per_host(self):
+        pool = ConnectionPool()
+        with LocalServer() as server:
+            for i in range(3):
+                req = CustomRequest("GET", server.endpoint, "/comments", "utf-8", pool=pool)
+                req.send()
+                self.assertEqual(req.status_code(), 200)
+
+                # Only the first request pays for connecting
+                self.assertEqual(req.timings.connect > 0, i == 0)
+                self.assertEqual(req.timings.tls, 0)
+                self.assertGreater(req.timings.ttfb, 0)
+                self.assertEqual(req.timings.total(), req.elapsed_time_ns)
+
+        pool.close()
+        self.assertEqual(pool.created, 1)
+        self.assertEqual(pool.reused, 2)
+
+    def test_limits_idle_connections(self):
+        pool = ConnectionPool(max_idle_per_host=1)
+        first, _ = pool.acquire("http", "example.invalid")
+        second, _ = pool.acquire("http", "example.invalid")
+        first.sock, second.sock = mock.Mock(), mock.Mock()  # Pretend both are connected
+
+        pool.release("http", "example.invalid", first)
+        pool.release("http", "example.invalid", second)
+
+        self.assertIsNone(second.sock)
+        self.assertEqual(len(pool._idle[("http", "example.invalid")]), 1)
+
+    def test_evicts_idle_connections(self):
+        pool = ConnectionPool(idle_timeout=0)
+        with LocalServer() as server:
+            req = CustomRequest("GET", server.endpoint, "/comments", "utf-8", pool=pool)
+            req.send()
+            req.send()
+
+        pool.close()
+        self.assertEqual(pool.created, 2)
+        self.assertEqual(pool.reused, 0)
+
+    def test_sweeps_expired_connections_of_every_host(self):
+        pool = ConnectionPool(idle_timeout=10)
+        with mock.patch("tools.connectionpool.time.monotonic", return_value=100.0) as monotonic:
+            old, _ = pool.acquire("http", "old.invalid")
+            old.sock = mock.Mock()
+            pool.release("http", "old.invalid", old)
+
+            # A later release for another host closes the connection that has sat idle too long
+            monotonic.return_value = 111.0
+            new, _ = pool.acquire("http", "new.invalid")
+            new.sock = mock.Mock()
+            pool.release("http", "new.invalid", new)
+
+        self.assertIsNone(old.sock)
+        self.assertEqual(len(pool._idle[("http", "old.invalid")]), 0)
+        self.assertEqual(len(pool._idle[("http", "new.invalid")]), 1)
+
+    def test_reconnects_on_stale_connection(self):
+        pool = ConnectionPool()
+        with LocalServer(DroppingHandler) as server:
+            req = CustomRequest("GET", server.endpoint, "/comments", "utf-8", pool=pool)
+            req.send()
+            req.send()
+            self.assertEqual(req.status_code(), 200)
+
+        pool.close()
+        self.assertEqual(pool.created, 1)
+        self.assertEqual(pool.reused, 1)
+
+
+class TestTLSSessionCache(TestCase):
+
+    def test_new_connections_resume_the_previous_session(self):
+        tls_sessions = TLSSessionCache(client_context())
+        pool = ConnectionPool(max_idle_per_host=0, tls_sessions=tls_sessions)  # Every request reconnects
+        with LocalServer(tls=True) as server:
+            requests = [CustomRequest("GET", server.endpoint, f"/item/{i}", "utf-8", pool=pool) for i in range(3)]
+            for req in requests:
+                req.send()
+                self.assertEqual(req.status_code(), 200)
+                self.assertGreater(req.timings.tls, 0)
+
+        self.assertEqual([req.tls_resumed for req in requests], [False, True, True])
+        self.assertEqual((tls_sessions.full_handshakes, tls_sessions.resumed_handshakes), (1, 2))
+
+    def test_pooled_connections_do_no_handshake(self):
+        pool = ConnectionPool(tls_sessions=TLSSessionCache(client_context()))
+        with LocalServer(tls=True) as server:
+            requests = [CustomRequest("GET", server.endpoint, "/item", "utf-8", pool=pool) for _ in range(2)]
+            for req in requests:
+                req.send()
+        pool.close()
+
+        self.assertEqual([req.tls_resumed for req in requests], [False, None])
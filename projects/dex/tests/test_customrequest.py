@@ -0,0 +1,51 @@
+from unittest import TestCase
+
+from tools.customrequest import CustomRequest
+
+from tests.helpers import LocalServer
+
+
+class TestRequestURL(TestCase):
+
+    def test_components(self):
+        req = CustomRequest("GET", "https://example.com:8443", "/posts/1/comments", "utf-8", querystring="a=1&b=x=y")
+
+        self.assertEqual(req.full_url(), "https://example.com:8443/posts/1/comments?a=1&b=x=y")
+        self.assertEqual(req.request_target(), "/posts/1/comments?a=1&b=x=y")
+        self.assertEqual(req.path_segments(), ("posts", "1", "comments"))
+        self.assertEqual(req.query_params(), {"a": "1", "b": "x=y"})
+
+    def test_request_target_is_percent_encoded(self):
+        req = CustomRequest("GET", "example.com", "/café menu", "utf-8", querystring="q=a b&r=%41")
+
+        self.assertEqual(req.request_target(), "/caf%C3%A9%20menu?q=a%20b&r=%41")
+        self.assertEqual(CustomRequest("GET", "example.com", "", "utf-8").request_target(), "/")
+
+    def test_mutators_invalidate_the_cached_components(self):
+        req = CustomRequest("GET", "example.com", "/comments", "utf-8")
+        self.assertEqual(req.full_url(), "http://example.com/comments")
+        self.assertEqual(req.query_params(), {})
+
+        req.add_query_param("postId", 1)
+        self.assertEqual(req.full_url(), "http://example.com/comments?postId=1")
+        self.assertEqual(req.request_target(), "/comments?postId=1")
+        self.assertEqual(req.query_params(), {"postId": "1"})
+
+        req.resource = "/posts"
+        req.endpoint = "example.org"
+        req.protocol = "https"
+        self.assertEqual(req.full_url(), "https://example.org/posts?postId=1")
+        self.assertEqual(req.path_segments(), ("posts",))
+
+    def test_prebuilt_url(self):
+        req = CustomRequest("GET", "example.com", "/comments", "utf-8", url="http://example.com/comments")
+
+        self.assertEqual(req.full_url(), "http://example.com/comments")
+        self.assertEqual(req.request_target(), "/comments")
+
+    def test_sends_the_request_target(self):
+        with LocalServer() as server:
+            req = CustomRequest("GET", server.endpoint, "/comments", "utf-8", querystring="postId=1")
+            req.send()
+
+        self.assertEqual(req.get_json(), {"path": "/comments?postId=1"})
@@ -0,0 +1,36 @@
+import time
+import threading
+
+from unittest import TestCase
+
+from tools.engine import execute_in_order
+
+
+class TestExecuteInOrder(TestCase):
+
+    def test_serial_preserves_order(self):
+        self.assertEqual(list(execute_in_order(lambda x: x * 2, range(5))), [0, 2, 4, 6, 8])
+
+    def test_concurrent_preserves_order(self):
+        def slow_first(x):
+            time.sleep(0.05 if x == 0 else 0)
+            return x
+
+        self.assertEqual(list(execute_in_order(slow_first, range(20), concurrency=4)), list(range(20)))
+
+    def test_concurrent_uses_multiple_threads(self):
+        barrier = threading.Barrier(3, timeout=2)
+
+        def wait(x):
+            barrier.wait()
+            return x
+
+        self.assertEqual(list(execute_in_order(wait, range(3), concurrency=3)), [0, 1, 2])
+
+    def test_accepts_lazy_iterables(self):
+        results = execute_in_order(lambda x: x + 1, (i for i in range(100)), concurrency=8, window=2)
+        self.assertEqual(list(results), list(range(1, 101)))
+
+    def test_invalid_concurrency(self):
+        with self.assertRaises(ValueError):
+            list(execute_in_order(lambda x: x, [1], concurrency=0))
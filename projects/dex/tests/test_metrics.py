@@ -0,0 +1,119 @@
+import random
+import statistics
+
+from types import SimpleNamespace
+from unittest import TestCase
+
+from tools.metrics import LatencyHistogram, RequestStatistics
+from tools.timing import PhaseTimings
+
+
+def target(endpoint="example.com"):
+    return SimpleNamespace(protocol="http", endpoint=endpoint)
+
+
+def completed_request(elapsed_us, status=200, coalesced=False, tls_resumed=None, endpoint="example.com",
+                      check_failures=None):
+    timings = PhaseTimings()
+    timings.ttfb = elapsed_us * 1_000
+    return SimpleNamespace(target=target(endpoint), elapsed_time_ns=elapsed_us * 1_000, timings=timings,
+                           queue_delay_ns=0, status=status, cache_status=None, coalesced=coalesced, retries=0,
+                           backoff_ns=0, tls_resumed=tls_resumed, body_size=0, wire_size=0,
+                           check_failures=check_failures)
+
+
+def errored_request(endpoint="example.com"):
+    return SimpleNamespace(target=target(endpoint), elapsed_time_ns=0, status=None, retries=0)
+
+
+class TestLatencyHistogram(TestCase):
+
+    def test_buckets_cover_every_value(self):
+        for value in list(range(0, 5000)) + [10 ** 6, 10 ** 9 + 7]:
+            lowest, highest = LatencyHistogram.bucket_range(LatencyHistogram.bucket_index(value))
+            self.assertLessEqual(lowest, value)
+            self.assertGreaterEqual(highest, value)
+            self.assertLessEqual(highest - lowest, max(value, 1) / 64)
+
+    def test_matches_statistics_module(self):
+        rng = random.Random(4)
+        values = [int(rng.lognormvariate(9, 1)) for _ in range(5000)]
+        histogram = LatencyHistogram()
+        for value in values:
+            histogram.record(value)
+
+        self.assertEqual(histogram.count, len(values))
+        self.assertEqual(histogram.total, sum(values))
+        self.assertEqual(histogram.min, min(values))
+        self.assertEqual(histogram.max, max(values))
+        self.assertAlmostEqual(histogram.mean(), statistics.mean(values), places=6)
+        self.assertAlmostEqual(histogram.variance() / statistics.variance(values), 1.0, places=9)
+
+        ordered = sorted(values)
+        for percent in (50, 90, 99, 99.9):
+            exact = ordered[round(percent * len(values) / 100) - 1]
+            self.assertAlmostEqual(histogram.percentile(percent) / exact, 1.0, delta=0.02)
+
+    def test_merge(self):
+        left, right, combined = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+        for value in range(1, 1000, 3):
+            (left if value % 2 else right).record(value)
+            combined.record(value)
+
+        left.merge(right)
+        self.assertEqual(left.counts, combined.counts)
+        self.assertEqual(left.count, combined.count)
+        self.assertAlmostEqual(left.mean(), combined.mean())
+        self.assertAlmostEqual(left.variance(), combined.variance())
+
+    def test_empty_and_single_value(self):
+        histogram = LatencyHistogram()
+        self.assertEqual(histogram.percentile(99), 0)
+        self.assertEqual(histogram.variance(), 0.0)
+
+        histogram.record(1234)
+        self.assertEqual(histogram.stdev(), 0.0)
+        self.assertEqual(histogram.percentile(50), 1234)
+
+
+class TestRequestStatistics(TestCase):
+
+    def test_counts_outcomes(self):
+        stats = RequestStatistics()
+        requests = [completed_request(1, 200), completed_request(1, 404), completed_request(1, 204), errored_request()]
+
+        self.assertEqual(list(stats.track(requests)), requests)
+        self.assertEqual(stats.successful_requests, 2)
+        self.assertEqual(stats.failed_requests, 1)
+        self.assertEqual(stats.errored_requests, 1)
+        self.assertEqual(stats.total_requests(), 4)
+        self.assertEqual(stats.latency.count, 3)
+        self.assertEqual(stats.phases["ttfb"].count, 3)
+        self.assertEqual(stats.phases["connect"].max, 0)
+
+    def test_percentiles_in_milliseconds(self):
+        stats = RequestStatistics()
+        stats.add(completed_request(1_500))
+        self.assertEqual(stats.percentiles(), {50: 1.5, 90: 1.5, 99: 1.5, 99.9: 1.5})
+
+    def test_handshakes_by_kind(self):
+        left, right = RequestStatistics(), RequestStatistics()
+        left.add(completed_request(1_000, tls_resumed=False))
+        left.add(completed_request(1_000))
+        right.add(completed_request(1_000, tls_resumed=True))
+        right.add(completed_request(1_000, tls_resumed=True))
+
+        left.merge(right)
+        self.assertEqual({kind: histogram.count for kind, histogram in left.handshakes.items()},
+                         {"full": 1, "resumed": 2})
+
+    def test_hosts(self):
+        left, right = RequestStatistics(), RequestStatistics()
+        left.add(completed_request(1_000, endpoint="a.example.com"))
+        left.add(errored_request(endpoint="b.example.com"))
+        right.add(completed_request(3_000, endpoint="a.example.com"))
+
+        left.merge(right)
+        self.assertEqual({host: histogram.count for host, histogram in left.hosts.items()},
+                         {"http://a.example.com": 2})
+        self.assertEqual(left.host_errors, {"http://b.example.com": 1})
@@ -0,0 +1,87 @@
+import os
+import json
+import hashlib
+import tempfile
+
+from unittest import TestCase
+
+from tools.customrequest import CustomRequest
+from tools.payloads import PayloadStore
+
+from tests.helpers import EchoHandler, LocalServer
+
+
+class UploadHandler(EchoHandler):
+    """Responds with the size and digest of the uploaded body and the headers it came with"""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        response = json.dumps({
+            "size": len(body),
+            "sha256": hashlib.sha256(body).hexdigest(),
+            "content_type": self.headers.get("Content-Type"),
+            "token": self.headers.get("X-Token"),
+        }).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    do_PUT = do_POST
+
+
+class TestPayloadStore(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = PayloadStore(self.directory.name)
+
+        self.data = os.urandom(256 * 1024)
+        self.write("upload.bin", self.data)
+        self.write("empty.bin", b"")
+        self.write("auth.json", json.dumps({"Content-Type": "application/octet-stream", "X-Token": 42}).encode())
+
+    def tearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    def write(self, name, data):
+        with open(os.path.join(self.directory.name, name), "wb") as file:
+            file.write(data)
+
+    def test_payloads_are_loaded_once_and_shared(self):
+        payload = self.store.payload("upload.bin")
+
+        self.assertIs(self.store.payload("upload.bin"), payload)
+        self.assertEqual(len(payload), len(self.data))
+        self.assertEqual(payload.view, self.data)
+        self.assertEqual(len(self.store.payload("empty.bin")), 0)
+
+    def test_header_sets_are_laid_over_the_defaults(self):
+        headers = self.store.headers("auth.json", {"Accept": "application/json", "Content-Type": "application/json"})
+
+        self.assertEqual(headers, {"Accept": "application/json", "Content-Type": "application/octet-stream",
+                                   "X-Token": "42"})
+        self.assertIs(self.store.headers("auth.json"), headers)
+
+    def test_rejects_header_sets_that_are_not_objects(self):
+        self.write("list.json", b"[]")
+
+        self.assertRaises(ValueError, self.store.headers, "list.json")
+
+    def test_sends_the_payload_and_headers(self):
+        payload = self.store.payload("upload.bin")
+        headers = self.store.headers("auth.json")
+
+        with LocalServer(UploadHandler) as server:
+            for method in ("POST", "PUT"):
+                req = CustomRequest(method, server.endpoint, "/upload", "utf-8", headers, body=payload)
+                req.send()
+
+                self.assertEqual(req.get_json(), {
+                    "size": len(self.data),
+                    "sha256": hashlib.sha256(self.data).hexdigest(),
+                    "content_type": "application/octet-stream",
+                    "token": "42",
+                })
@@ -0,0 +1,161 @@
+import time
+import socket
+import threading
+
+from unittest import TestCase
+
+from tools.connectionpool import ConnectionPool
+from tools.customrequest import CustomRequest
+from tools.pipeline import batched, can_pipeline, pipeline_requests
+
+from tests.helpers import EchoHandler, LocalServer
+
+
+class CountingHandler(EchoHandler):
+    """Counts the connections it is handed"""
+
+    connections = 0
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with CountingHandler.lock:
+            CountingHandler.connections += 1
+
+
+class ClosingHandler(CountingHandler):
+    """Answers only the first request on every connection and says so"""
+
+    def do_GET(self):
+        body = ('{"path": "%s"}' % self.path).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Connection", "close")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        time.sleep(0.05)  # Let the client read the response before the unanswered requests reset the connection
+
+    do_POST = do_GET
+
+
+class DroppingHandler(EchoHandler):
+    """Answers the first two requests on every connection, then drops it without saying so"""
+
+    paths = []
+
+    def do_GET(self):
+        DroppingHandler.paths.append(self.path)
+        super().do_GET()
+        if len(DroppingHandler.paths) == 2:
+            time.sleep(0.05)  # Let the client read both responses before the connection is reset
+            self.close_connection = True
+
+
+class CorruptBodyHandler(EchoHandler):
+    """Sends a gzip body that cannot be decoded for /corrupt and plain JSON otherwise"""
+
+    def do_GET(self):
+        if self.path != "/corrupt":
+            super().do_GET()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", "9")
+        self.end_headers()
+        self.wfile.write(b"not gzip!")
+
+
+class TestPipeline(TestCase):
+
+    def setUp(self):
+        CountingHandler.connections = 0
+
+    def test_batched(self):
+        self.assertEqual(list(batched(range(5), 2)), [[0, 1], [2, 3], [4]])
+
+    def test_can_pipeline(self):
+        self.assertTrue(can_pipeline(CustomRequest("get", "example.com", "/", "utf-8")))
+        self.assertFalse(can_pipeline(CustomRequest("POST", "example.com", "/", "utf-8")))
+        self.assertFalse(can_pipeline(CustomRequest("GET", "example.com", "/", "utf-8", body=b"{}")))
+
+    def test_responses_are_matched_in_order_on_one_connection(self):
+        pool = ConnectionPool()
+        with LocalServer(CountingHandler) as server:
+            requests = [CustomRequest("GET", server.endpoint, f"/item/{i}", "utf-8", pool=pool) for i in range(10)]
+            requests.append(CustomRequest("HEAD", server.endpoint, "/head", "utf-8", pool=pool))
+            requests.append(CustomRequest("GET", server.endpoint, "/missing", "utf-8", pool=pool))
+            pipeline_requests(requests, pool)
+
+            # The connection went back to the pool and is reused by the next pipeline
+            pipeline_requests([CustomRequest("GET", server.endpoint, "/again", "utf-8", pool=pool)], pool)
+
+        pool.close()
+        self.assertEqual(CountingHandler.connections, 1)
+        for i, req in enumerate(requests[:10]):
+            self.assertEqual(req.status_code(), 200)
+            self.assertEqual(req.get_json(), {"path": f"/item/{i}"})
+        self.assertEqual((requests[10].status_code(), requests[10].body_size), (200, 0))
+        self.assertEqual(requests[11].status_code(), 404)
+
+    def test_timings_add_up_per_request(self):
+        with LocalServer() as server:
+            requests = [CustomRequest("GET", server.endpoint, f"/item/{i}", "utf-8") for i in range(5)]
+            pipeline_requests(requests)
+
+        self.assertGreater(requests[0].timings.connect, 0)
+        self.assertEqual(requests[0].queue_delay_ns, 0)
+        for previous, req in zip(requests, requests[1:]):
+            self.assertGreaterEqual(req.queue_delay_ns, previous.queue_delay_ns)
+            self.assertGreater(req.elapsed_time_ns, previous.elapsed_time_ns)
+        for req in requests:
+            self.assertEqual(req.timings.total() + req.queue_delay_ns, req.elapsed_time_ns)
+
+    def test_unanswered_requests_fall_back_to_their_own_connection(self):
+        with LocalServer(ClosingHandler) as server:
+            requests = [CustomRequest("GET", server.endpoint, f"/item/{i}", "utf-8") for i in range(3)]
+            requests.append(CustomRequest("POST", server.endpoint, "/post", "utf-8"))
+            pipeline_requests(requests)
+
+        for req in requests:
+            self.assertEqual(req.status_code(), 200)
+        self.assertEqual(requests[2].get_json(), {"path": "/item/2"})
+        self.assertEqual(CountingHandler.connections, 4)
+
+    def test_connection_errors_fall_back(self):
+        sent = []
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+
+        requests = [CustomRequest("GET", f"http://127.0.0.1:{port}", "/", "utf-8") for _ in range(2)]
+        pipeline_requests(requests, fallback=sent.append)
+        self.assertEqual(sent, requests)
+
+    def test_answered_requests_are_not_sent_again_when_the_connection_drops(self):
+        DroppingHandler.paths = []
+        errors = []
+        with LocalServer(DroppingHandler) as server:
+            requests = [CustomRequest("GET", server.endpoint, f"/item/{i}", "utf-8") for i in range(5)]
+            pipeline_requests(requests, on_error=lambda *error: errors.append(error))
+
+        self.assertEqual(sorted(DroppingHandler.paths), [f"/item/{i}" for i in range(5)])
+        for i, req in enumerate(requests):
+            self.assertEqual(req.get_json(), {"path": f"/item/{i}"})
+        self.assertEqual([(host, unanswered) for host, _, unanswered in errors], [(requests[0].endpoint, 3)])
+
+    def test_undecodable_body_errors_its_request_and_falls_back_for_the_rest(self):
+        errors = []
+        pool = ConnectionPool()
+        with LocalServer(CorruptBodyHandler) as server:
+            paths = ["/item/0", "/corrupt", "/item/2", "/item/3"]
+            requests = [CustomRequest("GET", server.endpoint, path, "utf-8", pool=pool) for path in paths]
+            pipeline_requests(requests, pool, on_error=lambda *error: errors.append(error))
+
+        pool.close()
+        self.assertIsNone(requests[1].response)
+        for i in (0, 2, 3):
+            self.assertEqual(requests[i].get_json(), {"path": paths[i]})
+        self.assertEqual(len(errors), 1)
+        self.assertIsInstance(errors[0][1], ValueError)
+        self.assertEqual(errors[0][2], 2)
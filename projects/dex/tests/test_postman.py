@@ -0,0 +1,91 @@
+import os
+import json
+import tempfile
+
+from unittest import TestCase
+
+from tools.customrequest import CustomRequest
+from tools.postman import PostmanItemWriter, StatusCodeCollectionWriter, create_postman_item, merge_item_files
+from tools.results import RequestResult
+
+
+def make_result(i, status):
+    result = RequestResult.from_request(CustomRequest("GET", "https://example.com", f"/comments/{i}", "utf-8",
+                                                      {"Accept": "application/json"}, f"postId={i}"))
+    result.status = status
+    return result
+
+
+class TestStatusCodeCollectionWriter(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.template = os.path.join(directory.name, "collection_status_{}.json")
+        self.results = [make_result(i, 200 if i % 3 else 404) for i in range(10)] + [make_result(10, None)]
+
+    def load(self, status_code):
+        with open(self.template.format(status_code)) as file:
+            return json.load(file)
+
+    def test_streams_one_collection_per_status_code(self):
+        for indent in (None, 4):
+            with StatusCodeCollectionWriter(self.template, indent) as collections:
+                list(collections.track(self.results))
+
+            collection = self.load(200)
+            self.assertEqual(collection["info"]["name"], "Status Code 200 Collection")
+            self.assertEqual(collection["item"], [create_postman_item(r) for r in self.results if r.status == 200])
+            self.assertEqual(len(self.load(404)["item"]), 4)
+            self.assertEqual(set(collections.filenames()), {200, 404})
+
+    def test_empty_collection_is_valid(self):
+        with StatusCodeCollectionWriter(self.template) as collections:
+            collections.writer_class(self.template.format(500), "Empty").close()
+
+        self.assertEqual(self.load(500)["item"], [])
+
+    def test_merges_item_files(self):
+        item_files = []
+        for shard in range(3):
+            template = self.template.replace(".json", f".shard{shard}.jsonl")
+            with StatusCodeCollectionWriter(template, writer_class=PostmanItemWriter) as collections:
+                list(collections.track(self.results[shard::3]))
+            item_files.append(collections.filenames())
+
+        merge_item_files(item_files, self.template)
+
+        expected = [create_postman_item(r) for shard in range(3) for r in self.results[shard::3] if r.status == 404]
+        self.assertEqual(self.load(404)["item"], expected)
+        for filenames in item_files:
+            for filename in filenames.values():
+                self.assertFalse(os.path.exists(filename))
+
+    def test_check_counts_become_collection_variables(self):
+        for i, result in enumerate(self.results):
+            result.check_failures = ("$.id != 1",) if i % 2 else ()
+
+        with StatusCodeCollectionWriter(self.template) as collections:
+            list(collections.track(self.results))
+
+        variables = {variable["key"]: variable["value"] for variable in self.load(200)["variable"]}
+        self.assertEqual(variables, {"checks_passed": "3", "checks_failed": "3"})
+        self.assertTrue(self.load(404)["item"][1]["description"].endswith("Checks failed: $.id != 1"))
+        self.assertTrue(self.load(404)["item"][0]["description"].endswith("Checks passed"))
+
+    def test_merged_collections_get_check_variables(self):
+        template = self.template.replace(".json", ".shard0.jsonl")
+        with StatusCodeCollectionWriter(template, writer_class=PostmanItemWriter) as collections:
+            list(collections.track(self.results))
+
+        merge_item_files([collections.filenames()], self.template, checks={404: (1, 3)})
+
+        self.assertEqual(self.load(404)["variable"], [{"key": "checks_passed", "value": "1"},
+                                                      {"key": "checks_failed", "value": "3"}])
+        self.assertNotIn("variable", self.load(200))
+
+    def test_unchecked_collections_have_no_variables(self):
+        with StatusCodeCollectionWriter(self.template) as collections:
+            list(collections.track(self.results))
+
+        self.assertNotIn("variable", self.load(200))
@@ -0,0 +1,99 @@
+import io
+import pickle
+import urllib.error
+import urllib.request
+
+from unittest import TestCase
+
+from tools.metrics import RequestStatistics
+from tools.progress import ProgressReporter
+from tools.prometheus import MetricsServer, format_metrics
+
+from tests.test_metrics import completed_request, errored_request
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestProgressReporter(TestCase):
+
+    def test_summary_covers_the_last_interval(self):
+        stats, clock, stream = RequestStatistics(), FakeClock(), io.StringIO()
+        progress = ProgressReporter(stats, stream=stream, clock=clock)
+        started = list(progress.track_started(range(12)))
+        self.assertEqual(started, list(range(12)))
+
+        for result in stats.track([completed_request(1000), completed_request(5000, status=503), errored_request()]):
+            pass
+        clock.now = 2.0
+        progress.report()
+
+        line = stream.getvalue()
+        self.assertIn("[2.0s] 3 done", line)
+        self.assertIn("1.5 req/s", line)
+        self.assertIn("9 in flight", line)
+        self.assertIn("p50 1.0", line)
+        self.assertIn("2xx=1 5xx=1 error=1", line)
+
+        # The rate and percentiles only cover requests completed since the previous line
+        for result in stats.track([completed_request(8000)]):
+            pass
+        clock.now = 3.0
+        self.assertIn("4 done, 1.0 req/s, 8 in flight, p50 8.", progress.summary())
+
+    def test_label_and_background_thread(self):
+        stream = io.StringIO()
+        with ProgressReporter(RequestStatistics(), interval=0.01, stream=stream, label="[shard 1]"):
+            pass
+
+        self.assertTrue(stream.getvalue().startswith("[shard 1] ["))
+
+    def test_disabled_without_interval(self):
+        stream = io.StringIO()
+        with ProgressReporter(RequestStatistics(), interval=None, stream=stream):
+            pass
+
+        self.assertEqual(stream.getvalue(), "")
+
+
+class TestMetrics(TestCase):
+
+    def stats(self):
+        stats = RequestStatistics()
+        for result in stats.track([completed_request(1000), completed_request(3000, status=404), errored_request()]):
+            pass
+        return stats
+
+    def test_format_metrics(self):
+        text = format_metrics(self.stats(), in_flight=2)
+
+        self.assertIn('dex_requests_total{class="2xx"} 1\n', text)
+        self.assertIn('dex_requests_total{class="4xx"} 1\n', text)
+        self.assertIn('dex_requests_total{class="error"} 1\n', text)
+        self.assertIn("dex_requests_in_flight 2\n", text)
+        self.assertIn("dex_request_duration_seconds_count 2\n", text)
+        self.assertIn("dex_request_duration_seconds_sum 0.004\n", text)
+        self.assertIn('dex_request_duration_seconds{quantile="0.5"} 0.001', text)
+
+    def test_server_serves_metrics(self):
+        with MetricsServer(self.stats(), lambda: 5) as server:
+            with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics") as response:
+                self.assertTrue(response.headers["Content-Type"].startswith("text/plain; version=0.0.4"))
+                self.assertIn("dex_requests_in_flight 5", response.read().decode())
+
+            with self.assertRaises(urllib.error.HTTPError) as raised:
+                urllib.request.urlopen(f"http://127.0.0.1:{server.port}/")
+            raised.exception.close()
+            self.assertEqual(raised.exception.code, 404)
+
+    def test_statistics_survive_pickling(self):
+        stats = pickle.loads(pickle.dumps(self.stats()))
+        stats.add(completed_request(2000))
+
+        self.assertEqual(stats.snapshot().status_classes, {"2xx": 2, "4xx": 1, "error": 1})
@@ -0,0 +1,80 @@
+import time
+
+from unittest import TestCase
+
+from tools.engine import execute_at_rate
+from tools.ratelimit import TokenBucket
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucket(TestCase):
+
+    def test_spaces_reservations_at_rate(self):
+        clock = FakeClock()
+        bucket = TokenBucket(10, clock=clock)
+
+        self.assertEqual([round(bucket.reserve(), 6) for _ in range(4)], [0.0, 0.1, 0.2, 0.3])
+
+    def test_burst_capacity(self):
+        clock = FakeClock()
+        bucket = TokenBucket(10, capacity=3, clock=clock)
+
+        self.assertEqual([round(bucket.reserve(), 6) for _ in range(4)], [0.0, 0.0, 0.0, 0.1])
+
+    def test_refills_while_idle(self):
+        clock = FakeClock()
+        bucket = TokenBucket(10, clock=clock)
+        bucket.reserve()
+
+        clock.now = 5.0
+        self.assertEqual(bucket.reserve(), 5.0)
+
+    def test_ramp_up(self):
+        clock = FakeClock()
+        bucket = TokenBucket(100, ramp_up=10, clock=clock)
+
+        self.assertEqual(bucket.current_rate(0.0), 0.0)
+        self.assertEqual(bucket.current_rate(5.0), 50.0)
+        self.assertEqual(bucket.current_rate(20.0), 100.0)
+
+        # 100 tokens/s reached after 10 s means t ** 2 * 5 tokens by time t during the ramp
+        self.assertEqual([round(bucket.reserve(), 6) for _ in range(3)], [0.0, round(0.2 ** 0.5, 6), round(0.4 ** 0.5, 6)])
+
+        # Once the ramp is over tokens arrive every 10 ms
+        clock.now = 10.0
+        self.assertEqual(bucket.reserve(), 10.0)
+        self.assertAlmostEqual(bucket.reserve(), 10.01)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            TokenBucket(0)
+        with self.assertRaises(ValueError):
+            TokenBucket(1, capacity=0)
+
+
+class TestExecuteAtRate(TestCase):
+
+    def test_schedules_open_loop(self):
+        def slow(item, intended_time):
+            time.sleep(0.05)
+            return item, time.monotonic() - intended_time
+
+        results = list(execute_at_rate(slow, range(10), TokenBucket(200), concurrency=1))
+
+        self.assertEqual([item for item, _ in results], list(range(10)))
+        # A single worker cannot keep up with the schedule, so later items see the queueing delay
+        self.assertGreater(results[-1][1], 0.3)
+
+    def test_stops_after_duration(self):
+        results = list(execute_at_rate(lambda item, _: item, iter(range(10_000)), TokenBucket(100), duration=0.2))
+
+        self.assertLess(len(results), 40)
+        self.assertEqual(results, list(range(len(results))))
@@ -0,0 +1,68 @@
+import io
+import os
+import csv
+import json
+import tempfile
+
+from unittest import TestCase, mock
+
+from tools.customrequest import CustomRequest
+from tools.requestlog import CSV_COLUMNS, RequestLogWriter
+from tools.results import RequestResult
+
+
+def make_results(count):
+    results = []
+    for i in range(count):
+        result = RequestResult.from_request(CustomRequest("GET", "https://example.com", f"/comments/{i}", "utf-8"))
+        result.status = 200
+        result.elapsed_time_ns = i * 1_000
+        results.append(result)
+
+    return results
+
+
+class TestRequestLogWriter(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def read_lines(self, filename):
+        with open(os.path.join(self.directory, filename)) as file:
+            return file.read().splitlines()
+
+    def test_jsonl(self):
+        with RequestLogWriter(os.path.join(self.directory, "requests.jsonl"), batch_size=3) as writer:
+            for result in make_results(10):
+                writer.write(result)
+
+        records = [json.loads(line) for line in self.read_lines("requests.jsonl")]
+        self.assertEqual(len(records), 10)
+        self.assertEqual(records[4]["url"], "https://example.com/comments/4")
+        self.assertEqual(records[4]["elapsed_ns"], 4_000)
+        self.assertEqual(records[4]["status"], 200)
+
+    def test_csv_writes_header_once(self):
+        filename = os.path.join(self.directory, "requests.csv")
+        for _ in range(2):
+            with RequestLogWriter(filename, "csv", background=True, batch_size=4) as writer:
+                list(writer.track(make_results(5)))
+
+        rows = list(csv.reader(self.read_lines("requests.csv")))
+        self.assertEqual(rows[0], list(CSV_COLUMNS))
+        self.assertEqual(len(rows), 11)
+
+    def test_text_and_echo(self):
+        results = make_results(2)
+        with mock.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+            with RequestLogWriter(os.path.join(self.directory, "requests.log"), "text", echo=True) as writer:
+                list(writer.track(results))
+
+        self.assertEqual(self.read_lines("requests.log"), [str(result) for result in results])
+        self.assertEqual(stdout.getvalue().splitlines(), [str(result) for result in results])
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            RequestLogWriter(os.path.join(self.directory, "requests.xml"), "xml")
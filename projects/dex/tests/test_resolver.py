@@ -0,0 +1,103 @@
+import socket
+
+from unittest import TestCase
+
+from tools.connectionpool import ConnectionPool
+from tools.customrequest import CustomRequest
+from tools.resolver import DNSCache, create_connection, endpoint_address
+
+from tests.helpers import LocalServer
+
+
+class FakeResolver:
+    """Stands in for socket.getaddrinfo, answering with a fixed list of IPv4 addresses"""
+
+    def __init__(self, *ips):
+        self.ips = ips
+        self.calls = 0
+
+    def __call__(self, host, port, family=0, type=0):
+        self.calls += 1
+        if not self.ips:
+            raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (ip, port)) for ip in self.ips]
+
+
+class TestEndpointAddress(TestCase):
+
+    def test_default_ports(self):
+        self.assertEqual(endpoint_address("https://Example.com"), ("example.com", 443))
+        self.assertEqual(endpoint_address("http://example.com"), ("example.com", 80))
+        self.assertEqual(endpoint_address("example.com:8080"), ("example.com", 8080))
+        self.assertEqual(endpoint_address("https://[::1]:8443"), ("::1", 8443))
+
+
+class TestDNSCache(TestCase):
+
+    def test_caches_until_the_ttl_expires(self):
+        now = [0.0]
+        resolve = FakeResolver("10.0.0.1")
+        cache = DNSCache(ttl=60, resolve=resolve, clock=lambda: now[0])
+
+        for _ in range(3):
+            self.assertEqual(cache.addresses("example.com", 80), [(socket.AF_INET, ("10.0.0.1", 80))])
+        self.assertEqual(resolve.calls, 1)
+
+        now[0] = 61.0
+        cache.addresses("EXAMPLE.com", 80)
+        self.assertEqual((resolve.calls, cache.lookups), (2, 2))
+
+    def test_zero_ttl_resolves_every_time(self):
+        resolve = FakeResolver("10.0.0.1")
+        cache = DNSCache(ttl=0, resolve=resolve)
+        cache.addresses("example.com", 80)
+        cache.addresses("example.com", 80)
+        self.assertEqual(resolve.calls, 2)
+
+    def test_connections_take_addresses_in_turn(self):
+        cache = DNSCache(resolve=FakeResolver("10.0.0.1", "10.0.0.2", "10.0.0.3"))
+
+        first = [cache.next_addresses("example.com", 80)[0][1][0] for _ in range(4)]
+        self.assertEqual(first, ["10.0.0.1", "10.0.0.2", "10.0.0.3", "10.0.0.1"])
+
+    def test_prefetch_ahead_resolves_each_host_once_as_it_appears(self):
+        resolve = FakeResolver("10.0.0.1")
+        cache = DNSCache(resolve=resolve)
+        requests = [CustomRequest("GET", endpoint, "/", "utf-8")
+                    for endpoint in ("http://a.example", "b.example:8080", "http://a.example")]
+
+        self.assertEqual(list(cache.prefetch_ahead(requests)), requests)
+        self.assertEqual(resolve.calls, 2)
+
+        errors = []
+        list(DNSCache(resolve=FakeResolver()).prefetch_ahead(requests[:1], lambda *error: errors.append(error)))
+        self.assertEqual([(host, port) for host, port, _ in errors], [("a.example", 80)])
+
+
+class TestResolvedConnections(TestCase):
+
+    def test_falls_back_to_the_next_address(self):
+        with socket.socket() as unused:
+            unused.bind(("127.0.0.1", 0))
+            closed_port = unused.getsockname()[1]
+
+        with LocalServer() as server:
+            addresses = [("127.0.0.1", closed_port), ("127.0.0.1", server.server.server_port)]
+            cache = DNSCache(resolve=lambda *args: [(socket.AF_INET, socket.SOCK_STREAM, 6, "", address)
+                                                    for address in addresses])
+            sock, dns_ns = create_connection(("dex.test", 80), 5, resolver=cache)
+            with sock:
+                self.assertEqual(sock.getpeername(), addresses[1])
+
+    def test_requests_resolve_once_and_time_the_lookup(self):
+        resolve = FakeResolver("127.0.0.1")
+        pool = ConnectionPool(max_idle_per_host=0, resolver=DNSCache(resolve=resolve))  # Every request reconnects
+        with LocalServer() as server:
+            endpoint = server.endpoint.replace("127.0.0.1", "dex.test")
+            requests = [CustomRequest("GET", endpoint, "/item", "utf-8", pool=pool) for _ in range(3)]
+            for req in requests:
+                req.send()
+                self.assertEqual(req.status_code(), 200)
+                self.assertGreater(req.timings.dns, 0)
+
+        self.assertEqual(resolve.calls, 1)
@@ -0,0 +1,61 @@
+import sys
+
+from unittest import TestCase
+
+from tools.customrequest import CustomRequest
+from tools.postman import create_postman_item
+from tools.results import RequestResult, TargetTable, collect_results
+
+from tests.helpers import LocalServer
+
+
+class TestRequestResult(TestCase):
+
+    def test_summarizes_sent_request(self):
+        with LocalServer() as server:
+            req = CustomRequest("GET", server.endpoint, "/comments", "utf-8", {"Accept": "application/json"}, "postId=1")
+            req.send()
+
+        result = RequestResult.from_request(req)
+
+        self.assertEqual(result.status, 200)
+        self.assertEqual(result.elapsed_time_ns, req.elapsed_time_ns)
+        self.assertEqual(result.body_size, len(req.raw_data))
+        self.assertEqual(result.target.full_url, req.full_url())
+        self.assertEqual(str(result), str(req))
+        self.assertFalse(hasattr(result, "__dict__"))
+
+        item = create_postman_item(result)
+        self.assertEqual(item["request"]["url"]["query"], [{"key": "postId", "value": "1"}])
+
+    def test_unsent_request(self):
+        req = CustomRequest("GET", "https://example.com", "/comments", "utf-8")
+        result = RequestResult.from_request(req)
+
+        self.assertIsNone(result.status)
+        self.assertIsNone(result.request_time)
+        self.assertTrue(str(result).startswith("status='None', when='None'"))
+
+    def test_targets_are_shared(self):
+        headers = {"Accept": "application/json"}
+        requests = [CustomRequest("GET", "example.com", "/comments", "utf-8", headers, f"postId={i % 2}")
+                    for i in range(10)]
+        targets = TargetTable()
+
+        results = list(collect_results(requests, targets))
+
+        self.assertEqual(len(targets), 2)
+        self.assertIs(results[0].target, results[2].target)
+        self.assertIsNot(results[0].target, results[1].target)
+        self.assertLess(sys.getsizeof(results[0]), sys.getsizeof(requests[0].__dict__))
+
+    def test_target_table_is_bounded(self):
+        targets = TargetTable(max_size=3)
+        first = targets.intern(CustomRequest("GET", "example.com", "/comments", "utf-8", {}, "id=0"))
+
+        for i in range(1, 10):
+            targets.intern(CustomRequest("GET", "example.com", "/comments", "utf-8", {}, f"id={i}"))
+            targets.intern(CustomRequest("GET", "example.com", "/comments", "utf-8", {}, "id=0"))
+
+        self.assertEqual(len(targets), 3)
+        self.assertIs(targets.intern(CustomRequest("GET", "example.com", "/comments", "utf-8", {}, "id=0")), first)
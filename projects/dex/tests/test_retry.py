@@ -0,0 +1,176 @@
+import time
+
+from unittest import TestCase
+
+from tools.customrequest import CustomRequest
+from tools.retry import CircuitBreaker, CircuitOpenError, RetryPolicy
+
+from tests.helpers import EchoHandler, LocalServer
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FlakyHandler(EchoHandler):
+    """Answers 503 Service Unavailable until `failures` requests have been refused"""
+
+    failures = 0
+
+    def do_GET(self):
+        if FlakyHandler.failures:
+            FlakyHandler.failures -= 1
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        super().do_GET()
+
+    do_POST = do_GET
+
+
+class StallingHandler(EchoHandler):
+    """Takes longer to answer than any test is willing to wait"""
+
+    def do_GET(self):
+        time.sleep(0.5)
+        try:
+            super().do_GET()
+        except BrokenPipeError:
+            pass  # The client gave up waiting
+
+
+class TestRetryPolicy(TestCase):
+
+    def test_backs_off_exponentially_up_to_the_limit(self):
+        policy = RetryPolicy(5, backoff=0.1, max_backoff=0.5, jitter=False)
+
+        self.assertEqual([round(policy.delay(retries), 6) for retries in range(5)], [0.1, 0.2, 0.4, 0.5, 0.5])
+
+    def test_full_jitter(self):
+        policy = RetryPolicy(5, backoff=0.1, rng=lambda: 0.5)
+
+        self.assertAlmostEqual(policy.delay(2), 0.2)
+
+    def test_only_idempotent_methods_are_retried(self):
+        policy = RetryPolicy(2)
+
+        self.assertTrue(policy.can_retry("GET", 1))
+        self.assertFalse(policy.can_retry("GET", 2))
+        self.assertFalse(policy.can_retry("POST", 0))
+
+
+class CorruptBodyHandler(EchoHandler):
+    """Claims a gzip body but sends bytes that cannot be decoded"""
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", "9")
+        self.end_headers()
+        self.wfile.write(b"not gzip!")
+
+
+class TestCircuitBreaker(TestCase):
+
+    def test_opens_after_consecutive_failures_and_recovers(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+
+        breaker.record_failure("host")
+        breaker.allow("host")
+        breaker.record_failure("host")
+        self.assertRaises(CircuitOpenError, breaker.allow, "host")
+
+        # A single trial request is let through once the reset timeout has passed
+        clock.now = 10
+        breaker.allow("host")
+        self.assertRaises(CircuitOpenError, breaker.allow, "host")
+        self.assertEqual(breaker.rejected, 2)
+
+        breaker.record_success("host")
+        breaker.allow("host")
+        self.assertFalse(breaker.is_open("host"))
+
+    def test_failed_trial_keeps_the_circuit_open(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+
+        breaker.record_failure("host")
+        clock.now = 10
+        breaker.allow("host")
+        breaker.record_failure("host")
+
+        clock.now = 15
+        self.assertRaises(CircuitOpenError, breaker.allow, "host")
+
+
+class TestRequestRetries(TestCase):
+
+    def test_retries_unavailable_responses(self):
+        FlakyHandler.failures = 2
+        with LocalServer(FlakyHandler) as server:
+            req = CustomRequest("GET", server.endpoint, "/flaky", "utf-8", retry=RetryPolicy(3, backoff=0.01))
+            req.send()
+
+        self.assertEqual(req.status_code(), 200)
+        self.assertEqual(req.retries, 2)
+        self.assertGreater(req.backoff_ns, 0)
+        self.assertGreaterEqual(req.elapsed_time_ns, req.backoff_ns + req.timings.total())
+
+    def test_gives_up_after_max_retries(self):
+        FlakyHandler.failures = 5
+        with LocalServer(FlakyHandler) as server:
+            req = CustomRequest("GET", server.endpoint, "/flaky", "utf-8", retry=RetryPolicy(1, backoff=0.01))
+            req.send()
+
+        self.assertEqual(req.status_code(), 503)
+        self.assertEqual(req.retries, 1)
+
+    def test_does_not_retry_post(self):
+        FlakyHandler.failures = 1
+        with LocalServer(FlakyHandler) as server:
+            req = CustomRequest("POST", server.endpoint, "/flaky", "utf-8", retry=RetryPolicy(3, backoff=0.01))
+            req.send()
+
+        self.assertEqual(req.status_code(), 503)
+        self.assertEqual(req.retries, 0)
+
+    def test_read_timeout(self):
+        with LocalServer(StallingHandler) as server:
+            req = CustomRequest("GET", server.endpoint, "/slow", "utf-8", timeout=(1.0, 0.05),
+                                retry=RetryPolicy(1, backoff=0.01))
+            self.assertRaises(TimeoutError, req.send)
+
+        self.assertIsNone(req.response)
+        self.assertEqual(req.retries, 1)
+
+    def test_trial_ending_in_any_error_keeps_the_circuit_usable(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+
+        with LocalServer(CorruptBodyHandler) as server:
+            breaker.record_failure(server.endpoint)
+
+            clock.now = 10
+            trial = CustomRequest("GET", server.endpoint, "/", "utf-8", breaker=breaker)
+            self.assertRaises(ValueError, trial.send)
+
+            # The failed trial reopened the circuit rather than leaving the host stuck in its trial
+            clock.now = 20
+            self.assertRaises(ValueError, CustomRequest("GET", server.endpoint, "/", "utf-8", breaker=breaker).send)
+
+    def test_breaker_stops_sending_to_a_failing_host(self):
+        breaker = CircuitBreaker(failure_threshold=2)
+        for _ in range(2):
+            req = CustomRequest("GET", "http://127.0.0.1:1", "/", "utf-8", breaker=breaker)
+            self.assertRaises(ConnectionRefusedError, req.send)
+
+        req = CustomRequest("GET", "http://127.0.0.1:1", "/", "utf-8", breaker=breaker)
+        self.assertRaises(CircuitOpenError, req.send)
@@ -0,0 +1,104 @@
+import time
+import threading
+
+from unittest import TestCase
+
+from tools.scheduler import FairQueue, execute_fair, parse_host_weight
+
+
+class TestFairQueue(TestCase):
+
+    def fill(self, queue, items):
+        for host, item in items:
+            queue.put(host, item)
+
+    def drain(self, queue):
+        taken = []
+        while True:
+            next_item = queue.take()
+            if next_item is None:
+                return taken
+            taken.append(next_item[1])
+            queue.done(next_item[0])
+
+    def test_round_robin(self):
+        queue = FairQueue()
+        self.fill(queue, [("a", "a1"), ("a", "a2"), ("a", "a3"), ("b", "b1"), ("c", "c1"), ("b", "b2")])
+
+        self.assertEqual(self.drain(queue), ["a1", "b1", "c1", "a2", "b2", "a3"])
+        self.assertEqual(len(queue), 0)
+
+    def test_weights(self):
+        queue = FairQueue(weights={"a": 3})
+        self.fill(queue, [("a", f"a{i}") for i in range(5)] + [("b", f"b{i}") for i in range(3)])
+
+        self.assertEqual(self.drain(queue), ["a0", "a1", "a2", "b0", "a3", "a4", "b1", "b2"])
+
+    def test_host_limit(self):
+        queue = FairQueue(host_limit=2)
+        self.fill(queue, [("a", f"a{i}") for i in range(4)] + [("b", "b0")])
+
+        taken = [queue.take() for _ in range(4)]
+        self.assertEqual(taken, [("a", "a0"), ("b", "b0"), ("a", "a1"), None])
+
+        queue.done("a")
+        self.assertEqual(queue.take(), ("a", "a2"))
+
+    def test_parse_host_weight(self):
+        self.assertEqual(parse_host_weight("example.com:8443=3"), ("example.com:8443", 3))
+        for value in ("example.com", "=2", "example.com=0", "example.com=x"):
+            with self.assertRaises(ValueError):
+                parse_host_weight(value)
+
+
+class TestExecuteFair(TestCase):
+
+    def test_slow_host_does_not_hold_up_the_others(self):
+        in_flight = {"slow": 0, "fast": 0}
+        most_in_flight = {"slow": 0, "fast": 0}
+        lock = threading.Lock()
+
+        def send(item):
+            host, _ = item
+            with lock:
+                in_flight[host] += 1
+                most_in_flight[host] = max(most_in_flight[host], in_flight[host])
+            time.sleep(0.2 if host == "slow" else 0.001)
+            with lock:
+                in_flight[host] -= 1
+            return item
+
+        # The slow host's requests come first, without a limit they would take every worker
+        items = [("slow", i) for i in range(8)] + [("fast", i) for i in range(40)]
+        started = time.monotonic()
+        results = []
+        for result in execute_fair(send, items, key=lambda item: item[0], concurrency=4, host_limit=2):
+            results.append((result, time.monotonic() - started))
+
+        self.assertEqual(sorted(result for result, _ in results), sorted(items))
+        self.assertEqual(most_in_flight["slow"], 2)
+
+        fast_done = max(elapsed for (host, _), elapsed in results if host == "fast")
+        slow_done = max(elapsed for (host, _), elapsed in results if host == "slow")
+        self.assertLess(fast_done, slow_done / 2)
+
+    def test_capped_slow_host_does_not_slow_the_others(self):
+        def send(item):
+            time.sleep(0.05 if item[0] == "slow" else 0.001)
+            return item
+
+        # Every tenth record is for the slow host, enough of them to fill the backlog while it is at its limit
+        items = [("slow" if i % 10 == 0 else "fast", i) for i in range(400)]
+        started = time.monotonic()
+        finished = {}
+        for host, _ in execute_fair(send, items, key=lambda item: item[0], concurrency=4, host_limit=1, backlog=8):
+            finished[host] = time.monotonic() - started
+
+        # 360 fast items take about 0.4 s at their own pace, the 40 slow ones 2 s
+        self.assertLess(finished["fast"], finished["slow"] / 2)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            list(execute_fair(str, [1], concurrency=0))
+        with self.assertRaises(ValueError):
+            list(execute_fair(str, [1], host_limit=0))
@@ -0,0 +1,38 @@
+import os
+import tempfile
+
+from unittest import TestCase
+
+from tools.sharding import shard_byte_ranges
+from tools.translation import convert_records_to_csv, read_records_from_csv
+
+
+class TestReadRecordsFromCsv(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        self.records = [["GET", "https://example.com", f"/comments/{i}", f"postId={i}", "utf-8"] for i in range(250)]
+        self.filename = os.path.join(directory.name, "records.csv")
+        convert_records_to_csv(self.records, self.filename)
+
+    def test_reads_every_record(self):
+        self.assertEqual(list(read_records_from_csv(self.filename)), self.records)
+
+    def test_is_lazy(self):
+        records = read_records_from_csv(self.filename)
+        self.assertEqual(next(records), self.records[0])
+        records.close()
+
+    def test_shards_partition_the_records(self):
+        for shards in (1, 2, 3, 7, 64, 5000):
+            records = []
+            for start, end in shard_byte_ranges(self.filename, shards):
+                records.extend(read_records_from_csv(self.filename, start, end))
+
+            self.assertEqual(records, self.records, f"{shards} shards")
+
+    def test_invalid_shard_count(self):
+        with self.assertRaises(ValueError):
+            shard_byte_ranges(self.filename, 0)
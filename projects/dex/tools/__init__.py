@@ -1,3 +1,29 @@
+from .body import BODY_POLICIES, BodyPolicy, BufferBody, DiscardBody, FileBody, HashBody
+from .cache import CachedResponse, ResponseCache
+from .checks import Check, CheckSet, parse_json_path, run_checks
+from .coalesce import IDEMPOTENT_METHODS, RequestCoalescer
+from .compiled import CompiledRecords, compile_records, is_compiled_records, read_compiled_records
+from .compression import ACCEPT_ENCODING, ENCODINGS, DecodingReader
+from .connectionpool import ConnectionPool, TLSSessionCache
 from .customrequest import CustomRequest
-from .postman import generate_collections_by_status_code
+from .engine import execute_at_rate, execute_in_order
+from .metrics import LatencyHistogram, RequestStatistics, us_to_ms
+from .payloads import Payload, PayloadStore
+from .pipeline import PIPELINE_METHODS, batched, can_pipeline, pipeline_requests
+from .postman import (
+    PostmanCollectionWriter,
+    PostmanItemWriter,
+    StatusCodeCollectionWriter,
+    generate_collections_by_status_code,
+    merge_item_files,
+)
+from .progress import ProgressReporter
+from .prometheus import MetricsServer, format_metrics
+from .ratelimit import TokenBucket
+from .requestlog import LOG_FORMATS, RequestLogWriter
+from .resolver import DNSCache, endpoint_address
+from .results import RequestResult, RequestTarget, TargetTable, collect_results, format_size
+from .retry import RETRYABLE_ERRORS, CircuitBreaker, CircuitOpenError, RetryPolicy
+from .scheduler import FairQueue, execute_fair, parse_host_weight, request_host
+from .sharding import run_sharded, shard_byte_ranges
 from .translation import read_records_from_csv
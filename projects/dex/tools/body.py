@@ -0,0 +1,90 @@
+import os
+import hashlib
+import itertools
+
+
+class BodyPolicy:
+    """Decides what happens to a response body as it is read off the connection"""
+
+    CHUNK_SIZE = 64 * 1024
+
+    def consume(self, req, response) -> int:
+        """
+        Read the whole response body.
+
+        :param req: The CustomRequest the response belongs to
+        :param response: The HTTPResponse to read from
+        :return: The number of body bytes read
+        """
+        size = 0
+        for chunk in self.chunks(response):
+            size += len(chunk)
+
+        return size
+
+    @classmethod
+    def chunks(cls, response):
+        while True:
+            chunk = response.read(cls.CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+class BufferBody(BodyPolicy):
+    """Keep the whole body in memory as req.raw_data"""
+
+    def consume(self, req, response) -> int:
+        req.raw_data = response.read()
+        return len(req.raw_data)
+
+
+class DiscardBody(BodyPolicy):
+    """Throw the body away, only counting its bytes"""
+
+
+class HashBody(BodyPolicy):
+    """Keep only a hex digest of the body in req.body_digest"""
+
+    def __init__(self, algorithm="sha256"):
+        hashlib.new(algorithm)  # Fail early on an unknown algorithm
+        self.algorithm = algorithm
+
+    def consume(self, req, response) -> int:
+        digest = hashlib.new(self.algorithm)
+        size = 0
+        for chunk in self.chunks(response):
+            digest.update(chunk)
+            size += len(chunk)
+
+        req.body_digest = f"{self.algorithm}:{digest.hexdigest()}"
+        return size
+
+
+class FileBody(BodyPolicy):
+    """Stream each body into its own numbered file in a directory, recorded in req.body_path"""
+
+    def __init__(self, directory="output", prefix="response"):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.prefix = prefix
+        self._sequence = itertools.count(1)
+
+    def consume(self, req, response) -> int:
+        path = os.path.join(self.directory, f"{self.prefix}_{next(self._sequence):08d}.body")
+        size = 0
+        with open(path, "wb") as file:
+            for chunk in self.chunks(response):
+                file.write(chunk)
+                size += len(chunk)
+
+        req.body_path = path
+        return size
+
+
+BODY_POLICIES = {
+    "buffer": BufferBody,
+    "discard": DiscardBody,
+    "hash": HashBody,
+    "file": FileBody,
+}
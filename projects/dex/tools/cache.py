@@ -0,0 +1,261 @@
+import io
+import time
+import shelve
+import threading
+
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+
+CACHEABLE_METHODS = ("GET", "HEAD")
+
+# Status codes that may be cached without explicit freshness information (RFC 9110, section 15.1)
+CACHEABLE_STATUS_CODES = (200, 203, 204, 300, 301, 308, 404, 405, 410, 414, 501)
+
+# Request headers that always take part in matching a cached response, on top of the ones named by Vary
+ALWAYS_VARY = ("authorization",)
+
+
+def parse_cache_control(value) -> dict:
+    """Parse a Cache-Control header into a dict of lower-case directive names to values (or True)"""
+    directives = {}
+    for directive in (value or "").split(","):
+        name, _, argument = directive.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"') if argument else True
+
+    return directives
+
+
+def header_value(headers, name):
+    """Case-insensitively look up a header in a dict of request headers"""
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+
+    return None
+
+
+class CachedResponse:
+    """Stands in for an http.client.HTTPResponse when a request is answered from the cache"""
+
+    def __init__(self, entry):
+        self.status = entry.status
+        self.reason = entry.reason
+        self.headers = entry.headers
+        self.will_close = False
+        self._body = io.BytesIO(entry.body)
+
+    def read(self, amt=None) -> bytes:
+        return self._body.read(amt)
+
+    def getheader(self, name, default=None):
+        for key, value in self.headers:
+            if key.lower() == name.lower():
+                return value
+
+        return default
+
+    def getheaders(self) -> list:
+        return list(self.headers)
+
+
+class CacheEntry:
+    """A stored response and the information needed to decide whether it is still fresh"""
+
+    __slots__ = ("status", "reason", "headers", "body", "vary", "expires_at", "etag", "last_modified", "no_cache")
+
+    def __init__(self, status, reason, headers, body, vary, expires_at, etag=None, last_modified=None,
+                 no_cache=False):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+        self.vary = vary  # Request header values the response was selected with
+        self.expires_at = expires_at  # POSIX timestamp after which the entry must be revalidated
+        self.etag = etag
+        self.last_modified = last_modified
+        self.no_cache = no_cache
+
+    def is_fresh(self, now) -> bool:
+        return not self.no_cache and now < self.expires_at
+
+    def can_revalidate(self) -> bool:
+        return self.etag is not None or self.last_modified is not None
+
+    def conditional_headers(self) -> dict:
+        headers = {}
+        if self.etag is not None:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified is not None:
+            headers["If-Modified-Since"] = self.last_modified
+
+        return headers
+
+
+class ResponseCache:
+    """
+    A thread-safe HTTP response cache for idempotent requests with LRU and TTL eviction.
+
+    Entries are keyed on method and full URL and only match requests that agree on the headers named by
+    the response's Vary header (plus Authorization). Freshness comes from Cache-Control max-age or
+    Expires, falling back to `default_ttl` seconds. Stale entries with an ETag or Last-Modified header
+    are revalidated with a conditional request instead of being fetched again.
+
+    When `path` is given entries are kept in a shelve database at that path so they survive between runs.
+    """
+
+    def __init__(self, max_entries=1024, default_ttl=60.0, max_body_size=1024 * 1024, path=None,
+                 clock=time.time):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.max_body_size = max_body_size
+        self.clock = clock
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+        self._lock = threading.Lock()
+        self._shelf = shelve.open(path) if path else None
+
+        # Keys in least to most recently used order, mapped to the entry itself when kept in memory
+        self._entries = OrderedDict()
+        if self._shelf is not None:
+            for key in self._shelf.keys():
+                self._entries[key] = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(req) -> str:
+        return f"{req.method} {req.full_url()}"
+
+    @staticmethod
+    def accepts(req) -> bool:
+        return req.method in CACHEABLE_METHODS
+
+    def is_fresh(self, entry) -> bool:
+        return entry.is_fresh(self.clock())
+
+    def lookup(self, req):
+        """Return the entry stored for the request, fresh or stale, or None"""
+        key = self.key(req)
+
+        with self._lock:
+            if key not in self._entries:
+                return None
+
+            entry = self._entries[key] if self._shelf is None else self._shelf.get(key)
+            if entry is None:
+                del self._entries[key]
+                return None
+
+            if any(header_value(req.headers, name) != value for name, value in entry.vary.items()):
+                return None
+
+            self._entries.move_to_end(key)
+            return entry
+
+    def store(self, req, response, body):
+        """Store a response if it may be cached, returning the new entry or None"""
+        if response.status not in CACHEABLE_STATUS_CODES or len(body) > self.max_body_size:
+            return None
+
+        cache_control = parse_cache_control(response.getheader("Cache-Control"))
+        vary = [name.strip().lower() for name in (response.getheader("Vary") or "").split(",") if name.strip()]
+        if "no-store" in cache_control or "*" in vary:
+            return None
+
+        lifetime = self.freshness_lifetime(response, cache_control)
+        etag = response.getheader("ETag")
+        last_modified = response.getheader("Last-Modified")
+        if lifetime <= 0 and etag is None and last_modified is None:
+            return None  # Would be stale straight away with no way to revalidate it
+
+        entry = CacheEntry(
+            response.status,
+            response.reason,
+            response.getheaders(),
+            body,
+            {name: header_value(req.headers, name) for name in set(vary) | set(ALWAYS_VARY)},
+            self.clock() + lifetime,
+            etag,
+            last_modified,
+            "no-cache" in cache_control,
+        )
+        self._put(self.key(req), entry)
+
+        return entry
+
+    def refresh(self, req, entry, response):
+        """Update a stale entry after the server confirmed it with a 304 Not Modified response"""
+        cache_control = parse_cache_control(response.getheader("Cache-Control"))
+        entry.expires_at = self.clock() + self.freshness_lifetime(response, cache_control)
+        entry.etag = response.getheader("ETag") or entry.etag
+        entry.last_modified = response.getheader("Last-Modified") or entry.last_modified
+        self._put(self.key(req), entry)
+
+    def freshness_lifetime(self, response, cache_control) -> float:
+        """Return how many seconds a response stays fresh"""
+        max_age = cache_control.get("max-age")
+        if max_age is not None:
+            try:
+                lifetime = float(max_age)
+            except ValueError:
+                return 0.0
+        else:
+            expires = response.getheader("Expires")
+            if expires is None:
+                return self.default_ttl
+
+            try:
+                lifetime = parsedate_to_datetime(expires).timestamp() - self.clock()
+            except (TypeError, ValueError):
+                return 0.0
+
+        try:
+            lifetime -= float(response.getheader("Age") or 0)
+        except ValueError:
+            pass
+
+        return max(lifetime, 0.0)
+
+    def record(self, cache_status):
+        with self._lock:
+            if cache_status == "hit":
+                self.hits += 1
+            elif cache_status == "revalidated":
+                self.revalidations += 1
+            elif cache_status == "miss":
+                self.misses += 1
+
+    def _put(self, key, entry):
+        with self._lock:
+            if self._shelf is None:
+                self._entries[key] = entry
+            else:
+                self._shelf[key] = entry
+                self._entries[key] = None
+
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                if self._shelf is not None:
+                    del self._shelf[evicted]
+
+    def evict_expired(self):
+        """Drop every entry that is stale and cannot be revalidated"""
+        now = self.clock()
+        with self._lock:
+            for key in list(self._entries):
+                entry = self._entries[key] if self._shelf is None else self._shelf.get(key)
+                if entry is None or (not entry.is_fresh(now) and not entry.can_revalidate()):
+                    del self._entries[key]
+                    if self._shelf is not None and entry is not None:
+                        del self._shelf[key]
+
+    def close(self):
+        if self._shelf is not None:
+            with self._lock:
+                self._shelf.close()
@@ -0,0 +1,254 @@
+import re
+import json
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+try:
+    import jsonschema
+except ImportError:
+    jsonschema = None  # Schema checks are only available when jsonschema is installed
+
+CHECK_KEYS = ("url", "method", "status", "json", "min_size", "max_size", "schema")
+
+_WILDCARD = object()
+_PATH_STEP = re.compile(r"""\.(\w+|\*)|\[(-?\d+|\*)\]|\[(?:'([^']*)'|"([^"]*)")\]""")
+
+
+def parse_json_path(path) -> tuple:
+    """
+    Parse the JSONPath subset used by checks into a tuple of steps.
+
+    Supported: the root $, .name, ['name'], [index] (negative counts from the end) and the wildcards .* and [*].
+    """
+    if not path.startswith("$"):
+        raise ValueError(f"JSONPath {path!r} must start with $.")
+
+    steps = []
+    position = 1
+    while position < len(path):
+        match = _PATH_STEP.match(path, position)
+        if match is None:
+            raise ValueError(f"Unsupported JSONPath {path!r} at position {position}.")
+
+        name, index, single_quoted, double_quoted = match.groups()
+        step = name or index
+        if step == "*":
+            steps.append(_WILDCARD)
+        elif index is not None:
+            steps.append(int(index))
+        elif step is not None:
+            steps.append(step)
+        else:
+            steps.append(single_quoted if single_quoted is not None else double_quoted)
+        position = match.end()
+
+    return tuple(steps)
+
+
+def find_json_path(document, steps) -> list:
+    """Return every value the parsed path selects in the document"""
+    values = [document]
+    for step in steps:
+        selected = []
+        for value in values:
+            if step is _WILDCARD:
+                if isinstance(value, dict):
+                    selected.extend(value.values())
+                elif isinstance(value, list):
+                    selected.extend(value)
+            elif isinstance(step, int):
+                if isinstance(value, list) and -len(value) <= step < len(value):
+                    selected.append(value[step])
+            elif isinstance(value, dict) and step in value:
+                selected.append(value[step])
+        values = selected
+
+    return values
+
+
+class Check:
+    """
+    One rule of a checks file, applied to every response whose method and URL match it.
+
+    Failure messages name the expectation rather than the value received, so that identical failures
+    can be counted together.
+    """
+
+    def __init__(self, url=None, method=None, status=None, json=None, min_size=None, max_size=None, schema=None):
+        self.url = re.compile(url) if url else None  # Searched for in the full URL
+        self.method = method.upper() if method else None
+        self.status = None if status is None else tuple(status if isinstance(status, list) else [status])
+        self.json = {path: (parse_json_path(path), expected) for path, expected in (json or {}).items()}
+        self.min_size = min_size
+        self.max_size = max_size
+        self.schema = schema
+
+        if schema is not None and jsonschema is None:
+            raise ValueError("Schema checks need the jsonschema package, install it with pip install jsonschema.")
+        self._validator = None
+
+    @classmethod
+    def from_dict(cls, spec):
+        if not isinstance(spec, dict):
+            raise ValueError(f"A check must be a JSON object, got {spec!r}.")
+
+        unknown = set(spec) - set(CHECK_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown check keys {', '.join(sorted(unknown))}, expected {', '.join(CHECK_KEYS)}.")
+
+        return cls(**spec)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_validator"] = None  # Rebuilt where the check runs
+        return state
+
+    @property
+    def needs_body(self) -> bool:
+        return bool(self.json) or self.schema is not None
+
+    def applies_to(self, method, url) -> bool:
+        return (self.method is None or self.method == method) and (self.url is None or self.url.search(url))
+
+    def evaluate(self, status, body_size, document) -> list:
+        """
+        :param document: The parsed JSON body, or a ValueError if it could not be parsed
+        :return: A message for every expectation that was not met
+        """
+        failures = []
+        if self.status is not None and status not in self.status:
+            failures.append(f"status not in {list(self.status)}")
+        if self.min_size is not None and body_size < self.min_size:
+            failures.append(f"size below {self.min_size} bytes")
+        if self.max_size is not None and body_size > self.max_size:
+            failures.append(f"size above {self.max_size} bytes")
+
+        if not self.needs_body:
+            return failures
+        if isinstance(document, ValueError):
+            failures.append("body is not JSON")
+            return failures
+
+        for path, (steps, expected) in self.json.items():
+            values = find_json_path(document, steps)
+            if not values:
+                failures.append(f"{path} not found")
+            elif any(value != expected for value in values):
+                failures.append(f"{path} != {json.dumps(expected)}")
+
+        if self.schema is not None:
+            if self._validator is None:
+                self._validator = jsonschema.validators.validator_for(self.schema)(self.schema)
+            error = jsonschema.exceptions.best_match(self._validator.iter_errors(document))
+            if error is not None:
+                schema_path = "/".join(str(part) for part in error.absolute_schema_path)
+                failures.append(f"schema {error.validator} failed at #/{schema_path}")
+
+        return failures
+
+
+class CheckSet:
+    """The rules of a checks file, a JSON object holding one check or an array of them"""
+
+    def __init__(self, checks):
+        self.checks = list(checks)
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename, "r") as file:
+            try:
+                specs = json.load(file)
+            except ValueError as e:
+                raise ValueError(f"{filename} is not valid JSON: {e}") from e
+
+        return cls(Check.from_dict(spec) for spec in (specs if isinstance(specs, list) else [specs]))
+
+    @property
+    def needs_body(self) -> bool:
+        return any(check.needs_body for check in self.checks)
+
+    def evaluate(self, method, url, status, body_size, body):
+        """
+        Apply every check that matches the request.
+
+        :param body: The decoded response body, or None if it was not kept
+        :return: A tuple of failure messages, empty when every check passed, or None when no check applies
+        """
+        checks = [check for check in self.checks if check.applies_to(method, url)]
+        if not checks:
+            return None
+
+        document = None
+        if any(check.needs_body for check in checks):
+            try:
+                document = json.loads(body) if body is not None else ValueError("The body was not kept.")
+            except ValueError as e:
+                document = e
+
+        failures = []
+        for check in checks:
+            failures.extend(check.evaluate(status, body_size, document))
+
+        return tuple(failures)
+
+
+_worker_checks = None
+
+
+def _init_worker(checks):
+    global _worker_checks
+    _worker_checks = checks
+
+
+def _evaluate_in_worker(method, url, status, body_size, body):
+    return _worker_checks.evaluate(method, url, status, body_size, body)
+
+
+def run_checks(requests, checks, workers=1, processes=False, window=None):
+    """
+    Check every response in a pool of threads or processes, off the thread that sends the requests.
+
+    Requests are passed through in order with `check_failures` set once their checks are done. Requests
+    without a response are passed through unchecked.
+
+    :param requests: Iterable of sent CustomRequests
+    :param checks: The CheckSet to apply
+    :param workers: Number of worker threads or processes
+    :param processes: Parse and check bodies in worker processes rather than threads
+    :param window: Maximum number of requests waiting on their checks (defaults to 64 x workers)
+    """
+    if workers < 1:
+        raise ValueError(f"Workers must be at least 1, got {workers}.")
+
+    if window is None:
+        window = workers * 64
+
+    if processes:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(checks,))
+        evaluate = _evaluate_in_worker
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dex-check")
+        evaluate = checks.evaluate
+
+    pending = deque()
+    with executor:
+        for req in requests:
+            future = None
+            if req.response is not None:
+                future = executor.submit(evaluate, req.method, req.full_url(), req.response.status, req.body_size,
+                                         req.raw_data)
+            pending.append((req, future))
+
+            if len(pending) >= window:
+                yield _checked(*pending.popleft())
+
+        while pending:
+            yield _checked(*pending.popleft())
+
+
+def _checked(req, future):
+    if future is not None:
+        req.check_failures = future.result()
+
+    return req
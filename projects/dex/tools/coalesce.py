@@ -0,0 +1,70 @@
+import threading
+
+from datetime import datetime
+
+from .timing import now_ns
+
+# Methods whose effect does not change when the same request is sent again (RFC 9110, section 9.2.2)
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "TRACE", "PUT", "DELETE")
+
+
+class _InFlight:
+
+    __slots__ = ("leader", "done", "error")
+
+    def __init__(self, leader):
+        self.leader = leader
+        self.done = threading.Event()
+        self.error = None
+
+
+class RequestCoalescer:
+    """
+    Lets identical idempotent requests that are in flight at the same time share a single network call.
+
+    The first request with a given fingerprint is sent, every identical request that arrives before it
+    completes waits for it and adopts its response instead of sending its own.
+    """
+
+    def __init__(self):
+        self.sent = 0
+        self.coalesced = 0
+
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def send(self, req):
+        if req.method.strip().upper() not in IDEMPOTENT_METHODS:
+            return req.send()
+
+        fingerprint = req.fingerprint()
+
+        with self._lock:
+            in_flight = self._in_flight.get(fingerprint)
+            if in_flight is None:
+                in_flight = self._in_flight[fingerprint] = _InFlight(req)
+                self.sent += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if leader:
+            try:
+                return req.send()
+            except BaseException as e:
+                in_flight.error = e
+                raise
+            finally:
+                with self._lock:
+                    del self._in_flight[fingerprint]
+                in_flight.done.set()
+
+        request_time = datetime.now()
+        start = now_ns()
+        in_flight.done.wait()
+        if in_flight.error is not None:
+            raise in_flight.error
+
+        req.adopt(in_flight.leader, request_time, now_ns() - start)
+        return req.response
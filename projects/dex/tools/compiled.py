@@ -0,0 +1,164 @@
+import os
+import sys
+import mmap
+import struct
+
+from array import array
+
+from .customrequest import CustomRequest
+from .translation import read_records_from_csv
+
+MAGIC = b"DEXC"
+VERSION = 2
+
+# Every record is a row of indexes into the string table, one per field. Index 0 is the empty string.
+FIELDS = ("method", "endpoint", "resource", "querystring", "encoding", "body", "headers", "url", "target")
+
+# Magic, version, number of fields, number of records, number of strings, size of the string data
+HEADER = struct.Struct("<4sHHQQQ")
+ROW = struct.Struct(f"<{len(FIELDS)}I")
+
+
+def is_compiled_records(filename) -> bool:
+    with open(filename, "rb") as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+def _relocate(path, source_dir, target_dir) -> str:
+    """Make a path relative to the records file relative to the compiled file instead"""
+    if not path or os.path.isabs(path):
+        return path
+
+    return os.path.relpath(os.path.join(source_dir, path), target_dir)
+
+
+def compile_records(csv_filename, filename) -> int:
+    """
+    Compile a records CSV into a binary records file that can be memory-mapped and replayed without parsing.
+
+    Every distinct string is stored once. Endpoints and query strings are normalized the way CustomRequest
+    does it, and the full URL and percent-encoded request target of every record are built ahead of time.
+
+    :return: The number of records compiled
+    """
+    strings = {"": 0}
+    rows = array("I")
+
+    source_dir = os.path.dirname(os.path.abspath(csv_filename))
+    target_dir = os.path.dirname(os.path.abspath(filename))
+
+    def intern(value) -> int:
+        index = strings.get(value)
+        if index is None:
+            index = strings[value] = len(strings)
+        return index
+
+    for record in read_records_from_csv(csv_filename):
+        method, endpoint, resource, querystring, encoding = record[:5]
+        body = _relocate(record[5] if len(record) > 5 else "", source_dir, target_dir)
+        headers = _relocate(record[6] if len(record) > 6 else "", source_dir, target_dir)
+
+        req = CustomRequest(method, endpoint, resource, encoding, querystring=querystring)
+        values = (method.strip().upper(), f"{req.protocol}://{req.endpoint}", resource, req.querystring or "",
+                  encoding, body, headers, req.full_url(), req.request_target())
+        rows.extend(intern(value) for value in values)
+
+    encoded = [value.encode("utf-8") for value in strings]  # Dicts keep insertion order, so this is index order
+    offsets = array("Q", [0])
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+
+    if rows.itemsize != 4 or offsets.itemsize != 8:
+        raise RuntimeError("This platform has no 4 byte unsigned int array type.")
+    if sys.byteorder != "little":
+        rows.byteswap()
+        offsets.byteswap()
+
+    with open(filename, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(FIELDS), len(rows) // len(FIELDS), len(encoded), offsets[-1]))
+        file.write(offsets.tobytes())
+        file.write(b"".join(encoded))
+        file.write(b"\0" * (-file.tell() % ROW.size))  # Align the rows
+        file.write(rows.tobytes())
+
+    return len(rows) // len(FIELDS)
+
+
+class CompiledRecords:
+    """A memory-mapped binary records file written by compile_records"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._file = open(filename, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, fields, self.count, string_count, strings_size = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{filename} is not a compiled records file.")
+        if version != VERSION or fields != len(FIELDS):
+            self.close()
+            raise ValueError(f"{filename} was compiled by an incompatible version of dex, compile it again.")
+
+        offsets_start = HEADER.size
+        self._strings_start = offsets_start + (string_count + 1) * 8
+        self._offsets = struct.unpack_from(f"<{string_count + 1}Q", self._map, offsets_start)
+        self.rows_start = self._strings_start + strings_size + (-(self._strings_start + strings_size) % ROW.size)
+        self.rows_end = self.rows_start + self.count * ROW.size
+
+        self._strings = [None] * string_count  # Decoded on first use, then shared by every record
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def string(self, index) -> str:
+        value = self._strings[index]
+        if value is None:
+            start = self._strings_start + self._offsets[index]
+            end = self._strings_start + self._offsets[index + 1]
+            value = self._strings[index] = self._map[start:end].decode("utf-8")
+
+        return value
+
+    def shard_byte_ranges(self, shards) -> list:
+        """Split the rows into `shards` (start, end) byte ranges that each hold whole rows"""
+        if shards < 1:
+            raise ValueError(f"Shards must be at least 1, got {shards}.")
+
+        step = -(-self.count // shards)
+        return [(self.rows_start + min(index * step, self.count) * ROW.size,
+                 self.rows_start + min((index + 1) * step, self.count) * ROW.size) for index in range(shards)]
+
+    def records(self, start=0, end=None):
+        """Yield the records whose rows begin inside the byte range [start, end) as tuples of strings"""
+        first = max(-(-(start - self.rows_start) // ROW.size), 0)
+        stop = self.rows_end if end is None else min(max(end, self.rows_start), self.rows_end)
+        last = max(-(-(stop - self.rows_start) // ROW.size), first)
+
+        string = self.string
+        decoded = self._strings.__getitem__
+        view = memoryview(self._map)[self.rows_start + first * ROW.size:self.rows_start + last * ROW.size]
+        try:
+            for row in ROW.iter_unpack(view):
+                record = tuple(map(decoded, row))
+                if None in record:
+                    record = tuple(map(string, row))  # Decode the strings seen for the first time
+                yield record
+        finally:
+            view.release()
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+def read_compiled_records(filename, start=0, end=None):
+    """Yield the records of a compiled records file, optionally only those in a byte range"""
+    with CompiledRecords(filename) as compiled:
+        yield from compiled.records(start, end)
@@ -0,0 +1,135 @@
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None  # Brotli is only offered when one of the brotli packages is installed
+
+# Content codings dex can decode, in order of preference
+ENCODINGS = ("gzip", "deflate") + (("br",) if brotli is not None else ())
+
+ACCEPT_ENCODING = ", ".join(ENCODINGS)
+
+# Errors the decoders raise on a corrupt body
+DECODE_ERRORS = (zlib.error,) + ((brotli.error,) if brotli is not None else ())
+
+
+class _DeflateDecoder:
+    """Decodes "deflate" bodies, which servers send either zlib wrapped (RFC 1950) or raw (RFC 1951)"""
+
+    def __init__(self):
+        self._decoder = zlib.decompressobj()
+        self._started = False
+
+    def decompress(self, data) -> bytes:
+        if self._started:
+            return self._decoder.decompress(data)
+
+        self._started = True
+        try:
+            return self._decoder.decompress(data)
+        except zlib.error:
+            self._decoder = zlib.decompressobj(-zlib.MAX_WBITS)
+            return self._decoder.decompress(data)
+
+    def flush(self) -> bytes:
+        return self._decoder.flush()
+
+
+class _BrotliDecoder:
+
+    def __init__(self):
+        decoder = brotli.Decompressor()
+        # The brotli package calls it process(), brotlicffi decompress()
+        self.decompress = getattr(decoder, "process", None) or decoder.decompress
+
+    def flush(self) -> bytes:
+        return b""
+
+
+def decoder_for(coding):
+    """A fresh incremental decoder for a content coding, or None if it cannot be decoded"""
+    coding = coding.strip().lower()
+    if coding in ("gzip", "x-gzip"):
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if coding == "deflate":
+        return _DeflateDecoder()
+    if coding == "br" and brotli is not None:
+        return _BrotliDecoder()
+
+    return None
+
+
+class DecodingReader:
+    """
+    Wraps a response so that reading from it yields the body with its Content-Encoding undone.
+
+    Chunks are decoded as they are read, so a body policy can stream a compressed body without holding
+    all of it. `wire_size` counts the bytes read from the response before decoding.
+    """
+
+    def __init__(self, response, decoders):
+        self.response = response
+        self.decoders = decoders  # Applied in the reverse order of the codings in the header
+        self.wire_size = 0
+        self._flushed = False
+
+    @classmethod
+    def wrap(cls, response):
+        """Return a DecodingReader for a response with a decodable Content-Encoding, None otherwise"""
+        header = response.getheader("Content-Encoding")
+        if not header:
+            return None
+
+        codings = [coding for coding in header.split(",") if coding.strip().lower() != "identity"]
+        decoders = [decoder_for(coding) for coding in reversed(codings)]
+        if not decoders or None in decoders:
+            return None
+
+        return cls(response, decoders)
+
+    def read(self, amt=None) -> bytes:
+        if self._flushed:
+            return b""
+
+        if amt is None:
+            data = self.response.read()
+            self.wire_size += len(data)
+            self._flushed = True
+            return self._decode(data) + self._flush()
+
+        while True:
+            data = self.response.read(amt)
+            self.wire_size += len(data)
+
+            if data:
+                decoded = self._decode(data)
+            else:
+                self._flushed = True
+                decoded = self._flush()
+
+            # Keep reading until a chunk decodes to something, an empty result means the end of the body
+            if decoded or not data:
+                return decoded
+
+    def _decode(self, data) -> bytes:
+        try:
+            for decoder in self.decoders:
+                data = decoder.decompress(data)
+        except DECODE_ERRORS as e:
+            raise ValueError(f"Could not decode the response body: {e}") from e
+
+        return data
+
+    def _flush(self) -> bytes:
+        data = b""
+        try:
+            for decoder in self.decoders:
+                data = decoder.decompress(data) + decoder.flush() if data else decoder.flush()
+        except DECODE_ERRORS as e:
+            raise ValueError(f"Could not decode the response body: {e}") from e
+
+        return data
@@ -0,0 +1,282 @@
+import ssl
+import time
+import threading
+import http.client
+
+from collections import deque
+
+from .resolver import create_connection
+from .timing import now_ns
+
+# Errors raised when a pooled keep-alive connection was closed by the server while idle
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    ConnectionAbortedError,
+    BrokenPipeError,
+)
+
+
+def split_timeout(timeout):
+    """Turn a timeout of seconds, None or a (connect, read) tuple into a (connect, read) tuple"""
+    if isinstance(timeout, tuple):
+        return timeout
+
+    return timeout, timeout
+
+
+class TLSSessionCache:
+    """
+    One SSLContext shared by every HTTPS connection, and the last TLS session seen for each host.
+
+    Loading the CA bundle and doing a full handshake are the costly part of opening an HTTPS connection.
+    Sharing the context loads the bundle once, and offering the host's previous session when a new
+    connection is opened lets the server resume it with an abbreviated handshake.
+    """
+
+    def __init__(self, context=None):
+        self._context = context  # Created on first use, so runs without HTTPS never load the CA bundle
+
+        self.full_handshakes = 0
+        self.resumed_handshakes = 0
+
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    @property
+    def context(self) -> ssl.SSLContext:
+        with self._lock:
+            if self._context is None:
+                self._context = ssl.create_default_context()
+
+            return self._context
+
+    def session(self, host):
+        """The session to offer when connecting to the host, None when there is none yet"""
+        return self._sessions.get(host)
+
+    def handshake_done(self, host, sock) -> bool:
+        """Count a completed handshake and keep its session, returning True if it was resumed"""
+        with self._lock:
+            if sock.session_reused:
+                self.resumed_handshakes += 1
+            else:
+                self.full_handshakes += 1
+
+        self.save(host, sock)
+        return sock.session_reused
+
+    def save(self, host, sock):
+        """Keep the connection's session for the host if it can be resumed"""
+        session = sock.session
+        # TLS 1.3 tickets arrive after the handshake, a session without one cannot be resumed yet
+        if session is not None and (session.has_ticket or sock.version() != "TLSv1.3"):
+            with self._lock:
+                self._sessions[host] = session
+
+
+_default_tls_sessions = None
+
+
+def default_tls_sessions() -> TLSSessionCache:
+    """The TLSSessionCache used by connections opened without a ConnectionPool"""
+    global _default_tls_sessions
+
+    if _default_tls_sessions is None:
+        _default_tls_sessions = TLSSessionCache()
+
+    return _default_tls_sessions
+
+
+class _ResolvingConnection:
+    """Opens the socket of an HTTP(S) connection through an optional DNSCache, timing the lookup"""
+
+    def _init_resolver(self, resolver):
+        self.resolver = resolver
+        self.dns_ns = 0
+        self._create_connection = self._open_socket
+
+    def _open_socket(self, address, timeout, source_address=None):
+        sock, self.dns_ns = create_connection(address, timeout, source_address, self.resolver)
+        return sock
+
+
+class TimedHTTPConnection(_ResolvingConnection, http.client.HTTPConnection):
+    """An HTTPConnection that records how long resolving the host and establishing the connection took"""
+
+    def __init__(self, host, read_timeout=None, resolver=None, **kwargs):
+        super().__init__(host, **kwargs)
+        self._init_resolver(resolver)
+        self.read_timeout = read_timeout  # Applied once connected, `timeout` only bounds connecting
+        self.connect_ns = 0
+        self.tls_ns = 0
+        self.tls_resumed = None  # No TLS handshake over plain HTTP
+
+    def connect(self):
+        start = now_ns()
+        super().connect()
+        self.connect_ns = now_ns() - start - self.dns_ns
+        self.tls_ns = 0
+
+        if self.read_timeout is not None:
+            self.sock.settimeout(self.read_timeout)
+
+
+class TimedHTTPSConnection(_ResolvingConnection, http.client.HTTPSConnection):
+    """
+    An HTTPSConnection that records the TCP connect and TLS handshake separately.
+
+    With a TLSSessionCache the connection uses its shared context and resumes the host's previous
+    session where the server allows it. `tls_resumed` tells which kind of handshake was done.
+    """
+
+    def __init__(self, host, context=None, read_timeout=None, tls_sessions=None, resolver=None, **kwargs):
+        if context is None:
+            context = tls_sessions.context if tls_sessions else ssl.create_default_context()
+
+        super().__init__(host, context=context, **kwargs)
+        self._init_resolver(resolver)
+        self.ssl_context = context
+        self.tls_sessions = tls_sessions
+        self.read_timeout = read_timeout
+        self.connect_ns = 0
+        self.tls_ns = 0
+        self.tls_resumed = None  # True or False once a handshake was done
+
+    def connect(self):
+        start = now_ns()
+        http.client.HTTPConnection.connect(self)
+        connected = now_ns()
+
+        server_hostname = self._tunnel_host or self.host
+        session = self.tls_sessions.session(self._session_key()) if self.tls_sessions else None
+        self.sock = self.ssl_context.wrap_socket(self.sock, server_hostname=server_hostname, session=session)
+
+        self.connect_ns = connected - start - self.dns_ns
+        self.tls_ns = now_ns() - connected
+        if self.tls_sessions:
+            self.tls_resumed = self.tls_sessions.handshake_done(self._session_key(), self.sock)
+        else:
+            self.tls_resumed = self.sock.session_reused
+
+        if self.read_timeout is not None:
+            self.sock.settimeout(self.read_timeout)
+
+    def close(self):
+        # By now a TLS 1.3 server has usually sent the ticket needed to resume the session
+        if self.tls_sessions and isinstance(self.sock, ssl.SSLSocket):
+            try:
+                self.tls_sessions.save(self._session_key(), self.sock)
+            except (OSError, ValueError):
+                pass
+        super().close()
+
+    def _session_key(self) -> str:
+        return f"{self._tunnel_host or self.host}:{self._tunnel_port or self.port}"
+
+
+class ConnectionPool:
+    """A thread-safe pool of keep-alive HTTP(S) connections keyed by protocol and host"""
+
+    def __init__(self, max_idle_per_host=10, idle_timeout=30.0, tls_sessions=None, resolver=None):
+        """
+        :param max_idle_per_host: Maximum number of idle connections kept for each host
+        :param idle_timeout: Seconds an idle connection may sit in the pool before it is evicted
+        :param tls_sessions: TLSSessionCache shared by the pool's HTTPS connections, a new one by default
+        :param resolver: Optional DNSCache new connections resolve their host through
+        """
+        self.max_idle_per_host = max_idle_per_host
+        self.idle_timeout = idle_timeout
+        self.tls_sessions = tls_sessions or TLSSessionCache()
+        self.resolver = resolver
+
+        self.created = 0
+        self.reused = 0
+
+        self._idle = {}
+        self._next_sweep = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def new_connection(protocol, host, timeout=None, tls_sessions=None, resolver=None) -> http.client.HTTPConnection:
+        """
+        :param timeout: Seconds to wait for connecting and for each read, or a (connect, read) tuple
+        :param tls_sessions: TLSSessionCache for HTTPS connections, the process wide one by default
+        :param resolver: Optional DNSCache to resolve the host through, the system resolver is asked otherwise
+        """
+        connect_timeout, read_timeout = split_timeout(timeout)
+        if protocol == "https":
+            return TimedHTTPSConnection(host, timeout=connect_timeout, read_timeout=read_timeout,
+                                        tls_sessions=tls_sessions or default_tls_sessions(), resolver=resolver)
+        else:
+            return TimedHTTPConnection(host, timeout=connect_timeout, read_timeout=read_timeout, resolver=resolver)
+
+    def acquire(self, protocol, host, timeout=None):
+        """
+        Take an idle connection for the host or open a new one with the given timeout.
+
+        :return: Tuple of (connection, reused) where reused is True if the connection came from the pool
+        """
+        key = (protocol, host)
+        now = time.monotonic()
+
+        with self._lock:
+            self._sweep(now)
+            idle = self._idle.get(key)
+            while idle:
+                conn, released_at = idle.pop()
+                if now - released_at <= self.idle_timeout and conn.sock is not None:
+                    self.reused += 1
+                    return conn, True
+                conn.close()
+
+            self.created += 1
+
+        return self.new_connection(protocol, host, timeout, self.tls_sessions, self.resolver), False
+
+    def release(self, protocol, host, conn, reusable=True):
+        """Return a connection to the pool, closing it if it cannot be reused or the pool is full"""
+        if not reusable or conn.sock is None:
+            conn.close()
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            idle = self._idle.setdefault((protocol, host), deque())
+            if len(idle) < self.max_idle_per_host:
+                idle.append((conn, now))
+                return
+
+        conn.close()
+
+    def evict_idle(self):
+        """Close every idle connection that has exceeded the idle timeout"""
+        with self._lock:
+            self._next_sweep = 0.0
+            self._sweep(time.monotonic())
+
+    def _sweep(self, now):
+        """
+        Close the expired idle connections of every host, at most once every half idle timeout.
+
+        Called with the lock held by acquire and release. acquire takes the newest connection first, so
+        without the sweep older expired connections of a busy host would stay open until the pool closes.
+        """
+        if now < self._next_sweep:
+            return
+
+        self._next_sweep = now + self.idle_timeout / 2
+        cutoff = now - self.idle_timeout
+        for idle in self._idle.values():
+            while idle and idle[0][1] < cutoff:
+                idle.popleft()[0].close()
+
+    def close(self):
+        """Close all idle connections"""
+        with self._lock:
+            for idle in self._idle.values():
+                while idle:
+                    idle.pop()[0].close()
+            self._idle.clear()
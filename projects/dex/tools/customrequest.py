@@ -1,43 +1,95 @@
 import csv
 import os
 import glob
-import urllib
 import time
+import urllib
 import json
+import hashlib
 import http.client
 
-from urllib.parse import urljoin
+from urllib.parse import quote, urljoin, urlsplit
 from datetime import datetime
 
+from .body import BufferBody
+from .cache import CachedResponse
+from .compression import DecodingReader
+from .connectionpool import ConnectionPool, STALE_CONNECTION_ERRORS
+from .payloads import Payload
+from .results import RequestResult, format_size
+from .retry import RETRYABLE_ERRORS
+from .timing import PhaseTimings, now_ns
+
+
+class BodyRecorder:
+    """
+    Wraps a response so that the body read through it by a body policy is also kept.
+
+    Recording stops, and what was kept is dropped, once the body grows past `limit` bytes.
+    """
+
+    def __init__(self, response, limit=None):
+        self.response = response
+        self.limit = limit
+        self.size = 0
+        self.chunks = []
+
+    def read(self, amt=None) -> bytes:
+        chunk = self.response.read(amt)
+        if self.chunks is not None:
+            self.size += len(chunk)
+            if self.limit is not None and self.size > self.limit:
+                self.chunks = None
+            else:
+                self.chunks.append(chunk)
+        return chunk
+
+    def getheader(self, name, default=None):
+        return self.response.getheader(name, default)
+
+    def body(self):
+        """The recorded body, or None if it was larger than the limit"""
+        return b"".join(self.chunks) if self.chunks is not None else None
+
 
 class CustomRequest:
 
-    @staticmethod
-    def format_size(size_bytes: int) -> str:
-        if size_bytes < 1024:
-            return f"{size_bytes:,} bytes"
-        elif size_bytes < 1024 ** 2:
-            return f"{size_bytes / 1024:,.2f} KB"
-        elif size_bytes < 1024 ** 3:
-            return f"{size_bytes / 1024 ** 2:,.2f} MB"
-        elif size_bytes < 1024 ** 4:
-            return f"{size_bytes / 1024 ** 3:,.2f} GB"
-        else:
-            return f"{size_bytes / 1024 ** 4:,.2f} TB"
+    DEFAULT_BODY_POLICY = BufferBody()
+
+    format_size = staticmethod(format_size)
 
-    def __init__(self, method, endpoint, resource, encoding, headers=None, querystring=None):
+    def __init__(self, method, endpoint, resource, encoding, headers=None, querystring=None, pool=None,
+                 body_policy=None, cache=None, timeout=None, retry=None, breaker=None, body=None,
+                 url=None, target=None):
         self.method = method
         self.encoding = encoding
         self.resource = resource
         self.querystring = querystring
+        self.body = body  # Request body as bytes or a shared Payload, sent as is
 
         self.response = None
         self.raw_data = None
-        self.decoded_data = None
+        self.body_size = 0  # Number of response body bytes read after decoding, whatever the body policy
+        self.wire_size = 0  # Number of response body bytes received, before any Content-Encoding was undone
+        self.body_digest = None
+        self.body_path = None
         self.json_data = None
         self.headers = headers
         self.elapsed_time_ns = 0  # Attribute to store elapsed time in nanoseconds
+        self.timings = PhaseTimings()  # Breakdown of elapsed_time_ns by phase
+        self.queue_delay_ns = 0  # Time between the intended and actual start of a scheduled request
         self.request_time = None  # Attribute to store the time of the request
+        self.pool = pool  # Optional ConnectionPool used to reuse keep-alive connections
+        self.body_policy = body_policy or CustomRequest.DEFAULT_BODY_POLICY
+        self.cache = cache  # Optional ResponseCache consulted for GET and HEAD requests
+        self.cache_status = None  # "hit", "revalidated" or "miss" when the cache was consulted
+        self.coalesced = False  # True when the response was shared from an identical in-flight request
+        self.timeout = timeout  # Seconds to wait for connecting and for each read, or a (connect, read) tuple
+        self.retry = retry  # Optional RetryPolicy for failed attempts
+        self.breaker = breaker  # Optional CircuitBreaker shared by every request to the same host
+        self.retries = 0  # Number of attempts made after the first one
+        self.backoff_ns = 0  # Time spent waiting between attempts
+        self.tls_resumed = None  # True or False when a TLS handshake was done, whether it resumed a session
+        self.check_failures = None  # Failed expectations once checked, empty if all passed
 
         # Check and strip the protocol from the endpoint
         if endpoint.startswith("https://"):
@@ -59,26 +111,55 @@ class CustomRequest:
         else:
             self.querystring = None
 
+        self._full_url = url  # Prebuilt by `dex compile`, otherwise built on first use
+        self._request_target = target
+
     def __str__(self):
-        if self.request_time:
-            request_time_str = "'" + self.request_time.strftime("%A, %B %d, %Y %I:%M %p") + "'"
-        else:
-            request_time_str = "'None'"
+        return str(RequestResult.from_request(self))
 
-        if self.response:
-            status_code_str = str(self.status_code())
-            response_size_str = CustomRequest.format_size(len(self.raw_data))
-        else:
-            status_code_str = "'None'"
-            response_size_str = CustomRequest.format_size(0)
+    # The URL components are built on first use and cached until one of these attributes changes
+
+    @property
+    def protocol(self) -> str:
+        return self._protocol
+
+    @protocol.setter
+    def protocol(self, value):
+        self._protocol = value
+        self._invalidate_url()
+
+    @property
+    def endpoint(self) -> str:
+        return self._endpoint
+
+    @endpoint.setter
+    def endpoint(self, value):
+        self._endpoint = value
+        self._invalidate_url()
 
-        output = "status=" + status_code_str
-        output += ", when=" + request_time_str
-        output += ", duration='" + str(self.elapsed_time_ms()) + " ms'"
-        output += ", size='" + response_size_str + "'"
-        output += ", url='" + self.method + " " + self.full_url() + "'"
+    @property
+    def resource(self) -> str:
+        return self._resource
 
-        return output
+    @resource.setter
+    def resource(self, value):
+        self._resource = value
+        self._invalidate_url()
+
+    @property
+    def querystring(self):
+        return self._querystring
+
+    @querystring.setter
+    def querystring(self, value):
+        self._querystring = value
+        self._invalidate_url()
+
+    def _invalidate_url(self):
+        self._full_url = None
+        self._request_target = None
+        self._path_segments = None
+        self._query_params = None
 
     def base_url(self) -> str:
         return urljoin(f"{self.protocol}://{self.endpoint}", self.resource)
@@ -87,12 +168,102 @@ class CustomRequest:
         return urljoin(self.base_url(), self.querystring)
 
     def full_url(self) -> str:
-        if self.querystring:
-            return f"{self.base_url()}{self.querystring}"
-        else:
-            return self.base_url()
-
-    def send(self) -> http.client.HTTPResponse:
+        if self._full_url is None:
+            if self.querystring:
+                self._full_url = f"{self.base_url()}{self.querystring}"
+            else:
+                self._full_url = self.base_url()
+
+        return self._full_url
+
+    def request_target(self) -> str:
+        """The percent-encoded path and query sent on the request line (origin-form)"""
+        if self._request_target is None:
+            url = urlsplit(self.full_url())
+            target = quote(url.path or "/", safe="/%!$&'()*+,;=:@")
+            if url.query:
+                target = f"{target}?{quote(url.query, safe='/?%!$&()*+,;=:@')}"
+            self._request_target = target
+
+        return self._request_target
+
+    def path_segments(self) -> tuple:
+        if self._path_segments is None:
+            self._path_segments = tuple(self.resource.strip("/").split("/"))
+
+        return self._path_segments
+
+    def query_params(self) -> dict:
+        """The querystring as a dict, keeping the last value of repeated keys and skipping keys without one"""
+        if self._query_params is None:
+            params = {}
+            for query in (self.querystring or "").lstrip("?").split("&"):
+                key, equals, value = query.partition("=")
+                if equals:
+                    params[key] = value
+            self._query_params = params
+
+        return self._query_params
+
+    def fingerprint(self) -> bytes:
+        """A digest identifying the request by method, URL and headers, equal for identical requests"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{self.method.strip().upper()} {self.full_url()}".encode("utf-8"))
+        for name, value in sorted((name.lower(), str(value)) for name, value in (self.headers or {}).items()):
+            digest.update(f"\n{name}: {value}".encode("utf-8"))
+        if self.body is not None:
+            digest.update(b"\n\n")
+            digest.update(self.request_body())
+
+        return digest.digest()
+
+    def adopt(self, leader, request_time, waited_ns):
+        """
+        Take on the response of an identical request that was sent in this one's place.
+
+        :param leader: The CustomRequest that went over the network
+        :param request_time: When this request would have been sent
+        :param waited_ns: How long this request waited for the leader's response
+        """
+        self.reset()
+        self.method = self.method.strip().upper()
+        self.encoding = (self.encoding or "utf-8").strip()
+        self.request_time = request_time
+
+        # The response and body are shared with the leader rather than copied
+        self.response = leader.response
+        self.raw_data = leader.raw_data
+        self.body_size = leader.body_size
+        self.wire_size = leader.wire_size
+        self.body_digest = leader.body_digest
+        self.body_path = leader.body_path
+        self.elapsed_time_ns = waited_ns
+        self.coalesced = True
+
+    def consume_body(self, response) -> int:
+        """
+        Read the response body through the body policy, decoding it if the server compressed it.
+
+        :return: The decoded size of the body, the size received is kept in wire_size
+        """
+        reader = DecodingReader.wrap(response)
+        if reader is None:
+            self.wire_size = self.body_policy.consume(self, response)
+            return self.wire_size
+
+        size = self.body_policy.consume(self, reader)
+        self.wire_size = reader.wire_size
+        return size
+
+    def request_body(self):
+        """The body to send as a bytes-like object, a view onto the mapped file for a Payload"""
+        if isinstance(self.body, Payload):
+            return self.body.view
+
+        return self.body
+
+    def prepare(self):
+        """Clear the previous response and normalize the request, just before it is sent"""
         self.reset()
 
         if self.headers is None:
@@ -105,23 +276,171 @@ class CustomRequest:
         self.encoding = self.encoding.strip()
         self.request_time = datetime.now()
 
-        if self.protocol == "http":
-            conn = http.client.HTTPConnection(self.endpoint)
+    def send(self) -> http.client.HTTPResponse:
+        self.prepare()
+
+        if self.cache is None or not self.cache.accepts(self):
+            self._send(self.headers)
+            return self.response
+
+        start = now_ns()
+        entry = self.cache.lookup(self)
+
+        if entry is not None and self.cache.is_fresh(entry):
+            self._serve_from_cache(entry, start)
+            self.cache_status = "hit"
+        elif entry is not None and entry.can_revalidate():
+            body = self._send({**self.headers, **entry.conditional_headers()}, record_body=True)
+            if self.response.status == 304:
+                self.cache.refresh(self, entry, self.response)
+                self._serve_from_cache(entry, start)
+                self.cache_status = "revalidated"
+            else:
+                if body is not None:
+                    self.cache.store(self, self.response, body)
+                self.cache_status = "miss"
         else:
-            conn = http.client.HTTPSConnection(self.endpoint)
+            body = self._send(self.headers, record_body=True)
+            if body is not None:
+                self.cache.store(self, self.response, body)
+            self.cache_status = "miss"
 
-        start_time = time.time()
-        conn.request(self.method, self.full_url(), headers=self.headers)
+        self.cache.record(self.cache_status)
+        return self.response
 
+    def _send(self, headers, record_body=False):
+        """
+        Send the request, retrying as the retry policy allows.
+
+        :return: The body if record_body is set and it fit the cache's body size limit, otherwise None
+        """
+        host = f"{self.protocol}://{self.endpoint}"
+        start = now_ns()
+
+        while True:
+            if self.breaker is not None:
+                self.breaker.allow(host)
+
+            try:
+                body = self._attempt(headers, record_body)
+            except RETRYABLE_ERRORS:
+                self.response = None
+                if self.breaker is not None:
+                    self.breaker.record_failure(host)
+                if self.retry is None or not self.retry.can_retry(self.method, self.retries):
+                    raise
+
+                delay = self.retry.delay(self.retries)
+            except Exception:
+                # Such as a body that cannot be decoded, still a failure of the host and the end of any trial
+                self.response = None
+                if self.breaker is not None:
+                    self.breaker.record_failure(host)
+                raise
+            else:
+                status = self.response.status
+                if self.breaker is not None:
+                    if status >= 500:
+                        self.breaker.record_failure(host)
+                    else:
+                        self.breaker.record_success(host)
+
+                if (self.retry is None or not self.retry.should_retry_status(status)
+                        or not self.retry.can_retry(self.method, self.retries)):
+                    break
+
+                delay = self.retry.delay(self.retries, self.response)
+
+            self.retries += 1
+            backoff_start = now_ns()
+            time.sleep(delay)
+            self.backoff_ns += now_ns() - backoff_start
+
+        if self.retries:
+            # Cover every attempt and the backoff between them, not only the final exchange
+            self.elapsed_time_ns = now_ns() - start
+
+        return body
+
+    def _attempt(self, headers, record_body=False):
+        """Exchange the request once over a pooled or new connection"""
+        if self.pool:
+            conn, reused = self.pool.acquire(self.protocol, self.endpoint, self.timeout)
+        else:
+            conn, reused = ConnectionPool.new_connection(self.protocol, self.endpoint, self.timeout), False
+
+        try:
+            try:
+                body = self._exchange(conn, headers, record_body)
+            except STALE_CONNECTION_ERRORS:
+                if not reused:
+                    raise
+
+                # The server closed the pooled connection while it was idle, reconnect once
+                conn.close()
+                conn = self.pool.new_connection(self.protocol, self.endpoint, self.timeout, self.pool.tls_sessions,
+                                                self.pool.resolver)
+                body = self._exchange(conn, headers, record_body)
+        except BaseException:
+            conn.close()
+            raise
+
+        if self.pool:
+            self.pool.release(self.protocol, self.endpoint, conn, not self.response.will_close)
+        else:
+            conn.close()
+
+        return body
+
+    def _serve_from_cache(self, entry, start):
+        """Answer the request with a cached response, any network time already spent stays in the phases"""
+        self.response = CachedResponse(entry)
+
+        downloaded = now_ns()
+        self.body_size = self.consume_body(self.response)
+        self.wire_size = 0  # Nothing was received for the body
+
+        end = now_ns()
+        self.timings.download += end - downloaded
+        self.elapsed_time_ns = end - start
+
+    def _exchange(self, conn, headers, record_body=False):
+        """Send the request over the connection and read the response, timing each phase"""
+        timings = PhaseTimings()
+        start = now_ns()
+
+        if conn.sock is None:
+            conn.connect()
+            connected = now_ns()
+            timings.dns = conn.dns_ns
+            timings.tls = conn.tls_ns
+            timings.connect = connected - start - timings.tls - timings.dns
+            self.tls_resumed = conn.tls_resumed
+        else:
+            connected = start
+        conn.request(self.method, self.request_target(), body=self.request_body(), headers=headers)
+
+        written = now_ns()
+        timings.write = written - connected
         self.response = conn.getresponse()
-        self.raw_data = self.response.read()
-        self.decoded_data = self.raw_data.decode(self.encoding)
-        conn.close()
 
-        end_time = time.time()
-        self.elapsed_time_ns = int((end_time - start_time) * 1_000_000_000)
+        first_byte = now_ns()
+        timings.ttfb = first_byte - written
+        if record_body:
+            recorder = BodyRecorder(self.response, self.cache.max_body_size if self.cache is not None else None)
+            self.body_size = self.consume_body(recorder)
+            body = recorder.body()
+        else:
+            self.body_size = self.consume_body(self.response)
+            body = None
 
-        return self.response
+        end = now_ns()
+        timings.download = end - first_byte
+
+        self.timings = timings
+        self.elapsed_time_ns = end - start
+
+        return body
 
     def get(self, encoding="utf-8"):
         self.encoding = encoding
@@ -179,19 +498,36 @@ class CustomRequest:
 
     def reset(self):
         """Resets response data and attributes"""
-        self.method = "GET"
-        self.encoding = None
         self.response = None
         self.raw_data = None
-        self.decoded_data = None
+        self.body_size = 0
+        self.wire_size = 0
+        self.body_digest = None
+        self.body_path = None
         self.json_data = None
         self.elapsed_time_ns = 0
+        self.timings = PhaseTimings()
+        self.queue_delay_ns = 0
         self.request_time = None
-        self.headers = {}
+        self.cache_status = None
+        self.coalesced = False
+        self.retries = 0
+        self.backoff_ns = 0
+        self.tls_resumed = None
+        self.check_failures = None
+
+    @property
+    def decoded_data(self):
+        """The buffered response body decoded on demand, so the bytes are not held twice"""
+        if self.raw_data is None:
+            return None
+        return self.raw_data.decode(self.encoding)
 
     def get_json(self):
-        if self.response:
-            self.json_data = json.loads(self.response.read().decode(self.encoding))
-            return self.json_data
-        else:
+        if not self.response:
             raise ValueError("Response is not available. Make a request first using send().")
+        if self.raw_data is None:
+            raise ValueError("Response body was not buffered. Send the request with the buffer body policy.")
+
+        self.json_data = json.loads(self.decoded_data)
+        return self.json_data
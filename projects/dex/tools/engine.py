@@ -0,0 +1,97 @@
+import time
+import queue
+import threading
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+def execute_in_order(func, items, concurrency=1, window=None):
+    """
+    Apply func to every item using a pool of worker threads, yielding results in input order.
+
+    At most `window` items are in flight at any time so that `items` can be a lazy iterable.
+
+    :param func: Callable applied to each item
+    :param items: Iterable of items
+    :param concurrency: Number of worker threads
+    :param window: Maximum number of submitted but not yet yielded items (defaults to 4 x concurrency)
+    :return: Generator of results in the same order as items
+    """
+    if concurrency < 1:
+        raise ValueError(f"Concurrency must be at least 1, got {concurrency}.")
+
+    if concurrency == 1:
+        for item in items:
+            yield func(item)
+        return
+
+    if window is None:
+        window = concurrency * 4
+
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="dex-send") as executor:
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+
+
+def execute_at_rate(func, items, limiter, concurrency=1, duration=None):
+    """
+    Apply func to items on an open-loop schedule set by a rate limiter, yielding results in input order.
+
+    A scheduler thread reserves one token per item and submits func(item, intended_time) to the worker
+    pool at the time the token becomes available, whether or not earlier items have completed. Items
+    that have to wait for a free worker stay queued, so func can measure latency from intended_time
+    instead of hiding the wait.
+
+    :param func: Callable taking an item and its intended start time on the limiter's clock
+    :param items: Iterable of items
+    :param limiter: A TokenBucket (or anything with reserve() and the same clock as time.monotonic)
+    :param concurrency: Number of worker threads
+    :param duration: Optional number of seconds after which no more items are scheduled
+    :return: Generator of results in the same order as items
+    """
+    if concurrency < 1:
+        raise ValueError(f"Concurrency must be at least 1, got {concurrency}.")
+
+    submitted = queue.Queue()
+    stopped = threading.Event()
+
+    def schedule(executor):
+        start = time.monotonic()
+        try:
+            for item in items:
+                intended_time = limiter.reserve()
+                if duration is not None and intended_time - start >= duration:
+                    break
+
+                if stopped.wait(max(intended_time - time.monotonic(), 0)):
+                    break
+
+                submitted.put(executor.submit(func, item, intended_time))
+        except BaseException as e:
+            submitted.put(e)
+        finally:
+            submitted.put(None)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="dex-send") as executor:
+        scheduler = threading.Thread(target=schedule, args=(executor,), name="dex-scheduler", daemon=True)
+        scheduler.start()
+
+        try:
+            while True:
+                future = submitted.get()
+                if future is None:
+                    break
+                if isinstance(future, BaseException):
+                    raise future
+
+                yield future.result()
+        finally:
+            stopped.set()
+            scheduler.join()
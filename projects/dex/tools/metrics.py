@@ -0,0 +1,296 @@
+import math
+import threading
+
+from .timing import PhaseTimings
+
+
+def us_to_ms(microseconds) -> float:
+    return microseconds / 1_000
+
+
+class LatencyHistogram:
+    """
+    A log-bucketed latency histogram in the spirit of HdrHistogram.
+
+    Values are recorded in whole microseconds. Values below 2 ** SUB_BUCKET_BITS are counted exactly,
+    larger values share a bucket with neighbours within 1 / 2 ** (SUB_BUCKET_BITS - 1) of them, so every
+    reported percentile is within about 1.6% of the true value while memory only grows with the number
+    of distinct buckets touched, never with the number of values recorded.
+    """
+
+    SUB_BUCKET_BITS = 7
+    SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+    SUB_BUCKET_HALF = SUB_BUCKET_COUNT >> 1
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.min = None
+        self.max = None
+        self.total = 0
+
+        # Welford's online mean and sum of squared differences
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    @classmethod
+    def bucket_index(cls, value) -> int:
+        if value < cls.SUB_BUCKET_COUNT:
+            return value
+
+        shift = value.bit_length() - cls.SUB_BUCKET_BITS
+        return cls.SUB_BUCKET_COUNT + (shift - 1) * cls.SUB_BUCKET_HALF + (value >> shift) - cls.SUB_BUCKET_HALF
+
+    @classmethod
+    def bucket_range(cls, index):
+        """Return the (lowest, highest) value counted in the bucket"""
+        if index < cls.SUB_BUCKET_COUNT:
+            return index, index
+
+        shift, offset = divmod(index - cls.SUB_BUCKET_COUNT, cls.SUB_BUCKET_HALF)
+        shift += 1
+        lowest = (offset + cls.SUB_BUCKET_HALF) << shift
+        return lowest, lowest + (1 << shift) - 1
+
+    def record(self, value, count=1):
+        """Record a value in microseconds"""
+        value = max(int(value), 0)
+        index = self.bucket_index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+
+        self.count += count
+        self.total += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+        delta = value - self._mean
+        self._mean += delta * count / self.count
+        self._m2 += delta * delta * (self.count - count) * count / self.count
+
+    def merge(self, other):
+        """Fold another histogram into this one"""
+        if not other.count:
+            return
+
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+
+        # Chan et al. parallel variant of Welford's algorithm
+        count = self.count + other.count
+        delta = other._mean - self._mean
+        self._m2 += other._m2 + delta * delta * self.count * other.count / count
+        self._mean += delta * other.count / count
+
+        self.count = count
+        self.total += other.total
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def mean(self) -> float:
+        return self._mean
+
+    def variance(self) -> float:
+        """Sample variance, zero when fewer than two values have been recorded"""
+        if self.count < 2:
+            return 0.0
+        return self._m2 / (self.count - 1)
+
+    def stdev(self) -> float:
+        return math.sqrt(self.variance())
+
+    def percentile(self, percent) -> int:
+        """Return the value below which `percent` percent of the recorded values fall"""
+        if not self.count:
+            return 0
+
+        # Round before taking the ceiling so float noise such as 99.9 / 100 * 5000 = 4995.000000001 is ignored
+        rank = max(math.ceil(round(percent * self.count / 100, 9)), 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                lowest, highest = self.bucket_range(index)
+                return min(max((lowest + highest) // 2, self.min), self.max)
+
+        return self.max
+
+
+class RequestStatistics:
+    """
+    Aggregates request durations and outcomes incrementally as requests complete.
+
+    Results are added under a lock so that progress reports and metrics scrapes on other threads can
+    take consistent snapshots mid-run.
+    """
+
+    PERCENTILES = (50, 90, 99, 99.9)
+
+    def __init__(self):
+        self.successful_requests = 0
+        self.failed_requests = 0
+        self.errored_requests = 0  # Requests that never received a response
+        self.coalesced_requests = 0  # Requests answered by an identical in-flight request
+        self.retried_requests = 0  # Requests that needed more than one attempt
+        self.retries = 0  # Attempts made after the first one, over all requests
+        self.body_bytes = 0  # Response body bytes after decoding
+        self.wire_bytes = 0  # Response body bytes received from the network, before decoding
+        self.latency = LatencyHistogram()
+        self.phases = {phase: LatencyHistogram() for phase in PhaseTimings.PHASES}
+        self.queue_delay = LatencyHistogram()
+        self.backoff = LatencyHistogram()  # Time spent waiting between attempts
+
+        # Latency of requests that consulted a response cache, by "hit", "revalidated" or "miss"
+        self.cache = {}
+
+        # TLS handshake time of requests that opened an HTTPS connection, by "full" or "resumed"
+        self.handshakes = {}
+
+        # Outcome of the response checks, by status code as [passed, failed], and how often each expectation failed
+        self.checks = {}
+        self.check_failures = {}
+
+        # Latency of the requests that received a response and number that did not, by protocol://host
+        self.hosts = {}
+        self.host_errors = {}
+
+        # Completed requests by status class ("2xx", "4xx", ...), or "error" when no response was received
+        self.status_classes = {}
+
+        # Latency since the last take_window(), for rolling percentiles
+        self.window = LatencyHistogram()
+
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def add(self, result):
+        """Record the RequestResult of a completed request"""
+        with self._lock:
+            self._add(result)
+
+    def _add(self, result):
+        status_class = "error" if result.status is None else f"{result.status // 100}xx"
+        self.status_classes[status_class] = self.status_classes.get(status_class, 0) + 1
+
+        if result.retries:
+            self.retried_requests += 1
+            self.retries += result.retries
+
+        host = f"{result.target.protocol}://{result.target.endpoint}"
+        if result.status is None:
+            self.errored_requests += 1
+            self.host_errors[host] = self.host_errors.get(host, 0) + 1
+            return
+
+        if host not in self.hosts:
+            self.hosts[host] = LatencyHistogram()
+        self.hosts[host].record(result.elapsed_time_ns // 1_000)
+
+        self.latency.record(result.elapsed_time_ns // 1_000)
+        self.window.record(result.elapsed_time_ns // 1_000)
+        self.queue_delay.record(result.queue_delay_ns // 1_000)
+        self.backoff.record(result.backoff_ns // 1_000)
+        self.body_bytes += result.body_size
+        if result.check_failures is not None:
+            counts = self.checks.setdefault(result.status, [0, 0])
+            counts[1 if result.check_failures else 0] += 1
+            for failure in result.check_failures:
+                self.check_failures[failure] = self.check_failures.get(failure, 0) + 1
+        if result.coalesced:
+            self.coalesced_requests += 1  # Never went over the network, so it has no phases or wire bytes of its own
+        else:
+            self.wire_bytes += result.wire_size
+            for phase, duration in result.timings.items():
+                self.phases[phase].record(duration // 1_000)
+
+        if result.tls_resumed is not None:
+            handshake = "resumed" if result.tls_resumed else "full"
+            if handshake not in self.handshakes:
+                self.handshakes[handshake] = LatencyHistogram()
+            self.handshakes[handshake].record(result.timings.tls // 1_000)
+
+        if result.cache_status is not None:
+            if result.cache_status not in self.cache:
+                self.cache[result.cache_status] = LatencyHistogram()
+            self.cache[result.cache_status].record(result.elapsed_time_ns // 1_000)
+
+        if 200 <= result.status < 300:
+            self.successful_requests += 1
+        else:
+            self.failed_requests += 1
+
+    def track(self, results):
+        """Record every result while passing it through unchanged"""
+        for result in results:
+            self.add(result)
+            yield result
+
+    def merge(self, other):
+        with self._lock:
+            self._merge(other)
+
+    def _merge(self, other):
+        for status_class, count in other.status_classes.items():
+            self.status_classes[status_class] = self.status_classes.get(status_class, 0) + count
+        self.successful_requests += other.successful_requests
+        self.failed_requests += other.failed_requests
+        self.errored_requests += other.errored_requests
+        self.coalesced_requests += other.coalesced_requests
+        self.body_bytes += other.body_bytes
+        self.wire_bytes += other.wire_bytes
+        self.latency.merge(other.latency)
+        self.queue_delay.merge(other.queue_delay)
+        self.backoff.merge(other.backoff)
+        self.retried_requests += other.retried_requests
+        self.retries += other.retries
+        for phase, histogram in other.phases.items():
+            self.phases[phase].merge(histogram)
+        for cache_status, histogram in other.cache.items():
+            self.cache.setdefault(cache_status, LatencyHistogram()).merge(histogram)
+        for handshake, histogram in other.handshakes.items():
+            self.handshakes.setdefault(handshake, LatencyHistogram()).merge(histogram)
+        for host, histogram in other.hosts.items():
+            self.hosts.setdefault(host, LatencyHistogram()).merge(histogram)
+        for status, (passed, failed) in other.checks.items():
+            counts = self.checks.setdefault(status, [0, 0])
+            counts[0] += passed
+            counts[1] += failed
+        for failure, count in other.check_failures.items():
+            self.check_failures[failure] = self.check_failures.get(failure, 0) + count
+        for host, count in other.host_errors.items():
+            self.host_errors[host] = self.host_errors.get(host, 0) + count
+
+    def snapshot(self):
+        """Return a copy of the statistics that is safe to read while requests keep completing"""
+        copy = RequestStatistics()
+        with self._lock:
+            copy.merge(self)
+
+        return copy
+
+    def take_window(self) -> LatencyHistogram:
+        """Return the latency recorded since the previous call and start a new window"""
+        with self._lock:
+            window, self.window = self.window, LatencyHistogram()
+
+        return window
+
+    def checks_passed(self) -> int:
+        return sum(passed for passed, _ in self.checks.values())
+
+    def checks_failed(self) -> int:
+        return sum(failed for _, failed in self.checks.values())
+
+    def total_requests(self) -> int:
+        return self.successful_requests + self.failed_requests + self.errored_requests
+
+    def percentiles(self) -> dict:
+        """Return the tracked percentiles in milliseconds"""
+        return {percent: us_to_ms(self.latency.percentile(percent)) for percent in self.PERCENTILES}
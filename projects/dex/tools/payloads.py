@@ -0,0 +1,80 @@
+import os
+import mmap
+import json
+
+
+class Payload:
+    """A request body file mapped into memory once and sent, without copying, by every request that uses it"""
+
+    __slots__ = ("path", "view", "_file", "_map")
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+
+        if os.fstat(self._file.fileno()).st_size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.view = memoryview(self._map)
+        else:
+            self._map = None  # Empty files cannot be mapped
+            self.view = memoryview(b"")
+
+    def __len__(self):
+        return self.view.nbytes
+
+    def close(self):
+        self.view.release()
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+
+class PayloadStore:
+    """
+    Loads the body files and header sets referenced by records, each one once per run.
+
+    Relative paths are resolved against `base_dir`, normally the directory of the records file.
+    """
+
+    def __init__(self, base_dir="."):
+        self.base_dir = base_dir
+        self.payloads = {}
+        self.header_sets = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def resolve(self, path) -> str:
+        return os.path.join(self.base_dir, path)
+
+    def payload(self, path) -> Payload:
+        payload = self.payloads.get(path)
+        if payload is None:
+            payload = self.payloads[path] = Payload(self.resolve(path))
+
+        return payload
+
+    def headers(self, path, defaults=None) -> dict:
+        """
+        Return the header set in a JSON file laid over the default headers.
+
+        The merged dict is shared by every request that uses the header set, so it must not be modified.
+        """
+        headers = self.header_sets.get(path)
+        if headers is None:
+            with open(self.resolve(path), "r", encoding="utf-8") as file:
+                header_set = json.load(file)
+            if not isinstance(header_set, dict):
+                raise ValueError(f"Header set {path} must be a JSON object of header names to values.")
+
+            headers = self.header_sets[path] = {**(defaults or {}), **{k: str(v) for k, v in header_set.items()}}
+
+        return headers
+
+    def close(self):
+        for payload in self.payloads.values():
+            payload.close()
+        self.payloads.clear()
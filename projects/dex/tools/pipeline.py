@@ -0,0 +1,197 @@
+import itertools
+import http.client
+
+from .connectionpool import ConnectionPool
+from .retry import RETRYABLE_ERRORS
+from .timing import PhaseTimings, now_ns
+
+# Only safe methods without a body are pipelined, so unanswered requests can simply be sent again
+PIPELINE_METHODS = ("GET", "HEAD")
+
+
+def can_pipeline(req) -> bool:
+    if req.breaker is not None and req.breaker.is_open(f"{req.protocol}://{req.endpoint}"):
+        return False  # Leave it to CustomRequest.send to fail fast
+
+    return req.method.strip().upper() in PIPELINE_METHODS and req.body is None and req.cache is None
+
+
+def batched(items, size):
+    """Yield lists of up to `size` consecutive items"""
+    iterator = iter(items)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class _SharedReader:
+    """
+    Stands in for the socket of every response on a pipelined connection.
+
+    http.client.HTTPResponse reads from sock.makefile() and closes that file once the body has been read.
+    Handing every response this one buffered reader, which ignores close(), keeps bytes that were read
+    ahead for the next response.
+    """
+
+    def __init__(self, sock):
+        self._file = sock.makefile("rb")
+
+    def makefile(self, mode, *args, **kwargs):
+        return self
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def close(self):
+        pass
+
+    def release(self):
+        self._file.close()
+
+
+def render_request(req, host) -> bytes:
+    """Render a request line and headers the way http.client would send them"""
+    names = {name.lower() for name in req.headers}
+    lines = [f"{req.method} {req.request_target()} HTTP/1.1"]
+    if "host" not in names:
+        lines.append(f"Host: {host}")
+    if "accept-encoding" not in names:
+        lines.append("Accept-Encoding: identity")
+    lines.extend(f"{name}: {value}" for name, value in req.headers.items())
+
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+def pipeline_requests(requests, pool=None, fallback=None, on_error=None):
+    """
+    Send requests, pipelining the GET and HEAD requests for each host down a single connection.
+
+    All requests for a host are written back to back and their responses read in the same order
+    (HTTP/1.1 pipelining, RFC 9112 section 9.3.2). Requests that cannot be pipelined, and any the
+    connection failed or closed before answering, are passed to `fallback` to be sent on their own.
+    Requests that were answered before the connection failed are never sent again. A response whose
+    body cannot be decoded leaves its request errored, without a response, and the rest fall back.
+
+    Each request's elapsed time runs from the start of its pipeline to the end of its response. Time
+    spent waiting for the responses ahead of it is reported as its queue delay.
+
+    :param requests: CustomRequests in the order their results are wanted
+    :param pool: Optional ConnectionPool to take and return connections
+    :param fallback: Callable sending a single request, CustomRequest.send by default
+    :param on_error: Optional callable given the host, the error and the number of unanswered requests
+                     when a connection fails or a body cannot be decoded mid-pipeline
+    :return: The requests
+    """
+    if fallback is None:
+        fallback = _send
+
+    hosts = {}
+    for req in requests:
+        if can_pipeline(req):
+            hosts.setdefault((req.protocol, req.endpoint), []).append(req)
+        else:
+            fallback(req)
+
+    for (protocol, host), group in hosts.items():
+        completed, error = _pipeline(protocol, host, group, pool)
+        if error is not None and on_error is not None:
+            on_error(host, error, len(group) - completed)
+
+        for req in group[completed:]:
+            fallback(req)
+
+    return requests
+
+
+def _send(req):
+    return req.send()
+
+
+def _pipeline(protocol, host, group, pool):
+    """
+    Pipeline the requests down one connection.
+
+    :return: How many of the requests got a response, and the connection or decoding error that stopped the
+             rest or None
+    """
+    for req in group:
+        req.prepare()
+
+    timeout = group[0].timeout
+    if pool:
+        conn, _ = pool.acquire(protocol, host, timeout)
+    else:
+        conn = ConnectionPool.new_connection(protocol, host, timeout)
+
+    completed = 0
+    error = None
+    reader = None
+    start = now_ns()
+    try:
+        dns_ns = connect_ns = tls_ns = 0
+        tls_resumed = None
+        if conn.sock is None:
+            conn.connect()
+            connected = now_ns()
+            dns_ns = conn.dns_ns
+            tls_ns = conn.tls_ns
+            connect_ns = connected - start - tls_ns - dns_ns
+            tls_resumed = conn.tls_resumed
+        else:
+            connected = start
+
+        conn.sock.sendall(b"".join(render_request(req, host) for req in group))
+        written = now_ns()
+
+        reader = _SharedReader(conn.sock)
+        previous = written
+        for req in group:
+            response = http.client.HTTPResponse(reader, method=req.method)
+            response.begin()
+            first_byte = now_ns()
+
+            req.response = response
+            try:
+                req.body_size = req.consume_body(response)
+            except ValueError as e:
+                # The body could not be decoded: the request is answered but errored, and where the next
+                # response starts is unknown, so the rest are sent on their own
+                req.response = None
+                completed += 1
+                error = e
+                break
+            end = now_ns()
+
+            timings = PhaseTimings()
+            timings.dns = dns_ns
+            timings.connect = connect_ns
+            timings.tls = tls_ns
+            timings.write = written - connected
+            timings.ttfb = first_byte - previous
+            timings.download = end - first_byte
+
+            req.timings = timings
+            req.tls_resumed = tls_resumed
+            req.queue_delay_ns = previous - written
+            req.elapsed_time_ns = end - start
+
+            completed += 1
+            previous = end
+            if response.will_close:
+                break  # The server will not answer the rest on this connection
+    except RETRYABLE_ERRORS as e:
+        error = e
+        if completed < len(group):
+            group[completed].response = None  # Its response was cut short, it is sent again
+    finally:
+        if reader is not None:
+            reader.release()
+
+        if pool and error is None and completed == len(group) and not group[-1].response.will_close:
+            pool.release(protocol, host, conn)
+        else:
+            conn.close()
+
+    return completed, error
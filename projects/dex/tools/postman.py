@@ -1,8 +1,9 @@
 
+import os
 import json
 
 
-def create_postman_collection(requests, collection_name="Custom Collection", collection_description="Generated from CustomRequest"):
+def create_postman_collection(results, collection_name="Custom Collection", collection_description="Generated from CustomRequest"):
     collection = {
         "info": {
             "name": collection_name,
@@ -13,24 +14,37 @@ def create_postman_collection(requests, collection_name="Custom Collection", col
         "item": []
     }
 
-    for req in requests:
-        request_data = {
-            "name": req.full_url(),
-            "request": {
-                "method": req.method,
-                "header": [{"key": k, "value": v} for k, v in req.headers.items()],
-                "url": {
-                    "raw": req.full_url(),
-                    "protocol": req.protocol,
-                    "host": [req.endpoint],
-                    "path": req.resource.strip("/").split("/"),
-                    "query": [{"key": k, "value": v} for k, v in parse_query_string(req.querystring).items()]
-                }
+    for result in results:
+        collection["item"].append(create_postman_item(result))
+
+    return collection
+
+
+def create_postman_item(result):
+    target = result.target
+    item = {
+        "name": target.full_url,
+        "description": f"Responded in {result.elapsed_time_ns / 1_000_000:.3f} ms ({result.timings} ms)",
+        "request": {
+            "method": target.method,
+            "header": [{"key": k, "value": v} for k, v in target.headers.items()],
+            "url": {
+                "raw": target.full_url,
+                "protocol": target.protocol,
+                "host": [target.endpoint],
+                "path": list(target.path_segments),
+                "query": [{"key": k, "value": v} for k, v in target.query_params.items()]
             }
         }
-        collection["item"].append(request_data)
+    }
+    if target.body_path:
+        item["request"]["body"] = {"mode": "file", "file": {"src": target.body_path}}
+    if result.check_failures:
+        item["description"] += f". Checks failed: {'; '.join(result.check_failures)}"
+    elif result.check_failures is not None:
+        item["description"] += ". Checks passed"
 
-    return collection
+    return item
 
 
 def parse_query_string(querystring):
@@ -46,22 +60,161 @@ def save_collection_to_file(collection, filename="collection.json"):
         json.dump(collection, file, indent=4)
 
 
-def group_requests_by_status_code(requests):
+def group_requests_by_status_code(results):
     status_code_groups = {}
-    for req in requests:
-        status_code = req.status_code()
-        if status_code not in status_code_groups:
-            status_code_groups[status_code] = []
+    for result in results:
+        if result.status is None:
+            continue
+
+        if result.status not in status_code_groups:
+            status_code_groups[result.status] = []
 
-        status_code_groups[status_code].append(req)
+        status_code_groups[result.status].append(result)
 
     return status_code_groups
 
 
-def generate_collections_by_status_code(requests):
-    grouped_requests = group_requests_by_status_code(requests)
-    for status_code, reqs in grouped_requests.items():
-        collection = create_postman_collection(reqs, f"Status Code {status_code} Collection")
-        save_collection_to_file(collection, f"collection_status_{status_code}.json")
+def check_variables(passed, failed) -> list:
+    """Collection variables recording how many of the collection's responses passed and failed their checks"""
+    return [{"key": "checks_passed", "value": str(passed)}, {"key": "checks_failed", "value": str(failed)}]
+
+
+class PostmanCollectionWriter:
+    """Writes a Postman collection one item at a time, keeping only the open file in memory"""
+
+    def __init__(self, filename, collection_name="Custom Collection", indent=None):
+        self.filename = filename
+        self.indent = indent
+        self.count = 0
+        self.variables = []  # Collection variables, written after the items on close
+
+        info = create_postman_collection([], collection_name)["info"]
+        self._file = open(filename, "w")
+        self._file.write('{"info":' + self._dumps(info) + ',"item":[')
+
+    def _dumps(self, value) -> str:
+        if self.indent is None:
+            return json.dumps(value, separators=(",", ":"))
+        return json.dumps(value, indent=self.indent)
+
+    def add_item(self, item):
+        self.add_raw_item(self._dumps(item))
+
+    def add_raw_item(self, item_json):
+        """Append an item that has already been serialized to JSON"""
+        if self.count:
+            self._file.write(",")
+        if self.indent is not None:
+            self._file.write("\n")
+
+        self._file.write(item_json)
+        self.count += 1
+
+    def close(self):
+        if not self._file.closed:
+            self._file.write("]")
+            if self.variables:
+                self._file.write(',"variable":' + self._dumps(self.variables))
+            self._file.write("}\n")
+            self._file.close()
+
+
+class PostmanItemWriter:
+    """Writes Postman items as JSON Lines, to be merged into a collection later by merge_item_files"""
+
+    def __init__(self, filename, collection_name=None, indent=None):
+        self.filename = filename
+        self.count = 0
+        self._file = open(filename, "w")
+
+    def add_item(self, item):
+        self._file.write(json.dumps(item, separators=(",", ":")) + "\n")
+        self.count += 1
+
+    def close(self):
+        self._file.close()
+
+
+class StatusCodeCollectionWriter:
+    """Streams each result into a Postman collection file for its status code as results arrive"""
+
+    def __init__(self, filename_template="collection_status_{}.json", indent=None, writer_class=PostmanCollectionWriter):
+        self.filename_template = filename_template
+        self.indent = indent
+        self.writer_class = writer_class
+        self.writers = {}
+        self.checks = {}  # Status code -> [passed, failed] for the responses that were checked
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def add(self, result):
+        if result.status is None:
+            return  # Requests that failed before receiving a response have no status code to group by
+
+        writer = self.writers.get(result.status)
+        if writer is None:
+            writer = self.writer_class(self.filename_template.format(result.status),
+                                       f"Status Code {result.status} Collection", self.indent)
+            self.writers[result.status] = writer
+
+        writer.add_item(create_postman_item(result))
+
+        if result.check_failures is not None:
+            self.checks.setdefault(result.status, [0, 0])[1 if result.check_failures else 0] += 1
+
+    def track(self, results):
+        """Add every result while passing it through unchanged"""
+        for result in results:
+            self.add(result)
+            yield result
+
+    def filenames(self) -> dict:
+        return {status_code: writer.filename for status_code, writer in self.writers.items()}
+
+    def close(self):
+        for status_code, writer in self.writers.items():
+            if status_code in self.checks:
+                writer.variables = check_variables(*self.checks[status_code])
+            writer.close()
+
+
+def merge_item_files(item_files, filename_template="collection_status_{}.json", indent=None, checks=None):
+    """
+    Merge the JSON Lines item files written by PostmanItemWriter into one collection per status code.
+
+    :param item_files: Iterable of {status code: item file} dicts, merged in order
+    :param checks: Optional dict of status code to (passed, failed) check counts over all the files
+    """
+    files_by_status_code = {}
+    for filenames in item_files:
+        for status_code, item_filename in filenames.items():
+            files_by_status_code.setdefault(status_code, []).append(item_filename)
+
+    for status_code, item_filenames in files_by_status_code.items():
+        writer = PostmanCollectionWriter(filename_template.format(status_code),
+                                         f"Status Code {status_code} Collection", indent)
+        if checks and status_code in checks:
+            writer.variables = check_variables(*checks[status_code])
+        try:
+            for item_filename in item_filenames:
+                with open(item_filename) as item_file:
+                    for line in item_file:
+                        if indent is None:
+                            writer.add_raw_item(line.rstrip("\n"))
+                        else:
+                            writer.add_item(json.loads(line))
+                os.remove(item_filename)
+        finally:
+            writer.close()
+
+
+def generate_collections_by_status_code(results, indent=None):
+    with StatusCodeCollectionWriter(indent=indent) as collections:
+        for result in results:
+            collections.add(result)
 
     print("Postman collections saved.")
@@ -0,0 +1,97 @@
+import sys
+import time
+import threading
+
+from .metrics import us_to_ms
+
+
+class ProgressReporter:
+    """
+    Prints a one-line summary of a run every `interval` seconds from a background thread.
+
+    Each line shows the requests completed so far, the request rate over the last interval, how many
+    requests are in flight, the p50 and p99 latency of the requests completed in the last interval and
+    the number of responses per status class. Everything comes from the run's RequestStatistics.
+    """
+
+    def __init__(self, stats, interval=1.0, stream=None, label=None, clock=time.monotonic):
+        self.stats = stats
+        self.interval = interval
+        self.stream = stream or sys.stderr
+        self.label = label
+        self.clock = clock
+
+        self.started = 0  # Requests handed to the send stage
+
+        self._start_time = clock()
+        self._last_time = self._start_time
+        self._last_total = 0
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def track_started(self, requests):
+        """Count every request as it is handed on to be sent, passing it through unchanged"""
+        for req in requests:
+            self.started += 1
+            yield req
+
+    def in_flight(self, total=None) -> int:
+        """Requests handed to the send stage whose results have not been recorded yet"""
+        if total is None:
+            total = self.stats.total_requests()
+
+        return max(self.started - total, 0)
+
+    def start(self):
+        if self.interval and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="dex-progress", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stopped.set()
+            self._thread.join()
+            self._thread = None
+            self.report()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.report()
+
+    def summary(self) -> str:
+        now = self.clock()
+        stats = self.stats.snapshot()
+        window = self.stats.take_window()
+
+        total = stats.total_requests()
+        elapsed = now - self._last_time
+        rate = (total - self._last_total) / elapsed if elapsed > 0 else 0.0
+        self._last_time, self._last_total = now, total
+
+        classes = " ".join(f"{status_class}={count}" for status_class, count in sorted(stats.status_classes.items()))
+        parts = [
+            f"{total:,} done",
+            f"{rate:,.1f} req/s",
+            f"{self.in_flight(total)} in flight",
+            f"p50 {us_to_ms(window.percentile(50)):.3f} ms",
+            f"p99 {us_to_ms(window.percentile(99)):.3f} ms",
+        ]
+        if classes:
+            parts.append(classes)
+
+        prefix = f"[{now - self._start_time:.1f}s]"
+        if self.label:
+            prefix = f"{self.label} {prefix}"
+
+        return f"{prefix} {', '.join(parts)}"
+
+    def report(self):
+        self.stream.write(self.summary() + "\n")
+        self.stream.flush()
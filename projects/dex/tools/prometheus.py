@@ -0,0 +1,109 @@
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency quantiles exported as a Prometheus summary
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def format_metrics(stats, in_flight=0) -> str:
+    """Render a snapshot of RequestStatistics in the Prometheus text exposition format"""
+    stats = stats.snapshot()
+    latency = stats.latency
+
+    lines = [
+        "# HELP dex_requests_total Completed requests by response status class.",
+        "# TYPE dex_requests_total counter",
+    ]
+    for status_class, count in sorted(stats.status_classes.items()):
+        lines.append(f'dex_requests_total{{class="{status_class}"}} {count}')
+
+    lines += [
+        "# HELP dex_requests_in_flight Requests sent or waiting to be sent whose results are not in yet.",
+        "# TYPE dex_requests_in_flight gauge",
+        f"dex_requests_in_flight {in_flight}",
+        "# HELP dex_request_duration_seconds Duration of requests that received a response.",
+        "# TYPE dex_request_duration_seconds summary",
+    ]
+    for quantile in QUANTILES:
+        lines.append(f'dex_request_duration_seconds{{quantile="{quantile}"}} '
+                     f'{latency.percentile(quantile * 100) / 1_000_000}')
+    lines += [
+        f"dex_request_duration_seconds_sum {latency.total / 1_000_000}",
+        f"dex_request_duration_seconds_count {latency.count}",
+        "# HELP dex_response_bytes_total Response body bytes, as received on the wire and once decoded.",
+        "# TYPE dex_response_bytes_total counter",
+        f'dex_response_bytes_total{{stage="wire"}} {stats.wire_bytes}',
+        f'dex_response_bytes_total{{stage="decoded"}} {stats.body_bytes}',
+        "# HELP dex_request_retries_total Attempts made after the first one.",
+        "# TYPE dex_request_retries_total counter",
+        f"dex_request_retries_total {stats.retries}",
+        "# HELP dex_requests_coalesced_total Requests answered by an identical in-flight request.",
+        "# TYPE dex_requests_coalesced_total counter",
+        f"dex_requests_coalesced_total {stats.coalesced_requests}",
+        "# HELP dex_checks_total Responses checked, by whether every check passed.",
+        "# TYPE dex_checks_total counter",
+        f'dex_checks_total{{outcome="pass"}} {stats.checks_passed()}',
+        f'dex_checks_total{{outcome="fail"}} {stats.checks_failed()}',
+    ]
+
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.partition("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+
+        body = format_metrics(self.server.stats, self.server.in_flight()).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer:
+    """
+    Serves the run's statistics at http://127.0.0.1:<port>/metrics for a Prometheus scraper.
+
+    :param stats: RequestStatistics of the run
+    :param in_flight: Callable returning the number of requests in flight
+    :param port: Port to listen on, 0 for any free port
+    """
+
+    def __init__(self, stats, in_flight=None, port=0, host="127.0.0.1"):
+        self.server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        self.server.daemon_threads = True
+        self.server.stats = stats
+        self.server.in_flight = in_flight or (lambda: 0)
+        self.thread = None
+
+    @property
+    def port(self) -> int:
+        return self.server.server_port
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="dex-metrics", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is not None:
+            self.server.shutdown()
+            self.thread.join()
+            self.thread = None
+        self.server.server_close()
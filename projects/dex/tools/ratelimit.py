@@ -0,0 +1,78 @@
+import math
+import time
+import threading
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket that refills at `rate` tokens per second up to `capacity` tokens.
+
+    The rate can ramp up linearly from zero to `rate` over `ramp_up` seconds, starting when the
+    bucket is created.
+    """
+
+    def __init__(self, rate, capacity=1, ramp_up=0.0, clock=time.monotonic):
+        if rate <= 0:
+            raise ValueError(f"Rate must be positive, got {rate}.")
+        if capacity < 1:
+            raise ValueError(f"Capacity must be at least 1, got {capacity}.")
+
+        self.rate = rate
+        self.capacity = capacity
+        self.ramp_up = ramp_up
+
+        self._clock = clock
+        self._start = clock()
+        self._updated = self._start
+        self._tokens = float(capacity)
+        self._lock = threading.Lock()
+
+    def current_rate(self, now) -> float:
+        """Return the refill rate at the given time"""
+        elapsed = now - self._start
+        if self.ramp_up <= 0 or elapsed >= self.ramp_up:
+            return self.rate
+
+        return self.rate * max(elapsed, 0) / self.ramp_up
+
+    def _generated(self, elapsed) -> float:
+        """Return the number of tokens generated in the first `elapsed` seconds"""
+        if elapsed < self.ramp_up:
+            return self.rate * elapsed * elapsed / (2 * self.ramp_up)
+
+        return self.rate * (elapsed - self.ramp_up / 2)
+
+    def _elapsed_until(self, generated) -> float:
+        """Inverse of _generated: the number of seconds it takes to generate `generated` tokens"""
+        if generated < self.rate * self.ramp_up / 2:
+            return math.sqrt(2 * self.ramp_up * generated / self.rate)
+
+        return generated / self.rate + self.ramp_up / 2
+
+    def reserve(self) -> float:
+        """
+        Take a token, borrowing from the future when the bucket is empty.
+
+        :return: The clock time at which the reserved token is available, which may be in the future
+        """
+        with self._lock:
+            now = self._clock()
+            generated = self._generated(now - self._start)
+
+            self._tokens = min(self.capacity, self._tokens + generated - self._generated(self._updated - self._start))
+            self._updated = now
+            self._tokens -= 1
+
+            if self._tokens >= 0:
+                return now
+
+            return self._start + self._elapsed_until(generated - self._tokens)
+
+    def acquire(self) -> float:
+        """Block until a token is available, returning the time the token became available"""
+        available_at = self.reserve()
+        delay = available_at - self._clock()
+        if delay > 0:
+            time.sleep(delay)
+
+        return available_at
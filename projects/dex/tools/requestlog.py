@@ -0,0 +1,146 @@
+import io
+import csv
+import sys
+import json
+import queue
+import threading
+
+from .timing import PhaseTimings
+
+LOG_FORMATS = ("text", "jsonl", "csv")
+
+CSV_COLUMNS = (
+    ("timestamp", "status", "method", "url", "elapsed_ns", "queue_delay_ns", "retries", "backoff_ns")
+    + tuple(f"{phase}_ns" for phase in PhaseTimings.PHASES)
+    + ("body_size", "wire_size", "body_digest", "body_path", "cache_status", "coalesced", "tls_resumed",
+       "check", "check_failures")
+)
+
+
+def result_to_row(result) -> tuple:
+    """Flatten a RequestResult into a tuple in CSV_COLUMNS order"""
+    target = result.target
+    return (
+        (result.request_time, result.status, target.method, target.full_url, result.elapsed_time_ns,
+         result.queue_delay_ns, result.retries, result.backoff_ns)
+        + tuple(duration for _, duration in result.timings.items())
+        + (result.body_size, result.wire_size, result.body_digest, result.body_path, result.cache_status,
+           result.coalesced, result.tls_resumed, result.check_outcome(),
+           "; ".join(result.check_failures) if result.check_failures else None)
+    )
+
+
+class RequestLogWriter:
+    """
+    Writes request results to a log file in batches of `batch_size` lines.
+
+    Every batch is written with a single append, so several processes can share one log file. With
+    `background` set, batches are formatted and written by a separate thread, off the send path.
+    """
+
+    def __init__(self, filename, log_format="jsonl", echo=False, batch_size=1000, background=False):
+        if log_format not in LOG_FORMATS:
+            raise ValueError(f"Unknown log format {log_format!r}, expected one of {', '.join(LOG_FORMATS)}.")
+
+        self.filename = filename
+        self.log_format = log_format
+        self.echo = echo
+        self.batch_size = batch_size
+
+        self._batch = []
+        self._file = open(filename, "ab", buffering=0)
+
+        if log_format == "csv" and self._file.tell() == 0:
+            self._write_lines([",".join(CSV_COLUMNS) + "\r\n"])
+
+        self._error = None
+        self._queue = None
+        self._thread = None
+        if background:
+            self._queue = queue.Queue(maxsize=8)
+            self._thread = threading.Thread(target=self._drain, name="dex-log-writer", daemon=True)
+            self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def write(self, result):
+        self._batch.append(result)
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def track(self, results):
+        """Log every result while passing it through unchanged"""
+        for result in results:
+            self.write(result)
+            yield result
+
+    def flush(self):
+        if self._error is not None:
+            raise self._error
+
+        batch, self._batch = self._batch, []
+        if not batch:
+            return
+
+        if self._queue is not None:
+            self._queue.put(batch)
+        else:
+            self._write_batch(batch)
+
+    def close(self):
+        if self._file.closed:
+            return
+
+        try:
+            self.flush()
+        finally:
+            if self._thread is not None:
+                self._queue.put(None)
+                self._thread.join()
+
+            self._file.close()
+
+        if self._error is not None:
+            raise self._error
+
+    def _drain(self):
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                return
+
+            # Keep draining after a failure so the producer never blocks, the error is raised on flush()
+            if self._error is None:
+                try:
+                    self._write_batch(batch)
+                except Exception as e:
+                    self._error = e
+
+    def _write_batch(self, batch):
+        if self.log_format == "text" or self.echo:
+            text_lines = [f"{result}\n" for result in batch]
+        else:
+            text_lines = None
+
+        if self.log_format == "text":
+            self._write_lines(text_lines)
+        elif self.log_format == "jsonl":
+            self._write_lines([json.dumps(dict(zip(CSV_COLUMNS, result_to_row(result)))) + "\n"
+                               for result in batch])
+        else:
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(result_to_row(result) for result in batch)
+            self._write_lines([buffer.getvalue()])
+
+        if self.echo:
+            sys.stdout.write("".join(text_lines))
+            sys.stdout.flush()
+
+    def _write_lines(self, lines):
+        data = memoryview("".join(lines).encode("utf-8"))
+        while data:
+            data = data[self._file.write(data):]
@@ -0,0 +1,132 @@
+import time
+import socket
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from .timing import now_ns
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def endpoint_address(endpoint):
+    """Split a record endpoint such as "https://example.com:8443" into a lowercase (host, port) tuple"""
+    protocol, separator, _ = endpoint.partition("://")
+    if not separator:
+        protocol = "http"  # Like CustomRequest, endpoints without a protocol are sent over http
+
+    parts = urlsplit(endpoint if separator else f"//{endpoint}")
+    return parts.hostname, parts.port or DEFAULT_PORTS.get(protocol, 80)
+
+
+class DNSCache:
+    """
+    A thread-safe cache of resolved host addresses, each kept for `ttl` seconds.
+
+    Connections take the addresses of a host in turn, so that they are spread over every A and AAAA
+    record the host has rather than all going to the first one.
+    """
+
+    def __init__(self, ttl=60.0, resolve=socket.getaddrinfo, clock=time.monotonic):
+        if ttl < 0:
+            raise ValueError(f"TTL cannot be negative, got {ttl}.")
+
+        self.ttl = ttl
+        self.lookups = 0  # Number of times the resolver was called
+
+        self._resolve = resolve
+        self._clock = clock
+        self._entries = {}  # (host, port) -> (addresses, expires, next index)
+        self._lock = threading.Lock()
+
+    def addresses(self, host, port) -> list:
+        """Return the (family, sockaddr) addresses of the host, resolving it when not cached or expired"""
+        key = (host.lower(), port)
+        now = self._clock()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now < entry[1]:
+                return entry[0]
+
+        infos = self._resolve(host, port, 0, socket.SOCK_STREAM)
+        addresses = list(dict.fromkeys((family, sockaddr) for family, _, _, _, sockaddr in infos))
+
+        with self._lock:
+            self.lookups += 1
+            if self.ttl:
+                self._entries[key] = [addresses, now + self.ttl, 0]
+
+        return addresses
+
+    def next_addresses(self, host, port) -> list:
+        """The host's addresses starting from the one after the address the previous connection was given"""
+        addresses = self.addresses(host, port)
+
+        with self._lock:
+            entry = self._entries.get((host.lower(), port))
+            if entry is None or len(addresses) < 2:
+                return addresses
+
+            start = entry[2] % len(addresses)
+            entry[2] = start + 1
+
+        return addresses[start:] + addresses[:start]
+
+    def prefetch_ahead(self, requests, on_error=None, concurrency=4):
+        """
+        Pass requests through while resolving each host in the background the first time it appears.
+
+        The send stages read requests ahead of sending them, so most hosts are resolved before their
+        first connection without the records being scanned up front.
+
+        :param requests: Iterable of CustomRequests
+        :param on_error: Optional callable given the host, port and error of a host that could not be resolved
+        """
+        def resolve(host_port):
+            try:
+                self.addresses(*host_port)
+            except OSError as e:
+                if on_error is not None:
+                    on_error(*host_port, e)
+
+        seen = set()
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="dex-dns") as executor:
+            for req in requests:
+                if req.endpoint not in seen:
+                    seen.add(req.endpoint)
+                    executor.submit(resolve, endpoint_address(req.endpoint))
+                yield req
+
+
+def create_connection(address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, source_address=None, resolver=None):
+    """
+    Connect a TCP socket like socket.create_connection, resolving the host through a DNSCache.
+
+    :return: Tuple of (socket, nanoseconds spent resolving the host)
+    """
+    host, port = address
+    start = now_ns()
+    if resolver is not None:
+        addresses = resolver.next_addresses(host, port)
+    else:
+        addresses = [(family, sockaddr) for family, _, _, _, sockaddr
+                     in socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)]
+    dns_ns = now_ns() - start
+
+    error = None
+    for family, sockaddr in addresses:
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        try:
+            if timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                sock.settimeout(timeout)
+            if source_address:
+                sock.bind(source_address)
+            sock.connect(sockaddr)
+            return sock, dns_ns
+        except OSError as e:
+            sock.close()
+            error = e  # Try the host's next address
+
+    raise error or OSError(f"getaddrinfo returned no addresses for {host}")
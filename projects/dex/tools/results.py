@@ -0,0 +1,207 @@
+from datetime import datetime
+from collections import OrderedDict, namedtuple
+
+
+def format_size(size_bytes: int, wire_bytes: int = None) -> str:
+    """Format a byte count, followed by the bytes received on the wire when compression made them differ"""
+    if wire_bytes is not None and wire_bytes != size_bytes:
+        return f"{format_size(size_bytes)} ({format_size(wire_bytes)} on the wire)"
+
+    if size_bytes < 1024:
+        return f"{size_bytes:,} bytes"
+    elif size_bytes < 1024 ** 2:
+        return f"{size_bytes / 1024:,.2f} KB"
+    elif size_bytes < 1024 ** 3:
+        return f"{size_bytes / 1024 ** 2:,.2f} MB"
+    elif size_bytes < 1024 ** 4:
+        return f"{size_bytes / 1024 ** 3:,.2f} GB"
+    else:
+        return f"{size_bytes / 1024 ** 4:,.2f} TB"
+
+
+_formatted_minute = (None, None)
+
+
+def format_minute(timestamp) -> str:
+    """Format a POSIX timestamp to the minute, reusing the previous string while the minute is unchanged"""
+    global _formatted_minute
+
+    minute = int(timestamp // 60)
+    cached_minute, formatted = _formatted_minute
+    if minute != cached_minute:
+        formatted = datetime.fromtimestamp(minute * 60).strftime("%A, %B %d, %Y %I:%M %p")
+        _formatted_minute = (minute, formatted)
+
+    return formatted
+
+
+# Everything needed to describe where a request went, shared by every result with the same target
+RequestTarget = namedtuple(
+    "RequestTarget",
+    "method protocol endpoint resource querystring headers full_url body_path path_segments query_params",
+)
+
+
+class TargetTable:
+    """
+    Interns request targets so results for repeated URLs share a single RequestTarget.
+
+    Only the most recently used targets are kept, so records with a unique URL on every row do not grow
+    the table for the whole run.
+    """
+
+    def __init__(self, max_size=4096):
+        self.max_size = max_size
+        self.targets = OrderedDict()
+
+    def __len__(self):
+        return len(self.targets)
+
+    def intern(self, req) -> RequestTarget:
+        headers = req.headers or {}
+        body_path = getattr(req.body, "path", None)  # Only bodies loaded from a file can be referred to
+        key = (req.method, req.protocol, req.endpoint, req.resource, req.querystring, tuple(headers.items()),
+               body_path)
+
+        target = self.targets.get(key)
+        if target is None:
+            target = RequestTarget(req.method, req.protocol, req.endpoint, req.resource, req.querystring,
+                                   headers, req.full_url(), body_path, req.path_segments(), req.query_params())
+            self.targets[key] = target
+            if len(self.targets) > self.max_size:
+                self.targets.popitem(last=False)
+        else:
+            self.targets.move_to_end(key)
+
+        return target
+
+
+class RequestResult:
+    """The outcome of a sent request without the response, headers or body it came with"""
+
+    __slots__ = (
+        "target",
+        "status",
+        "request_time",
+        "elapsed_time_ns",
+        "queue_delay_ns",
+        "timings",
+        "body_size",
+        "wire_size",
+        "body_digest",
+        "body_path",
+        "cache_status",
+        "coalesced",
+        "retries",
+        "backoff_ns",
+        "tls_resumed",
+        "check_failures",
+    )
+
+    def __init__(self, target, status, request_time, elapsed_time_ns, queue_delay_ns, timings, body_size,
+                 body_digest=None, body_path=None, cache_status=None, coalesced=False,
+                 retries=0, backoff_ns=0, tls_resumed=None, wire_size=None, check_failures=None):
+        self.target = target
+        self.status = status  # None when no response was received
+        self.request_time = request_time  # POSIX timestamp, or None if the request was never sent
+        self.elapsed_time_ns = elapsed_time_ns
+        self.queue_delay_ns = queue_delay_ns
+        self.timings = timings
+        self.body_size = body_size  # Decoded size of the response body
+        self.wire_size = body_size if wire_size is None else wire_size  # Size before Content-Encoding was undone
+        self.body_digest = body_digest
+        self.body_path = body_path
+        self.cache_status = cache_status  # "hit", "revalidated" or "miss" when a response cache was consulted
+        self.coalesced = coalesced  # True when the response came from an identical in-flight request
+        self.retries = retries  # Attempts made after the first one
+        self.backoff_ns = backoff_ns  # Time spent waiting between attempts, included in elapsed_time_ns
+        self.tls_resumed = tls_resumed  # None without a TLS handshake, otherwise whether it resumed a session
+        self.check_failures = check_failures  # None when unchecked, otherwise the failed expectations
+
+    @classmethod
+    def from_request(cls, req, targets=None):
+        """
+        Summarize a CustomRequest.
+
+        :param req: The request, sent or not
+        :param targets: Optional TargetTable used to share targets between results
+        """
+        if targets is None:
+            target = TargetTable().intern(req)
+        else:
+            target = targets.intern(req)
+
+        return cls(
+            target,
+            req.response.status if req.response else None,
+            req.request_time.timestamp() if req.request_time else None,
+            req.elapsed_time_ns,
+            req.queue_delay_ns,
+            req.timings,
+            req.body_size,
+            req.body_digest,
+            req.body_path,
+            req.cache_status,
+            req.coalesced,
+            req.retries,
+            req.backoff_ns,
+            req.tls_resumed,
+            req.wire_size,
+            req.check_failures,
+        )
+
+    def __str__(self):
+        if self.request_time:
+            request_time_str = f"'{format_minute(self.request_time)}'"
+        else:
+            request_time_str = "'None'"
+
+        if self.status is not None:
+            status_code_str = str(self.status)
+        else:
+            status_code_str = "'None'"
+
+        parts = [
+            f"status={status_code_str}",
+            f"when={request_time_str}",
+            f"duration='{self.elapsed_time_ms()} ms'",
+        ]
+        if self.queue_delay_ns:
+            parts.append(f"queued='{self.queue_delay_ns / 1_000_000:.3f} ms'")
+        if self.retries:
+            parts.append(f"retries={self.retries}")
+            parts.append(f"backoff='{self.backoff_ns / 1_000_000:.3f} ms'")
+        parts.append(f"phases='{self.timings} ms'")
+        parts.append(f"size='{format_size(self.body_size, self.wire_size)}'")
+        if self.body_digest:
+            parts.append(f"digest='{self.body_digest}'")
+        if self.body_path:
+            parts.append(f"body='{self.body_path}'")
+        if self.cache_status:
+            parts.append(f"cache='{self.cache_status}'")
+        if self.coalesced:
+            parts.append("coalesced='true'")
+        if self.check_failures is not None:
+            parts.append(f"check='{self.check_outcome()}'")
+        parts.append(f"url='{self.target.method} {self.target.full_url}'")
+
+        return ", ".join(parts)
+
+    def check_outcome(self):
+        """Return "pass", "fail", or None when no check applied to the response"""
+        if self.check_failures is None:
+            return None
+
+        return "fail" if self.check_failures else "pass"
+
+    def elapsed_time_ms(self) -> int:
+        return int(round(self.elapsed_time_ns / 1_000_000))
+
+
+def collect_results(requests, targets=None):
+    """Replace each request with its compact result as it arrives, letting the request be freed"""
+    if targets is None:
+        targets = TargetTable()
+
+    for req in requests:
+        yield RequestResult.from_request(req, targets)
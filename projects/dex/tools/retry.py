@@ -0,0 +1,115 @@
+import time
+import random
+import threading
+import http.client
+
+from .coalesce import IDEMPOTENT_METHODS
+
+# Errors worth trying again: refused or dropped connections, timeouts and malformed responses
+RETRYABLE_ERRORS = (OSError, http.client.HTTPException)
+
+# Responses that say the server is overloaded or a gateway could not reach it
+RETRYABLE_STATUS_CODES = (429, 502, 503, 504)
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised instead of sending a request to a host whose circuit breaker is open"""
+
+
+class RetryPolicy:
+    """
+    Decides whether a failed attempt is tried again and how long to back off first.
+
+    Backoff grows exponentially from `backoff` seconds up to `max_backoff`, with full jitter so that
+    concurrent workers retrying the same host spread out. A Retry-After header in seconds is honoured,
+    up to `max_backoff`.
+    """
+
+    def __init__(self, max_retries=0, backoff=0.1, max_backoff=10.0, jitter=True,
+                 retry_status_codes=RETRYABLE_STATUS_CODES, methods=IDEMPOTENT_METHODS, rng=random.random):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.retry_status_codes = retry_status_codes
+        self.methods = methods
+        self.rng = rng
+
+    def can_retry(self, method, retries) -> bool:
+        """Return True if a request that has been retried `retries` times may be tried again"""
+        return method in self.methods and retries < self.max_retries
+
+    def should_retry_status(self, status) -> bool:
+        return status in self.retry_status_codes
+
+    def delay(self, retries, response=None) -> float:
+        """Return the seconds to wait before retry number `retries + 1`"""
+        if response is not None:
+            retry_after = response.getheader("Retry-After")
+            if retry_after is not None:
+                try:
+                    return min(max(float(retry_after), 0.0), self.max_backoff)
+                except ValueError:
+                    pass  # An HTTP date, fall back to exponential backoff
+
+        delay = min(self.backoff * 2 ** retries, self.max_backoff)
+        if self.jitter:
+            delay *= self.rng()
+
+        return delay
+
+
+class CircuitBreaker:
+    """
+    A per-host circuit breaker shared by every request in a run.
+
+    After `failure_threshold` consecutive failures the host's circuit opens and requests to it fail
+    straight away with CircuitOpenError. Once `reset_timeout` seconds have passed a single trial request
+    is let through: its success closes the circuit again, its failure keeps it open for another period.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+
+        self.rejected = 0
+
+        self._failures = {}
+        self._opened_at = {}
+        self._trial = set()
+        self._lock = threading.Lock()
+
+    def is_open(self, host) -> bool:
+        with self._lock:
+            return host in self._opened_at
+
+    def allow(self, host):
+        """Raise CircuitOpenError unless a request may be sent to the host now"""
+        with self._lock:
+            opened_at = self._opened_at.get(host)
+            if opened_at is None:
+                return
+
+            if host not in self._trial and self.clock() - opened_at >= self.reset_timeout:
+                self._trial.add(host)
+                return
+
+            self.rejected += 1
+
+        raise CircuitOpenError(f"Circuit breaker for {host} is open after repeated failures.")
+
+    def record_success(self, host):
+        with self._lock:
+            self._failures.pop(host, None)
+            self._opened_at.pop(host, None)
+            self._trial.discard(host)
+
+    def record_failure(self, host):
+        with self._lock:
+            failures = self._failures.get(host, 0) + 1
+            self._failures[host] = failures
+
+            if host in self._trial or failures >= self.failure_threshold:
+                self._opened_at[host] = self.clock()
+                self._trial.discard(host)
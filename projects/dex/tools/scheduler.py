@@ -0,0 +1,164 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+def request_host(req) -> str:
+    """The key requests are queued and limited by, the endpoint host and port as written in the records"""
+    return req.endpoint
+
+
+def parse_host_weight(value):
+    """Parse "example.com:8443=3" into a (host, weight) tuple"""
+    host, separator, weight = value.rpartition("=")
+    try:
+        weight = int(weight)
+    except ValueError:
+        weight = 0
+
+    if not separator or not host or weight < 1:
+        raise ValueError(f"Invalid host weight {value!r}, expected HOST=WEIGHT with a positive whole weight.")
+
+    return host, weight
+
+
+class FairQueue:
+    """
+    Per-host queues dispatched in weighted round-robin order, with a cap on each host's in-flight items.
+
+    A host with weight w is given up to w items in a row before the next host gets a turn. A host at its
+    in-flight limit is skipped, so one slow host cannot hold back the others.
+    """
+
+    def __init__(self, host_limit=None, weights=None):
+        self.host_limit = host_limit  # Maximum in-flight items per host, None for no limit
+        self.weights = weights or {}
+
+        self.queued = 0
+        self.in_flight = {}
+
+        self._queues = {}
+        self._ring = deque()  # Hosts with queued items, the next one to dispatch from first
+        self._credits = {}  # Items the host at the front of the ring may still take this turn
+
+    def __len__(self):
+        return self.queued
+
+    def put(self, host, item):
+        queue = self._queues.get(host)
+        if queue is None:
+            queue = self._queues[host] = deque()
+        if not queue:
+            self._ring.append(host)
+
+        queue.append(item)
+        self.queued += 1
+
+    def take(self):
+        """Return the next (host, item) to dispatch, or None when every queued host is at its limit"""
+        for _ in range(len(self._ring)):
+            host = self._ring[0]
+            if self.host_limit is not None and self.in_flight.get(host, 0) >= self.host_limit:
+                self._end_turn(host)
+                continue
+
+            queue = self._queues[host]
+            item = queue.popleft()
+            self.queued -= 1
+            self.in_flight[host] = self.in_flight.get(host, 0) + 1
+
+            credits = self._credits.get(host, self.weights.get(host, 1)) - 1
+            if not queue:
+                self._ring.popleft()
+                self._credits.pop(host, None)
+            elif credits <= 0:
+                self._end_turn(host)
+            else:
+                self._credits[host] = credits
+
+            return host, item
+
+        return None
+
+    def done(self, host):
+        self.in_flight[host] -= 1
+
+    def _end_turn(self, host):
+        self._ring.rotate(-1)
+        self._credits.pop(host, None)
+
+
+def execute_fair(func, items, key=request_host, concurrency=1, host_limit=None, weights=None, backlog=None,
+                 max_backlog=None):
+    """
+    Apply func to every item using a pool of worker threads, sharing the workers fairly between hosts.
+
+    Items are read ahead into per-host queues and handed to the workers by a FairQueue. Results are
+    yielded as they complete rather than in input order, so a slow host delays only its own results.
+
+    A host at its limit can fill the backlog with its own items. While workers are idle and every queued
+    host is at its limit, reading continues past the backlog, up to max_backlog items, so that the other
+    hosts' items are found and keep the workers busy.
+
+    :param func: Callable applied to each item
+    :param items: Iterable of items
+    :param key: Callable returning the host of an item
+    :param concurrency: Number of worker threads
+    :param host_limit: Maximum number of items in flight for any one host, None for no limit
+    :param weights: Dict of host to the number of items it is given per turn, 1 by default
+    :param backlog: Number of items read ahead and queued (defaults to 64 x concurrency)
+    :param max_backlog: Hard cap on queued items when reading past the backlog (defaults to 16 x backlog)
+    :return: Generator of results in completion order
+    """
+    if concurrency < 1:
+        raise ValueError(f"Concurrency must be at least 1, got {concurrency}.")
+    if host_limit is not None and host_limit < 1:
+        raise ValueError(f"Host limit must be at least 1, got {host_limit}.")
+
+    if backlog is None:
+        backlog = concurrency * 64
+    if max_backlog is None:
+        max_backlog = backlog * 16
+
+    queue = FairQueue(host_limit, weights)
+    items = iter(items)
+    exhausted = False
+    running = {}
+
+    def dispatch():
+        while len(running) < concurrency:
+            taken = queue.take()
+            if taken is None:
+                return
+
+            host, item = taken
+            running[executor.submit(func, item)] = host
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="dex-send") as executor:
+        while True:
+            while not exhausted and len(queue) < backlog:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                else:
+                    queue.put(key(item), item)
+
+            dispatch()
+
+            # Idle workers with nothing they may take: look further ahead for another host's items
+            while len(running) < concurrency and not exhausted and len(queue) < max_backlog:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                else:
+                    queue.put(key(item), item)
+                    dispatch()
+
+            if not running:
+                return  # Nothing queued and nothing left to read
+
+            completed, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in completed:
+                queue.done(running.pop(future))
+                yield future.result()
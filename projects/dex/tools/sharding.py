@@ -0,0 +1,34 @@
+import os
+import math
+
+from concurrent.futures import ProcessPoolExecutor
+
+
+def shard_byte_ranges(filename, shards) -> list:
+    """Split a file into `shards` contiguous (start, end) byte ranges of roughly equal size"""
+    if shards < 1:
+        raise ValueError(f"Shards must be at least 1, got {shards}.")
+
+    size = os.path.getsize(filename)
+    step = max(math.ceil(size / shards), 1)
+
+    return [(min(index * step, size), min((index + 1) * step, size)) for index in range(shards)]
+
+
+def run_sharded(func, filename, workers, *args, ranges=None) -> list:
+    """
+    Run func(filename, index, start, end, *args) in its own process for each byte-range shard of the file.
+
+    func must be a module level function and its arguments and return value must be picklable.
+
+    :param ranges: The (start, end) byte range of every shard, by default the file split into `workers` parts
+    :return: The return values of func in shard order
+    """
+    if ranges is None:
+        ranges = shard_byte_ranges(filename, workers)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(func, filename, index, start, end, *args)
+                   for index, (start, end) in enumerate(ranges)]
+
+        return [future.result() for future in futures]
@@ -0,0 +1,32 @@
+import time
+
+
+def now_ns() -> int:
+    """Monotonic nanosecond clock used for every request timing"""
+    return time.monotonic_ns()
+
+
+class PhaseTimings:
+    """Durations in nanoseconds of each phase of a single request"""
+
+    PHASES = ("dns", "connect", "tls", "write", "ttfb", "download")
+
+    __slots__ = PHASES
+
+    def __init__(self):
+        for phase in self.PHASES:
+            setattr(self, phase, 0)
+
+    def __str__(self):
+        return ", ".join(f"{phase}={duration / 1_000_000:.3f}" for phase, duration in self.items())
+
+    def items(self):
+        """Yield (phase, duration in nanoseconds) pairs in the order the phases happen"""
+        for phase in self.PHASES:
+            yield phase, getattr(self, phase)
+
+    def as_dict(self) -> dict:
+        return dict(self.items())
+
+    def total(self) -> int:
+        return sum(duration for _, duration in self.items())
@@ -2,8 +2,8 @@ import csv
 
 
 def convert_records_to_csv(records, filename="records.csv"):
-    # Define the header
-    header = ["Method", "Endpoint", "Resource", "Querystring", "Encoding"]
+    # Define the header, Body and Headers are optional paths to a body file and a JSON header set
+    header = ["Method", "Endpoint", "Resource", "Querystring", "Encoding", "Body", "Headers"]
 
     with open(filename, "w", newline='') as csvfile:
         writer = csv.writer(csvfile)
@@ -13,12 +13,36 @@ def convert_records_to_csv(records, filename="records.csv"):
             writer.writerow(record)  # Write each record
 
 
-def read_records_from_csv(filename):
-    records = []
-    with open(filename, 'r', newline='') as csvfile:
-        reader = csv.reader(csvfile)
-        next(reader, None)  # Skip the header row if there is one
+def read_records_from_csv(filename, start=0, end=None):
+    """
+    Yield records one row at a time so the file is never fully loaded into memory.
+
+    When a byte range is given only the rows that begin inside [start, end) are read, so a file can be
+    split into shards that each hold whole rows. Rows must not contain quoted line breaks.
+
+    :param filename: Path to the records CSV file
+    :param start: Byte offset of the shard
+    :param end: Byte offset the shard stops at, or None to read to the end of the file
+    """
+    with open(filename, 'rb') as csvfile:
+        position = len(csvfile.readline())  # Skip the header row if there is one
+
+        if start > position:
+            # Move to the first row that starts at or after `start`
+            csvfile.seek(start - 1)
+            position = start - 1 + len(csvfile.readline())
+
+        reader = csv.reader(_read_lines(csvfile, position, end))
         for row in reader:
-            records.append(row)
+            yield row
+
+
+def _read_lines(csvfile, position, end):
+    """Decode lines from a binary file until one starts at or after `end`"""
+    while end is None or position < end:
+        line = csvfile.readline()
+        if not line:
+            return
 
-    return records
+        position += len(line)
+        yield line.decode("utf-8")